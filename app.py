@@ -4,7 +4,7 @@ Backend API server with authentication and user management
 Author: GEC Rajkot Development Team
 """
 
-from flask import Flask, jsonify, request, send_from_directory, render_template, session, redirect, url_for, flash
+from flask import Flask, jsonify, request, send_from_directory, render_template, session, redirect, url_for, flash, abort
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
@@ -12,16 +12,20 @@ from datetime import datetime, timedelta
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-import glob
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Import configurations and routes
-from database import init_database, create_tables
-from routes import auth_bp, student_bp, faculty_bp, attendance_bp, enrollment_bp, subject_bp
+from database import init_database, create_tables, use_read_replica, SchemaUpgradeError
+from utils.dashboard_cache import dashboard_cache
+from utils.notification_stream import notification_stream
+from utils.query_profiler import query_profiler
+from utils.metrics import metrics
+from utils.image_pipeline import image_pipeline
+from utils.jobs import import_jobs
+from routes import auth_bp, student_bp, faculty_bp, attendance_bp, enrollment_bp, subject_bp, upload_bp, job_bp
 
 def create_app(config_name='development'):
     """
@@ -45,9 +49,24 @@ def create_app(config_name='development'):
     # Setup logging
     setup_logging(app)
     
+    # Register flask CLI commands
+    register_cli_commands(app)
+    
     # Create database tables
     with app.app_context():
-        create_tables(app)
+        try:
+            create_tables(app)
+        except SchemaUpgradeError as e:
+            import click
+            if click.get_current_context(silent=True) is None:
+                raise
+            # Loaded by the flask CLI: keep maintenance commands such as
+            # dedupe-attendance usable, but refuse to serve requests
+            click.secho(f"Warning: {e}", err=True, fg='yellow')
+
+            @app.before_request
+            def schema_not_upgraded():
+                abort(503, description=str(e))
     
     return app
 
@@ -65,6 +84,20 @@ def get_config(config_name):
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'SQLALCHEMY_ECHO': config_name == 'development',
         
+        # Optional read-only engine for dashboards/reports (@use_read_replica views), e.g. a replica
+        # or the primary SQLite file opened read-only: sqlite:///file:/path/gec_rajkot.db?mode=ro&uri=true
+        'SQLALCHEMY_BINDS': {'read': os.environ['DATABASE_READ_URL']} if os.environ.get('DATABASE_READ_URL') else {},
+        
+        # SQLite connection tuning (see database.DEFAULT_SQLITE_PRAGMAS; None skips a pragma)
+        'SQLITE_PRAGMAS': {
+            'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+            'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+        },
+        
         # JWT configuration
         'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'gec-rajkot-jwt-secret-2024'),
         'JWT_ACCESS_TOKEN_EXPIRES': timedelta(hours=24),
@@ -85,7 +118,20 @@ def get_config(config_name):
         
         # File upload configuration
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
-        'UPLOAD_FOLDER': 'uploads',
+        'UPLOAD_FOLDER': 'uploads',  # served publicly at /uploads (profile photos only)
+        # Stored files, upload parts and import job inputs; never served directly
+        'FILE_STORE_FOLDER': os.environ.get('FILE_STORE_FOLDER', 'instance/file_store'),
+
+        # Create tables and apply upgrade_schema() at startup; turn off when the
+        # schema is managed with `flask db upgrade` (see migrations/README)
+        'AUTO_UPGRADE_SCHEMA': os.environ.get('AUTO_UPGRADE_SCHEMA', '1') != '0',
+
+        # Chunked uploads (/api/uploads): bytes per PATCH, largest file, per-user quotas (0 = unlimited)
+        'UPLOAD_CHUNK_SIZE': int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)),
+        'UPLOAD_MAX_SIZE': int(os.environ.get('UPLOAD_MAX_SIZE', 500 * 1024 * 1024)),
+        'UPLOAD_QUOTA_STUDENT': int(os.environ.get('UPLOAD_QUOTA_STUDENT', 200 * 1024 * 1024)),
+        'UPLOAD_QUOTA_FACULTY': int(os.environ.get('UPLOAD_QUOTA_FACULTY', 2 * 1024 * 1024 * 1024)),
+        'UPLOAD_SESSION_TTL_HOURS': int(os.environ.get('UPLOAD_SESSION_TTL_HOURS', 24)),
         
         # College information
         'COLLEGE_NAME': 'Government Engineering College, Rajkot',
@@ -94,6 +140,51 @@ def get_config(config_name):
         'COLLEGE_EMAIL': 'info@gecrajkot.ac.in',
         'COLLEGE_WEBSITE': 'www.gecrajkot.ac.in',
         
+        # Dashboard cache (TTL in seconds, 0 disables; set DASHBOARD_CACHE_URL=redis://... to share between workers)
+        'DASHBOARD_CACHE_TTL': int(os.environ.get('DASHBOARD_CACHE_TTL', 60)),
+        'DASHBOARD_CACHE_MAX_ENTRIES': int(os.environ.get('DASHBOARD_CACHE_MAX_ENTRIES', 1024)),
+        'DASHBOARD_CACHE_URL': os.environ.get('DASHBOARD_CACHE_URL'),
+        
+        # Notification stream (SSE); set NOTIFICATION_STREAM_URL=redis://... to fan events out across workers
+        'NOTIFICATION_STREAM_URL': os.environ.get('NOTIFICATION_STREAM_URL'),
+        'NOTIFICATION_STREAM_HEARTBEAT': int(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', 15)),
+        
+        # SQL profiling (fraction of requests sampled, 0 = off); adds Server-Timing and logs slow/N+1 requests
+        'QUERY_PROFILER_SAMPLE_RATE': float(os.environ.get('QUERY_PROFILER_SAMPLE_RATE', 0)),
+        'QUERY_PROFILER_SLOW_MS': float(os.environ.get('QUERY_PROFILER_SLOW_MS', 200)),
+        'QUERY_PROFILER_REPEAT_THRESHOLD': int(os.environ.get('QUERY_PROFILER_REPEAT_THRESHOLD', 10)),
+        
+        # Prometheus metrics at /metrics; with gunicorn -w N set METRICS_DIR to a directory shared by the workers
+        'METRICS_ENABLED': os.environ.get('METRICS_ENABLED', 'true').lower() == 'true',
+        'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+        'METRICS_DIR': os.environ.get('METRICS_DIR'),
+        'METRICS_FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0)),
+        
+        # Probes: readiness gives up on the database after HEALTH_DB_TIMEOUT seconds;
+        # /api/stats recounts users at most every DB_STATS_MAX_AGE seconds
+        'HEALTH_DB_TIMEOUT': float(os.environ.get('HEALTH_DB_TIMEOUT', 2.0)),
+        'DB_STATS_MAX_AGE': int(os.environ.get('DB_STATS_MAX_AGE', 300)),
+        
+        # Profile photo processing: IMAGE_WORKERS background threads (0 = inline in the request),
+        # IMAGE_QUEUE_SIZE jobs per process before uploads fall back to inline, IMAGE_MAX_PIXELS per image,
+        # IMAGE_STALE_SECONDS before a photo still 'processing' is assumed lost and queued again
+        'IMAGE_WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+        'IMAGE_QUEUE_SIZE': int(os.environ.get('IMAGE_QUEUE_SIZE', 16)),
+        'IMAGE_MAX_PIXELS': int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000)),
+        'IMAGE_STALE_SECONDS': int(os.environ.get('IMAGE_STALE_SECONDS', 300)),
+        
+        # Student Excel import: threads hashing passwords per process (PBKDF2 releases the GIL; 0/1 = job thread)
+        'PASSWORD_HASH_WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))),
+        
+        # Background Excel/CSV imports (utils.jobs): threads per process (0 = inside the upload request),
+        # rows per committed chunk, seconds without a heartbeat before another worker resumes a job
+        # (also how often each process sweeps for such jobs)
+        'IMPORT_JOB_WORKERS': int(os.environ.get('IMPORT_JOB_WORKERS', 2)),
+        'IMPORT_JOB_CHUNK_ROWS': int(os.environ.get('IMPORT_JOB_CHUNK_ROWS', 500)),
+        'IMPORT_JOB_STALE_SECONDS': int(os.environ.get('IMPORT_JOB_STALE_SECONDS', 120)),
+        'IMPORT_JOB_MAX_ATTEMPTS': int(os.environ.get('IMPORT_JOB_MAX_ATTEMPTS', 3)),
+        'IMPORT_JOB_MAX_ERRORS': int(os.environ.get('IMPORT_JOB_MAX_ERRORS', 1000)),
+        
         # API configuration
         'API_VERSION': 'v1',
         'API_TITLE': 'GEC Rajkot API',
@@ -109,8 +200,11 @@ def get_config(config_name):
     elif config_name == 'testing':
         config.update({
             'TESTING': True,
-            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'SQLALCHEMY_DATABASE_URI': os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:'),
             'WTF_CSRF_ENABLED': False,
+            'DASHBOARD_CACHE_TTL': 0,
+            'IMAGE_WORKERS': 0,
+            'IMPORT_JOB_WORKERS': 0,
         })
     
     return config
@@ -122,6 +216,24 @@ def init_extensions(app):
     # Initialize database
     init_database(app)
     
+    # Initialize dashboard cache
+    dashboard_cache.init_app(app)
+    
+    # Initialize notification stream (pub/sub for SSE)
+    notification_stream.init_app(app)
+    
+    # Initialize query profiler (opt-in per-request SQL stats)
+    query_profiler.init_app(app)
+    
+    # Initialize metrics (/metrics endpoint, request/DB/upload timings)
+    metrics.init_app(app)
+    
+    # Initialize image pipeline (background profile photo resizing)
+    image_pipeline.init_app(app)
+    
+    # Initialize import jobs (background Excel/CSV imports)
+    import_jobs.init_app(app)
+    
     # Initialize CORS
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
     
@@ -172,6 +284,12 @@ def register_blueprints(app):
     
     # Subject management routes
     app.register_blueprint(subject_bp)
+    
+    # File upload routes (chunked uploads, stored files)
+    app.register_blueprint(upload_bp)
+    
+    # Import job routes (progress of background Excel/CSV imports)
+    app.register_blueprint(job_bp)
 
 def register_error_handlers(app):
     """
@@ -243,6 +361,73 @@ def setup_logging(app):
     
     return app
 
+def register_cli_commands(app):
+    """
+    Register maintenance commands (run with `flask --app app <command>`)
+    """
+    import click
+
+    @app.cli.command('rebuild-attendance-summary')
+    @click.option('--subject-id', type=int, default=None, help='Only rebuild this subject')
+    def rebuild_attendance_summary_command(subject_id):
+        """Recompute the attendance_summary counters from the attendance table"""
+        from database import db
+        from utils.attendance_writer import rebuild_attendance_summary
+
+        rows = rebuild_attendance_summary(subject_id)
+        db.session.commit()
+        click.echo(f"Rebuilt attendance summary: {rows} rows")
+
+    @app.cli.command('dedupe-attendance')
+    @click.option('--dry-run', is_flag=True, help='Only list the rows that would be removed')
+    @click.option('--backup', type=click.Path(dir_okay=False, writable=True), default=None,
+                  help='Also write the removed rows to this CSV file')
+    def dedupe_attendance_command(dry_run, backup):
+        """Remove duplicate (student, subject, date) attendance rows, keeping the latest mark"""
+        import csv
+        from database import db, create_tables
+        from utils.attendance_writer import dedupe_attendance
+
+        rows = dedupe_attendance(dry_run=dry_run)
+        for row in rows:
+            click.echo(f"attendance_id={row['attendance_id']} student_id={row['student_id']} "
+                       f"subject_id={row['subject_id']} date={row['date']} status={row['status']} "
+                       f"(kept attendance_id={row['kept_id']})")
+        if backup and rows:
+            with open(backup, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            click.echo(f"Wrote {len(rows)} rows to {backup}")
+        if dry_run:
+            click.echo(f"{len(rows)} duplicate attendance rows would be removed")
+            return
+        db.session.commit()
+        # Finish the startup schema upgrade the duplicates held up
+        create_tables(app)
+        click.echo(f"Removed {len(rows)} duplicate attendance rows")
+
+    @app.cli.command('backfill-avatars')
+    def backfill_avatars_command():
+        """Index profile photos already in UPLOAD_FOLDER onto the students/faculty rows"""
+        from database import db
+        from utils.avatars import backfill_avatars
+
+        upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
+        users = backfill_avatars(upload_dir)
+        db.session.commit()
+        click.echo(f"Indexed profile photos for {users} users")
+
+    @app.cli.command('purge-uploads')
+    @click.option('--hours', type=int, default=None,
+                  help='Idle time after which an upload is dropped (default UPLOAD_SESSION_TTL_HOURS)')
+    def purge_uploads_command(hours):
+        """Cancel chunked uploads that stopped receiving data, freeing their disk space and quota"""
+        from utils.file_store import purge_stale_uploads
+
+        removed = purge_stale_uploads(hours if hours is not None else app.config['UPLOAD_SESSION_TTL_HOURS'])
+        click.echo(f"Removed {removed} stale uploads")
+
 def register_main_routes(app):
     """
     Register main application routes
@@ -269,6 +454,9 @@ def register_main_routes(app):
                 'student': '/api/student',
                 'faculty': '/api/faculty',
                 'health': '/api/health',
+                'liveness': '/api/health/live',
+                'readiness': '/api/health/ready',
+                'stats': '/api/stats',
                 'docs': '/api/docs'
             }
         })
@@ -279,16 +467,19 @@ def register_main_routes(app):
         Health check endpoint
         """
         try:
-            # Check database connection
-            from database import get_db_stats
-            db_stats = get_db_stats()
+            # Check database connection (a trivial query; table counts are too slow to probe)
+            from database import ping_database
             
             return jsonify({
                 'status': 'healthy',
                 'timestamp': datetime.utcnow().isoformat(),
                 'version': app.config['API_VERSION'],
-                'database': 'connected' if db_stats else 'disconnected',
-                'database_stats': db_stats,
+                'database': 'connected' if ping_database(app.config['HEALTH_DB_TIMEOUT']) else 'disconnected',
+                'dashboard_cache': dashboard_cache.stats(),
+                'notification_stream': notification_stream.stats(),
+                'query_profiler': query_profiler.stats(),
+                'image_pipeline': image_pipeline.stats(),
+                'import_jobs': import_jobs.stats(),
                 'uptime': 'N/A'  # Could implement actual uptime tracking
             })
         except Exception as e:
@@ -299,6 +490,36 @@ def register_main_routes(app):
                 'error': str(e)
             }), 500
 
+    @app.route('/api/health/live')
+    def liveness_probe():
+        """
+        Liveness probe: the process is serving requests (no I/O)
+        """
+        return jsonify({'status': 'alive'})
+
+    @app.route('/api/health/ready')
+    def readiness_probe():
+        """
+        Readiness probe: the database answers SELECT 1 within HEALTH_DB_TIMEOUT
+        """
+        from database import ping_database
+        
+        if not ping_database(app.config['HEALTH_DB_TIMEOUT']):
+            return jsonify({'status': 'unavailable', 'database': 'disconnected'}), 503
+        return jsonify({'status': 'ready', 'database': 'connected'})
+
+    @app.route('/api/stats')
+    def database_stats():
+        """
+        User counts, recomputed in the background at most every DB_STATS_MAX_AGE seconds
+        """
+        from database import get_cached_db_stats
+        
+        stats, as_of = get_cached_db_stats(app.config['DB_STATS_MAX_AGE'])
+        if stats is None:
+            return jsonify({'error': 'Database statistics unavailable'}), 503
+        return jsonify({**stats, 'as_of': as_of.isoformat()})
+
     @app.route('/api/docs')
     def api_docs():
         """
@@ -338,6 +559,18 @@ def register_main_routes(app):
                     'grades': 'POST /api/faculty/grades',
                     'schedule': 'GET /api/faculty/schedule',
                     'subjects': 'GET /api/faculty/subjects'
+                },
+                'uploads': {
+                    'start': 'POST /api/uploads',
+                    'chunk': 'PATCH /api/uploads/<upload_id>',
+                    'status': 'GET|DELETE /api/uploads/<upload_id>',
+                    'files': 'GET /api/files',
+                    'file': 'GET|DELETE /api/files/<file_id>',
+                    'single': 'POST /api/upload'
+                },
+                'jobs': {
+                    'list': 'GET /api/jobs',
+                    'status': 'GET /api/jobs/<job_id>'
                 }
             },
             'authentication': 'Bearer token required for protected endpoints',
@@ -438,6 +671,7 @@ def register_main_routes(app):
         return render_template('auth/verify-otp.html')
 
     @app.route('/student/dashboard')
+    @use_read_replica
     def serve_student_dashboard():
         """
         Serve the student dashboard page with real database data
@@ -449,8 +683,9 @@ def register_main_routes(app):
             flash('Please log in to access the student dashboard', 'error')
             return redirect(url_for('serve_login', user_type='student'))
         
-        # Get dashboard data from database
-        dashboard_data = get_student_dashboard_data(session['user_id'])
+        # Get dashboard data from database (cached per user; a miss reads the primary, not the replica)
+        user_id = session['user_id']
+        dashboard_data = dashboard_cache.get_or_compute('student', user_id, lambda: get_student_dashboard_data(user_id))
         if not dashboard_data:
             flash('Error loading dashboard data', 'error')
             return redirect(url_for('serve_login', user_type='student'))
@@ -458,6 +693,7 @@ def register_main_routes(app):
         return render_template('student/dashboard.html', **dashboard_data)
 
     @app.route('/faculty/dashboard')
+    @use_read_replica
     def serve_faculty_dashboard():
         """
         Serve the faculty dashboard page with real database data
@@ -469,8 +705,9 @@ def register_main_routes(app):
             flash('Please log in to access the faculty dashboard', 'error')
             return redirect(url_for('serve_login', user_type='faculty'))
         
-        # Get dashboard data from database
-        dashboard_data = get_faculty_dashboard_data(session['user_id'])
+        # Get dashboard data from database (cached per user; a miss reads the primary, not the replica)
+        user_id = session['user_id']
+        dashboard_data = dashboard_cache.get_or_compute('faculty', user_id, lambda: get_faculty_dashboard_data(user_id))
         if not dashboard_data:
             flash('Error loading dashboard data', 'error')
             return redirect(url_for('serve_login', user_type='faculty'))
@@ -487,7 +724,8 @@ def register_main_routes(app):
             flash('Please log in to access this page', 'error')
             return redirect(url_for('serve_login', user_type='student'))
         
-        from models.gecr_models import Student, StudentEnrollment, Attendance
+        from models.gecr_models import Student, StudentEnrollment
+        from utils.attendance_summary import get_overall_attendance, empty_counts
         student = Student.query.get(session['user_id'])
 
         # Calculate stats
@@ -497,37 +735,19 @@ def register_main_routes(app):
             status='active'
         ).count()
         
-        # Total classes attended
-        classes_attended = Attendance.query.filter_by(
-            student_id=student.student_id,
-            status='Present'
-        ).count()
+        # Total classes attended, from the attendance_summary counters
+        overall = get_overall_attendance([student.student_id]).get(student.student_id, empty_counts())
+        classes_attended = overall['present']
         
         # Calculate overall attendance percentage
-        total_attendance_records = Attendance.query.filter_by(
-            student_id=student.student_id
-        ).count()
+        total_attendance_records = overall['total']
         
         overall_attendance = 0
         if total_attendance_records > 0:
             overall_attendance = round((classes_attended / total_attendance_records) * 100, 1)
 
-        # Try to find an uploaded profile photo for this student in UPLOAD_FOLDER
-        upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
-        photo_filename = None
-        try:
-            # Prefer thumbnail if available (student_<id>_thumb.*), fall back to original
-            thumb_pattern = os.path.join(upload_dir, f"student_{student.student_id}_thumb.*")
-            matches = glob.glob(thumb_pattern)
-            if matches:
-                photo_filename = os.path.basename(matches[0])
-            else:
-                pattern = os.path.join(upload_dir, f"student_{student.student_id}.*")
-                matches = glob.glob(pattern)
-                if matches:
-                    photo_filename = os.path.basename(matches[0])
-        except Exception:
-            photo_filename = None
+        # Profile photo from the avatar index (thumbnail preferred, original as fallback)
+        photo_filename = student.photo_thumb_filename or student.photo_filename
 
         return render_template('student/profile.html', 
                              student=student, 
@@ -758,6 +978,7 @@ def register_main_routes(app):
         return render_template('faculty/settings.html', faculty=faculty)
 
     @app.route('/faculty/upload-photo', methods=['POST'])
+    @metrics.time_upload('profile_photo')
     def faculty_upload_photo():
         """Handle faculty profile photo upload from settings page"""
         if 'user_id' not in session or session.get('user_type') != 'faculty':
@@ -773,37 +994,29 @@ def register_main_routes(app):
             flash('No file selected', 'error')
             return redirect(url_for('serve_faculty_settings'))
 
-        filename = secure_filename(file.filename)
-        _, ext = os.path.splitext(filename)
-        dest_name = f"faculty_{session['user_id']}{ext}"
+        from database import db
+        from utils.avatars import stage_profile_photo, process_profile_photo, get_photo_state
 
         upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
-        os.makedirs(upload_dir, exist_ok=True)
-
-        dest_path = os.path.join(upload_dir, dest_name)
         try:
-            # Save original
-            file.save(dest_path)
-
-            # Create thumbnail using Pillow if available
-            try:
-                from PIL import Image
-                thumb_size = (300, 300)
-                img = Image.open(dest_path)
-                img = img.convert('RGB')
-                img.thumbnail(thumb_size)
-                base, _ = os.path.splitext(dest_name)
-                thumb_name = f"{base}_thumb.jpg"
-                thumb_path = os.path.join(upload_dir, thumb_name)
-                img.save(thumb_path, format='JPEG', quality=85)
-            except Exception as e:
-                # Pillow may not be installed or image processing failed; continue gracefully
-                app.logger.info(f"Thumbnail creation skipped or failed: {e}")
-
-            flash('Profile photo uploaded successfully', 'success')
+            # Stage the original; resizing happens on the image pipeline, and the
+            # settings page polls /profile/photo-status until the new photo is ready
+            key, staged_path = stage_profile_photo('faculty', session['user_id'], file, upload_dir)
+            db.session.commit()
         except Exception as e:
+            db.session.rollback()
             app.logger.error(f"Failed to save uploaded photo: {e}")
             flash('Failed to upload photo', 'error')
+            return redirect(url_for('serve_faculty_settings'))
+
+        queued = image_pipeline.submit('profile_photo_variants', process_profile_photo,
+                                       'faculty', session['user_id'], key, staged_path, upload_dir)
+        if queued:
+            flash('Profile photo uploaded; it will appear in a few seconds', 'success')
+        elif get_photo_state('faculty', session['user_id'])['status'] == 'failed':
+            flash('Failed to process photo', 'error')
+        else:
+            flash('Profile photo uploaded successfully', 'success')
 
         return redirect(url_for('serve_faculty_settings'))
 
@@ -899,6 +1112,7 @@ def register_main_routes(app):
         return render_template('student/settings.html', student=student)
 
     @app.route('/student/upload-photo', methods=['POST'])
+    @metrics.time_upload('profile_photo')
     def student_upload_photo():
         """Handle student profile photo upload from settings page"""
         if 'user_id' not in session or session.get('user_type') != 'student':
@@ -914,37 +1128,29 @@ def register_main_routes(app):
             flash('No file selected', 'error')
             return redirect(url_for('serve_student_settings'))
 
-        filename = secure_filename(file.filename)
-        _, ext = os.path.splitext(filename)
-        dest_name = f"student_{session['user_id']}{ext}"
+        from database import db
+        from utils.avatars import stage_profile_photo, process_profile_photo, get_photo_state
 
         upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
-        os.makedirs(upload_dir, exist_ok=True)
-
-        dest_path = os.path.join(upload_dir, dest_name)
         try:
-            # Save original
-            file.save(dest_path)
-
-            # Create thumbnail using Pillow if available
-            try:
-                from PIL import Image
-                thumb_size = (300, 300)
-                img = Image.open(dest_path)
-                img = img.convert('RGB')
-                img.thumbnail(thumb_size)
-                base, _ = os.path.splitext(dest_name)
-                thumb_name = f"{base}_thumb.jpg"
-                thumb_path = os.path.join(upload_dir, thumb_name)
-                img.save(thumb_path, format='JPEG', quality=85)
-            except Exception as e:
-                # Pillow may not be installed or image processing failed; continue gracefully
-                app.logger.info(f"Thumbnail creation skipped or failed: {e}")
-
-            flash('Profile photo uploaded successfully', 'success')
+            # Stage the original; resizing happens on the image pipeline, and the
+            # settings page polls /profile/photo-status until the new photo is ready
+            key, staged_path = stage_profile_photo('student', session['user_id'], file, upload_dir)
+            db.session.commit()
         except Exception as e:
+            db.session.rollback()
             app.logger.error(f"Failed to save uploaded photo: {e}")
             flash('Failed to upload photo', 'error')
+            return redirect(url_for('serve_student_settings'))
+
+        queued = image_pipeline.submit('profile_photo_variants', process_profile_photo,
+                                       'student', session['user_id'], key, staged_path, upload_dir)
+        if queued:
+            flash('Profile photo uploaded; it will appear in a few seconds', 'success')
+        elif get_photo_state('student', session['user_id'])['status'] == 'failed':
+            flash('Failed to process photo', 'error')
+        else:
+            flash('Profile photo uploaded successfully', 'success')
 
         return redirect(url_for('serve_student_settings'))
 
@@ -1030,10 +1236,44 @@ def register_main_routes(app):
 
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
-        """Serve uploaded files (profile photos) from upload folder"""
+        """Serve profile photos from the upload folder; nothing else there is public"""
+        from utils.avatars import is_public_photo
+        if not is_public_photo(filename):
+            # e.g. raw uploads in pending/ still carry their EXIF data
+            abort(404)
         upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
         return send_from_directory(upload_dir, filename)
 
+    @app.route('/profile/photo-status')
+    def profile_photo_status():
+        """
+        Processing status and URLs of the logged-in user's profile photo, polled
+        by the settings pages after an upload
+        """
+        from utils.avatars import get_photo_state, recover_stale_photo
+        if 'user_id' not in session or session.get('user_type') not in ('student', 'faculty'):
+            return jsonify({'error': 'Not logged in'}), 401
+
+        state = get_photo_state(session['user_type'], session['user_id'])
+        if state is None:
+            return jsonify({'error': 'User not found'}), 404
+        if state['status'] == 'processing':
+            # Its job may have been lost in a restart; requeue it (or give up) once it is stale
+            upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
+            if recover_stale_photo(session['user_type'], session['user_id'], upload_dir, image_pipeline.stale_after):
+                state = get_photo_state(session['user_type'], session['user_id'])
+
+        def url(filename):
+            return url_for('uploaded_file', filename=filename) if filename else None
+
+        return jsonify({
+            'status': state['status'],
+            'photo_url': url(state['photo']),
+            'thumb_url': url(state['thumb'] or state['photo']),
+            'variants': {str(size): {ext: url(name) for ext, name in formats.items()}
+                         for size, formats in state['variants'].items()},
+        })
+
     @app.route('/auth/login/<user_type>', methods=['POST'])
     def auth_login(user_type):
         """
@@ -1257,58 +1497,71 @@ def register_main_routes(app):
     @app.context_processor
     def inject_current_avatar():
         from flask import session, url_for
+        from utils.avatars import get_avatar_filenames, variant_filenames
         avatar_url = None
         avatar_thumb = None
+        srcsets = {}
         try:
-            if 'user_id' in session and session.get('user_type') == 'student':
-                uid = session['user_id']
-                upload_dir = os.path.join(app.root_path, app.config.get('UPLOAD_FOLDER', 'uploads'))
-                # prefer thumb
-                pattern = os.path.join(upload_dir, f"student_{uid}_thumb.*")
-                matches = glob.glob(pattern)
-                if matches:
-                    avatar_thumb = url_for('uploaded_file', filename=os.path.basename(matches[0]))
-                else:
-                    pattern2 = os.path.join(upload_dir, f"student_{uid}.*")
-                    matches2 = glob.glob(pattern2)
-                    if matches2:
-                        avatar_url = url_for('uploaded_file', filename=os.path.basename(matches2[0]))
-            elif 'user_id' in session and session.get('user_type') == 'faculty':
-                # you can add faculty-specific avatar logic here if implemented
-                pass
+            if 'user_id' in session and session.get('user_type') in ('student', 'faculty'):
+                # Indexed on the user's row by the upload handlers; prefer the thumbnail
+                photo, thumb = get_avatar_filenames(session['user_type'], session['user_id'])
+                if thumb:
+                    avatar_thumb = url_for('uploaded_file', filename=thumb)
+                elif photo:
+                    avatar_url = url_for('uploaded_file', filename=photo)
+                # "url 64w, url 150w, ..." per format, so small avatars load the small variant
+                for size, formats in sorted(variant_filenames(photo).items()):
+                    for ext, name in formats.items():
+                        srcsets.setdefault(ext, []).append(f"{url_for('uploaded_file', filename=name)} {size}w")
         except Exception:
             avatar_url = None
             avatar_thumb = None
+            srcsets = {}
 
-        return dict(current_avatar_url=avatar_url, current_avatar_thumb_url=avatar_thumb)
+        return dict(current_avatar_url=avatar_url, current_avatar_thumb_url=avatar_thumb,
+                    current_avatar_srcset_webp=', '.join(srcsets.get('webp', [])),
+                    current_avatar_srcset_jpg=', '.join(srcsets.get('jpg', [])))
 
     # File upload endpoint
     @app.route('/api/upload', methods=['POST'])
+    @metrics.time_upload('file')
     def upload_file():
         """
-        General file upload endpoint
+        General file upload endpoint (whole file in one multipart request).
+        Stored in the content-addressed file store; larger files should use
+        the chunked /api/uploads API.
         """
+        from werkzeug.utils import secure_filename
+        from utils.file_store import UploadError, store_stream
+
+        if 'user_id' not in session or session.get('user_type') not in ('student', 'faculty'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
         
         file = request.files['file']
-        if file.filename == '':
+        filename = secure_filename(file.filename or '')
+        if not filename:
             return jsonify({'error': 'No file selected'}), 400
         
-        # Create upload directory if it doesn't exist
-        upload_dir = app.config['UPLOAD_FOLDER']
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-        
-        # Save file (you might want to add more validation and security)
-        filename = file.filename
-        file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
+        try:
+            # Werkzeug spools large parts to a temp file; this copies it in pieces while hashing
+            stored, deduplicated = store_stream(session['user_type'], session['user_id'], filename,
+                                                file.mimetype, file.stream)
+        except UploadError as e:
+            return jsonify({'error': str(e), **e.details}), e.status
+        except Exception as e:
+            app.logger.error(f"File upload failed: {e}")
+            return jsonify({'error': 'Failed to store file'}), 500
         
         return jsonify({
             'message': 'File uploaded successfully',
-            'filename': filename,
-            'file_path': file_path
+            'filename': stored.filename,
+            'file_id': stored.file_id,
+            'sha256': stored.sha256,
+            'deduplicated': deduplicated,
+            'url': url_for('upload.download_file', file_id=stored.file_id)
         })
 
 if __name__ == '__main__':
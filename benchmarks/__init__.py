@@ -0,0 +1,5 @@
+"""
+Benchmarks Package
+Standalone performance scripts for GEC Rajkot backend routes
+Run a benchmark with: python -m benchmarks.<module_name>
+"""
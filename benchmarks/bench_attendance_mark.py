@@ -0,0 +1,89 @@
+"""
+Attendance Marking Benchmark
+Per-request latency of POST /api/attendance/faculty/mark for growing class sizes
+
+Usage: python -m benchmarks.bench_attendance_mark [--repeat N]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from database import db
+from models.gecr_models import Faculty, Subject, Student
+from benchmarks.common import make_app, login, time_call, summarize, cleanup
+
+CLASS_SIZES = [30, 60, 120, 250, 500]
+
+
+def seed_class(size):
+    """Create one faculty, one subject and `size` students; return (faculty_id, subject_id, student_ids)"""
+    faculty = Faculty(name='Bench Faculty', email=f'bench{size}@gecr.edu', password='x', department='AI&DS')
+    db.session.add(faculty)
+    db.session.flush()
+
+    subject = Subject(subject_name=f'Bench Subject {size}', department='AI&DS', semester=5, faculty_id=faculty.faculty_id)
+    db.session.add(subject)
+
+    students = [
+        Student(roll_no=f'B{size}_{i:04d}', name=f'Student {i}', email=f'b{size}_{i}@gecr.edu', password='x')
+        for i in range(size)
+    ]
+    db.session.add_all(students)
+    db.session.commit()
+    return faculty.faculty_id, subject.subject_id, [s.student_id for s in students]
+
+
+def run(repeat):
+    app = make_app()
+    client = app.test_client()
+    statuses = ('Present', 'Absent', 'Late')
+    results = []
+
+    try:
+        for size in CLASS_SIZES:
+            with app.app_context():
+                faculty_id, subject_id, student_ids = seed_class(size)
+            login(client, faculty_id, 'faculty')
+
+            start_day = date(2024, 1, 1)
+            counter = {'day': 0}
+
+            def mark_new_day():
+                # Fresh date each call: every row is an insert
+                payload = {
+                    'subject_id': subject_id,
+                    'date': (start_day + timedelta(days=counter['day'])).isoformat(),
+                    'attendance': [
+                        {'student_id': sid, 'status': statuses[(sid + counter['day']) % 3]}
+                        for sid in student_ids
+                    ]
+                }
+                counter['day'] += 1
+                response = client.post('/api/attendance/faculty/mark', json=payload)
+                assert response.status_code == 200, response.get_json()
+
+            def remark_same_day():
+                # Same date again: every row is an update
+                payload = {
+                    'subject_id': subject_id,
+                    'date': start_day.isoformat(),
+                    'attendance': [{'student_id': sid, 'status': 'Present'} for sid in student_ids]
+                }
+                response = client.post('/api/attendance/faculty/mark', json=payload)
+                assert response.status_code == 200, response.get_json()
+
+            results.append((size, summarize(time_call(mark_new_day, repeat)),
+                            summarize(time_call(remark_same_day, repeat))))
+    finally:
+        cleanup(app)
+
+    print(f"{'class size':>10} | {'insert p50 ms':>13} | {'insert mean ms':>14} | {'update p50 ms':>13} | {'update mean ms':>14}")
+    print('-' * 76)
+    for size, inserts, updates in results:
+        print(f"{size:>10} | {inserts['p50_ms']:>13} | {inserts['mean_ms']:>14} | {updates['p50_ms']:>13} | {updates['mean_ms']:>14}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='requests per class size')
+    run(parser.parse_args().repeat)
@@ -0,0 +1,72 @@
+"""
+Attendance Excel Upload Benchmark
+Rows/sec of POST /api/attendance/faculty/upload for growing sheet sizes
+
+Usage: python -m benchmarks.bench_attendance_upload [--repeat N]
+"""
+
+import argparse
+import io
+from datetime import date, timedelta
+
+import pandas as pd
+
+from benchmarks.common import make_app, login, time_call, summarize, cleanup
+from benchmarks.bench_attendance_mark import seed_class
+
+# (students, dates) per sheet; rows = students * dates
+SHEET_SHAPES = [(60, 20), (120, 40), (200, 90)]
+
+
+def build_sheet(roll_numbers, subject_name, days):
+    """Build a long-format attendance workbook (roll_no, subject_name, date, status) in memory"""
+    start = date(2024, 1, 1)
+    statuses = ('Present', 'Absent', 'Late')
+    rows = [
+        (roll_no, subject_name, (start + timedelta(days=d)).isoformat(), statuses[(i + d) % 3])
+        for d in range(days)
+        for i, roll_no in enumerate(roll_numbers)
+    ]
+    df = pd.DataFrame(rows, columns=['roll_no', 'subject_name', 'date', 'status'])
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue(), len(rows)
+
+
+def run(repeat):
+    app = make_app()
+    client = app.test_client()
+    results = []
+
+    try:
+        for students, days in SHEET_SHAPES:
+            with app.app_context():
+                faculty_id, subject_id, _ = seed_class(students)
+            login(client, faculty_id, 'faculty')
+            workbook, row_count = build_sheet(
+                [f'B{students}_{i:04d}' for i in range(students)], f'Bench Subject {students}', days
+            )
+
+            def upload():
+                response = client.post(
+                    '/api/attendance/faculty/upload',
+                    data={'file': (io.BytesIO(workbook), 'attendance.xlsx')},
+                    content_type='multipart/form-data'
+                )
+                assert response.status_code == 200, response.get_json()
+
+            stats = summarize(time_call(upload, repeat))
+            results.append((row_count, stats, row_count / (stats['p50_ms'] / 1000)))
+    finally:
+        cleanup(app)
+
+    print(f"{'rows':>8} | {'p50 ms':>10} | {'mean ms':>10} | {'rows/sec':>10}")
+    print('-' * 48)
+    for row_count, stats, rate in results:
+        print(f"{row_count:>8} | {stats['p50_ms']:>10} | {stats['mean_ms']:>10} | {rate:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='uploads per sheet size (first is all inserts, rest updates)')
+    run(parser.parse_args().repeat)
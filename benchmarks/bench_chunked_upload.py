@@ -0,0 +1,116 @@
+"""
+Chunked Upload Benchmark
+Throughput and peak per-request memory of chunked /api/uploads versus a single multipart /api/upload, plus a deduplicated re-upload
+
+Usage: python -m benchmarks.bench_chunked_upload [--mb N] [--chunk-mb N]
+
+Peak memory is what the server allocates while handling a request (traced
+with tracemalloc from before_request to teardown), so the copies the test
+client makes of each body are left out.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import make_app, login, cleanup
+from database import db
+from models.gecr_models import Faculty
+
+
+def track_request_memory(app):
+    """Record the largest allocation peak of any request into app.request_peak"""
+    app.request_peak = 0
+
+    @app.before_request
+    def reset_peak():
+        tracemalloc.reset_peak()
+        app.request_baseline = tracemalloc.get_traced_memory()[0]
+
+    @app.teardown_request
+    def record_peak(exc):
+        app.request_peak = max(app.request_peak, tracemalloc.get_traced_memory()[1] - app.request_baseline)
+
+
+def measure(app, fn):
+    """(result, seconds, peak bytes allocated by any one request) of fn()"""
+    app.request_peak = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+        return result, time.perf_counter() - started, app.request_peak
+    finally:
+        tracemalloc.stop()
+
+
+def chunked_upload(client, data, chunk_size, filename):
+    response = client.post('/api/uploads', json={'filename': filename, 'size': len(data)})
+    assert response.status_code == 201, response.get_json()
+    upload_id = response.get_json()['upload']['upload_id']
+    view = memoryview(data)
+    for offset in range(0, len(data), chunk_size):
+        chunk = view[offset:offset + chunk_size]
+        response = client.patch(f'/api/uploads/{upload_id}', input_stream=io.BytesIO(chunk),
+                                content_length=len(chunk), headers={'Upload-Offset': str(offset)})
+        assert response.status_code in (200, 201), response.get_json()
+    return response.get_json()
+
+
+def multipart_upload(client, data, filename):
+    response = client.post('/api/upload', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(data), filename)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def run(megabytes, chunk_megabytes):
+    app = make_app(page_routes=True)
+    upload_dir = tempfile.mkdtemp(prefix='gecr_bench_uploads_')
+    chunk_size = chunk_megabytes * 1024 * 1024
+    app.config.update({'UPLOAD_FOLDER': upload_dir, 'FILE_STORE_FOLDER': upload_dir, 'UPLOAD_CHUNK_SIZE': chunk_size, 'UPLOAD_QUOTA_FACULTY': 0,
+                       'MAX_CONTENT_LENGTH': None})
+    try:
+        with app.app_context():
+            faculty = Faculty(name='Bench Faculty', email='bench@gecr.edu', password='x')
+            db.session.add(faculty)
+            db.session.commit()
+            faculty_id = faculty.faculty_id
+        client = app.test_client()
+        login(client, faculty_id, 'faculty')
+        track_request_memory(app)
+
+        data = os.urandom(megabytes * 1024 * 1024)
+        rows = []
+        result, seconds, peak = measure(app, lambda: multipart_upload(client, data, 'single.bin'))
+        rows.append(('multipart /api/upload', seconds, peak, result['deduplicated']))
+        other = os.urandom(len(data))
+        result, seconds, peak = measure(app, lambda: chunked_upload(client, other, chunk_size, 'new.bin'))
+        rows.append((f'chunked, {chunk_megabytes} MB chunks', seconds, peak, result['deduplicated']))
+        result, seconds, peak = measure(app, lambda: chunked_upload(client, data, chunk_size, 'again.bin'))
+        rows.append(('chunked, same content', seconds, peak, result['deduplicated']))
+
+        blobs = sum(len(files) for _, _, files in os.walk(os.path.join(upload_dir, 'blobs')))
+    finally:
+        cleanup(app)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    print(f"{megabytes} MB file\n")
+    print(f"{'upload':<26} | {'seconds':>8} | {'MB/s':>7} | {'peak MB':>8} | {'dedup':>5}")
+    print('-' * 67)
+    for label, seconds, peak, deduplicated in rows:
+        print(f"{label:<26} | {seconds:>8.2f} | {megabytes / seconds:>7.1f} | {peak / 1024 / 1024:>8.1f} | "
+              f"{str(deduplicated):>5}")
+    print(f"\n{len(rows)} uploads stored as {blobs} blobs")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mb', type=int, default=64, help='file size in MB')
+    parser.add_argument('--chunk-mb', type=int, default=8, help='chunk size in MB')
+    args = parser.parse_args()
+    run(args.mb, args.chunk_mb)
@@ -0,0 +1,155 @@
+"""
+Concurrent Attendance Marking Benchmark
+Write throughput of POST /api/attendance/faculty/mark with N marker processes on one SQLite file
+
+Usage: python -m benchmarks.bench_concurrent_marking [--markers 1 4 8] [--readers N] [--seconds S] [--class-size N]
+
+Each marker is a separate process (like a gunicorn worker) marking a new
+day for its own class in a loop, while reader processes load class lists.
+Runs every marker count twice: with SQLite's default connection settings
+and with database.DEFAULT_SQLITE_PRAGMAS.
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, login, cleanup
+
+# Rollback journal, full fsync; sqlite3's own 5 s lock timeout still applies
+DEFAULT_SETTINGS = {
+    'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': None,
+    'mmap_size': None, 'cache_size': None, 'temp_store': None,
+}
+MODES = [('default', DEFAULT_SETTINGS), ('tuned', None)]
+
+
+def seed_classes(markers, class_size):
+    """One faculty + subject + class per marker; returns [(faculty_id, subject_id, student_ids)]"""
+    from database import db
+    from models.gecr_models import Faculty, Subject, Student
+
+    classes = []
+    for m in range(markers):
+        faculty = Faculty(name=f'Marker {m}', email=f'marker{m}@gecr.edu', password='x', department='AI&DS')
+        db.session.add(faculty)
+        db.session.flush()
+        subject = Subject(subject_name=f'Marker Subject {m}', department='AI&DS', semester=5, faculty_id=faculty.faculty_id)
+        db.session.add(subject)
+        db.session.flush()
+        db.session.execute(db.insert(Student), [
+            {'roll_no': f'M{m}_{i:04d}', 'name': f'Student {i}', 'email': f'm{m}_{i}@gecr.edu', 'password': 'x'}
+            for i in range(class_size)
+        ])
+        student_ids = [row[0] for row in db.session.query(Student.student_id).filter(Student.roll_no.like(f'M{m}\\_%', escape='\\'))]
+        classes.append((faculty.faculty_id, subject.subject_id, student_ids))
+    db.session.commit()
+    return classes
+
+
+def marker(db_path, pragmas, faculty_id, subject_id, student_ids, start_at, seconds, results):
+    """Mark one new day per request until the time is up; report (requests, rows, errors, latencies)"""
+    app = make_app(db_path, pragmas)
+    client = app.test_client()
+    login(client, faculty_id, 'faculty')
+    statuses = ('Present', 'Absent', 'Late')
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + seconds
+    day, rows, errors, latencies = 0, 0, 0, []
+    while time.time() < deadline:
+        payload = {
+            'subject_id': subject_id,
+            'date': (date(2024, 1, 1) + timedelta(days=day)).isoformat(),
+            'attendance': [{'student_id': sid, 'status': statuses[(sid + day) % 3]} for sid in student_ids]
+        }
+        day += 1
+        started = time.perf_counter()
+        response = client.post('/api/attendance/faculty/mark', json=payload)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code == 200:
+            rows += len(student_ids)
+        else:
+            errors += 1
+    results.put((day, rows, errors, latencies))
+
+
+def reader(db_path, pragmas, faculty_id, subject_id, start_at, seconds, results):
+    """Load the class list with attendance totals in a loop (students/faculty browsing during marking)"""
+    app = make_app(db_path, pragmas)
+    client = app.test_client()
+    login(client, faculty_id, 'faculty')
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + seconds
+    requests, errors = 0, 0
+    while time.time() < deadline:
+        response = client.get(f'/api/faculty/students?subject_id={subject_id}')
+        response.get_data()
+        requests += 1
+        if response.status_code != 200:
+            errors += 1
+    results.put((requests, errors))
+
+
+def run_mode(pragmas, markers, readers, seconds, class_size):
+    app = make_app(sqlite_pragmas=pragmas)
+    try:
+        with app.app_context():
+            classes = seed_classes(markers, class_size)
+
+        ctx = multiprocessing.get_context('spawn')
+        results, read_results = ctx.Queue(), ctx.Queue()
+        start_at = time.time() + 3 + 0.5 * (markers + readers)  # let every process build its app first
+        processes = [
+            ctx.Process(target=marker, args=(app.bench_db_path, pragmas, *cls, start_at, seconds, results))
+            for cls in classes
+        ] + [
+            ctx.Process(target=reader, args=(app.bench_db_path, pragmas, *classes[r % markers][:2], start_at, seconds, read_results))
+            for r in range(readers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in classes]
+        reads = [read_results.get() for _ in range(readers)]
+        for process in processes:
+            process.join()
+    finally:
+        cleanup(app)
+        for suffix in ('-wal', '-shm', '-journal'):
+            try:
+                os.remove(app.bench_db_path + suffix)
+            except OSError:
+                pass
+
+    requests = sum(c[0] for c in collected)
+    latencies = sorted(latency for c in collected for latency in c[3])
+    return {
+        'requests_per_sec': requests / seconds,
+        'rows_per_sec': sum(c[1] for c in collected) / seconds,
+        'errors': sum(c[2] for c in collected) + sum(r[1] for r in reads),
+        'reads_per_sec': sum(r[0] for r in reads) / seconds,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else 0.0,
+    }
+
+
+def run(markers_list, readers, seconds, class_size):
+    print(f"{'markers':>7} | {'settings':>8} | {'marks/s':>7} | {'rows/s':>8} | {'p95 ms':>8} | {'reads/s':>7} | {'errors':>6}")
+    print('-' * 68)
+    for markers in markers_list:
+        for name, pragmas in MODES:
+            result = run_mode(pragmas, markers, readers, seconds, class_size)
+            print(f"{markers:>7} | {name:>8} | {result['requests_per_sec']:>7.1f} | {result['rows_per_sec']:>8.0f} | "
+                  f"{result['p95_ms']:>8} | {result['reads_per_sec']:>7.1f} | {result['errors']:>6}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--markers', type=int, nargs='+', default=[1, 4, 8], help='concurrent marker processes')
+    parser.add_argument('--seconds', type=float, default=5, help='measured duration per run')
+    parser.add_argument('--readers', type=int, default=2, help='concurrent reader processes loading class lists')
+    parser.add_argument('--class-size', type=int, default=60, help='students marked per request')
+    args = parser.parse_args()
+    run(args.markers, args.readers, args.seconds, args.class_size)
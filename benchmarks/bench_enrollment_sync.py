@@ -0,0 +1,124 @@
+"""
+Enrollment Sync Benchmark
+SQL statements and time of a bulk enrollment upload: the former per-row lookups versus the one-pass roster reconciliation
+
+Usage: python -m benchmarks.bench_enrollment_sync [--roster N] [--new N] [--dropped N] [--missing N]
+
+The subject starts with roster - new students enrolled; `dropped` of them
+are in the 'dropped' state, and `missing` other active students are not on
+the uploaded roster (dropped by the sync with drop_missing). "legacy" is
+the loop the enrollments import job used to run, kept below for reference
+(two queries per roster row). "endpoint" is the whole upload with
+drop_missing, run inline, including the import job's own bookkeeping.
+"""
+
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from benchmarks.common import make_app, login, count_queries, cleanup
+from database import db
+from models.gecr_models import Faculty, Student, Subject, StudentEnrollment
+from utils.enrollment_sync import diff_roster, apply_roster_diff
+
+
+def legacy_enroll(subject_id, values):
+    """The former per-row loop of the enrollments import job (no drops)"""
+    added = skipped = 0
+    for enrollment_no in values:
+        student = Student.query.filter(Student.roll_no == enrollment_no).first()
+        if not student:
+            continue
+        existing = StudentEnrollment.query.filter_by(student_id=student.student_id, subject_id=subject_id).first()
+        if existing:
+            if existing.status == 'dropped':
+                existing.status = 'active'
+                added += 1
+            else:
+                skipped += 1
+            continue
+        db.session.add(StudentEnrollment(student_id=student.student_id, subject_id=subject_id, status='active'))
+        added += 1
+    return added
+
+
+def seed(app, roster, new, dropped, missing):
+    """Students R00000.. (roster first, then the missing ones) and the subject's starting enrollments"""
+    with app.app_context():
+        faculty = Faculty(name='Bench Faculty', email='bench@gecr.edu', password='x')
+        db.session.add(faculty)
+        db.session.flush()
+        subject = Subject(subject_name='Bench Subject', subject_code='BENCH1', faculty_id=faculty.faculty_id)
+        db.session.add(subject)
+        db.session.flush()
+        db.session.execute(db.insert(Student), [
+            {'roll_no': f'R{i:05d}', 'name': f'Student {i}', 'email': f's{i}@gecr.edu', 'password': 'x'}
+            for i in range(roster + missing)
+        ])
+        ids = [student_id for (student_id,) in db.session.query(Student.student_id).order_by(Student.student_id)]
+        enrolled = ids[new:roster] + ids[roster:]
+        db.session.execute(db.insert(StudentEnrollment), [
+            {'student_id': student_id, 'subject_id': subject.subject_id,
+             'status': 'dropped' if position < dropped else 'active'}
+            for position, student_id in enumerate(enrolled)
+        ])
+        db.session.commit()
+        return faculty.faculty_id, subject.subject_id
+
+
+def run(roster, new, dropped, missing):
+    values = [f'R{i:05d}' for i in range(roster)] + ['UNKNOWN1']
+    rows = []
+    for label in ('legacy per-row', 'sync dry run', 'sync apply', 'endpoint'):
+        app = make_app()
+        try:
+            faculty_id, subject_id = seed(app, roster, new, dropped, missing)
+            with app.app_context(), count_queries(app) as queries:
+                started = time.perf_counter()
+                if label == 'legacy per-row':
+                    changed = legacy_enroll(subject_id, values)
+                    db.session.commit()
+                elif label == 'sync dry run':
+                    diff = diff_roster(subject_id, values, drop_missing=True)
+                    changed = len(diff['add']) + len(diff['reactivate']) + len(diff['drop'])
+                elif label == 'sync apply':
+                    counts = apply_roster_diff(subject_id, diff_roster(subject_id, values, drop_missing=True),
+                                               faculty_id=faculty_id)
+                    db.session.commit()
+                    changed = sum(counts.values())
+                else:
+                    client = app.test_client()
+                    login(client, faculty_id, 'faculty', email='bench@gecr.edu')
+                    frame = pd.DataFrame({'roll_no': values})
+                    response = client.post(
+                        f'/api/faculty/subjects/{subject_id}/enrollments/bulk-upload',
+                        content_type='multipart/form-data',
+                        data={'file': (io.BytesIO(frame.to_csv(index=False).encode()), 'roster.csv'),
+                              'drop_missing': 'true'})
+                    job = response.get_json()['job']
+                    assert job['status'] == 'succeeded', job
+                    changed = job['result']['added'] + job['result']['dropped']
+                elapsed = time.perf_counter() - started
+            with app.app_context():
+                active = StudentEnrollment.query.filter_by(subject_id=subject_id, status='active').count()
+            rows.append((label, queries['count'], elapsed * 1000, changed, active))
+        finally:
+            cleanup(app)
+
+    print(f"roster {roster} (+1 unknown), {new} new, {dropped} dropped, {missing} active but missing from the roster\n")
+    print(f"{'mode':<16} | {'queries':>7} | {'ms':>8} | {'changed':>7} | {'active after':>12}")
+    print('-' * 64)
+    for label, count, ms, changed, active in rows:
+        print(f"{label:<16} | {count:>7} | {ms:>8.1f} | {changed:>7} | {active:>12}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--roster', type=int, default=300, help='students in the uploaded roster')
+    parser.add_argument('--new', type=int, default=40, help='roster students not yet enrolled')
+    parser.add_argument('--dropped', type=int, default=20, help='roster students currently dropped')
+    parser.add_argument('--missing', type=int, default=25, help='active students missing from the roster')
+    args = parser.parse_args()
+    run(args.roster, args.new, args.dropped, args.missing)
@@ -0,0 +1,110 @@
+"""
+Faculty Dashboard Benchmark
+Query count and latency of get_faculty_dashboard_data as subjects and assignments grow
+
+Usage: python -m benchmarks.bench_faculty_dashboard [--repeat N]
+
+Exits non-zero if the query count changes with the data size.
+"""
+
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, time_call, summarize, cleanup
+from database import db
+from models.gecr_models import (
+    Faculty, Subject, Student, StudentEnrollment, Assignment, Submission, Announcement, Event
+)
+from utils.dashboard_helpers import get_faculty_dashboard_data
+
+# (subjects, assignments per subject, students per subject)
+SIZES = [(2, 2, 10), (8, 5, 30), (20, 10, 60)]
+
+
+def seed_faculty(subjects, assignments, students):
+    """Create one faculty with the given number of subjects, assignments and (half-graded) submissions"""
+    faculty = Faculty(name='Bench Faculty', email=f'dash{subjects}@gecr.edu', password='x', department='AI&DS')
+    db.session.add(faculty)
+    db.session.flush()
+
+    for s in range(subjects):
+        subject = Subject(subject_name=f'Dash {subjects}.{s}', department='AI&DS', semester=5, faculty_id=faculty.faculty_id)
+        db.session.add(subject)
+        db.session.flush()
+
+        roster = [
+            Student(roll_no=f'D{subjects}_{s}_{i}', name=f'Student {i}', email=f'd{subjects}_{s}_{i}@gecr.edu', password='x')
+            for i in range(students)
+        ]
+        db.session.add_all(roster)
+        db.session.flush()
+        db.session.add_all([
+            StudentEnrollment(student_id=student.student_id, subject_id=subject.subject_id, status='active')
+            for student in roster
+        ])
+
+        for a in range(assignments):
+            assignment = Assignment(
+                title=f'Assignment {s}.{a}', subject_id=subject.subject_id, faculty_id=faculty.faculty_id,
+                due_date=date(2024, 1, 1) + timedelta(days=a)
+            )
+            db.session.add(assignment)
+            db.session.flush()
+            db.session.add_all([
+                Submission(assignment_id=assignment.assignment_id, student_id=student.student_id,
+                           submitted_at=date(2024, 1, 1), grade='A' if i % 2 else None)
+                for i, student in enumerate(roster)
+            ])
+
+    db.session.add_all([
+        Announcement(title=f'Notice {i}', message='x', author_id=faculty.faculty_id) for i in range(5)
+    ] + [
+        Event(title=f'Event {i}', start_time=datetime(2024, 1, 1 + i), created_by=faculty.faculty_id) for i in range(5)
+    ])
+    db.session.commit()
+    return faculty.faculty_id
+
+
+def run(repeat):
+    app = make_app()
+    results = []
+    try:
+        with app.app_context():
+            queries = {'count': 0}
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.__setitem__('count', queries['count'] + 1))
+
+            for subjects, assignments, students in SIZES:
+                faculty_id = seed_faculty(subjects, assignments, students)
+                db.session.expire_all()
+
+                queries['count'] = 0
+                data = get_faculty_dashboard_data(faculty_id)
+                assert data is not None
+                query_count = queries['count']
+
+                def load():
+                    db.session.expire_all()
+                    get_faculty_dashboard_data(faculty_id)
+
+                results.append((subjects, subjects * assignments, query_count, summarize(time_call(load, repeat))))
+    finally:
+        cleanup(app)
+
+    print(f"{'subjects':>8} | {'assignments':>11} | {'queries':>7} | {'p50 ms':>8}")
+    print('-' * 45)
+    for subjects, assignments, query_count, stats in results:
+        print(f"{subjects:>8} | {assignments:>11} | {query_count:>7} | {stats['p50_ms']:>8}")
+
+    if len({query_count for _, _, query_count, _ in results}) != 1:
+        print('FAIL: query count grows with the data size')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    sys.exit(run(parser.parse_args().repeat))
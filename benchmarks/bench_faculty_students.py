@@ -0,0 +1,90 @@
+"""
+Faculty Student List Benchmark
+Latency and query count of GET /api/faculty/students for a department-wide list
+
+Usage: python -m benchmarks.bench_faculty_students [--students N] [--repeat N]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, login, time_call, summarize, cleanup
+from database import db, upgrade_schema
+from models.gecr_models import Faculty, Subject, Student, StudentEnrollment, Attendance
+
+SUBJECTS = 6
+DAYS = 10
+
+
+def seed_department(students):
+    """Create one faculty, SUBJECTS subjects and `students` students enrolled in all of them with DAYS of attendance"""
+    faculty = Faculty(name='Bench Faculty', email='bench@gecr.edu', password='x', department='AI&DS')
+    db.session.add(faculty)
+    db.session.flush()
+
+    subjects = [
+        Subject(subject_name=f'Bench Subject {i}', department='AI&DS', semester=5, faculty_id=faculty.faculty_id)
+        for i in range(SUBJECTS)
+    ]
+    db.session.add_all(subjects)
+    db.session.flush()
+
+    db.session.execute(db.insert(Student), [
+        {'roll_no': f'R{i:05d}', 'name': f'Student {i:05d}', 'email': f's{i}@gecr.edu',
+         'password': 'x', 'department': 'AI&DS', 'semester': 5}
+        for i in range(students)
+    ])
+    student_ids = [row[0] for row in db.session.query(Student.student_id)]
+
+    db.session.execute(db.insert(StudentEnrollment), [
+        {'student_id': sid, 'subject_id': subject.subject_id, 'status': 'active'}
+        for sid in student_ids for subject in subjects
+    ])
+    statuses = ('Present', 'Absent', 'Late', 'Present')
+    db.session.execute(db.insert(Attendance), [
+        {'student_id': sid, 'subject_id': subject.subject_id,
+         'date': date(2024, 1, 1) + timedelta(days=d), 'status': statuses[(sid + d) % 4]}
+        for sid in student_ids for subject in subjects for d in range(DAYS)
+    ])
+    db.session.commit()
+
+    # Backfills attendance_summary where that table exists
+    upgrade_schema()
+    return faculty.faculty_id
+
+
+def run(students, repeat):
+    app = make_app()
+    client = app.test_client()
+    try:
+        with app.app_context():
+            faculty_id = seed_department(students)
+            queries = {'count': 0}
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.__setitem__('count', queries['count'] + 1))
+        login(client, faculty_id, 'faculty')
+
+        def fetch():
+            response = client.get('/api/faculty/students')
+            assert response.status_code == 200
+            assert len(response.get_json()) == students
+
+        fetch()  # warm-up
+        queries['count'] = 0
+        fetch()
+        query_count = queries['count']
+        stats = summarize(time_call(fetch, repeat))
+    finally:
+        cleanup(app)
+
+    print(f"students: {students}  queries/request: {query_count}  "
+          f"p50: {stats['p50_ms']} ms  mean: {stats['mean_ms']} ms  max: {stats['max_ms']} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.students, args.repeat)
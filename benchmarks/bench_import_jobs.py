@@ -0,0 +1,96 @@
+"""
+Import Job Benchmark
+How long POST /api/faculty/attendance/upload holds the request when the import runs inline versus as a background job
+
+Usage: python -m benchmarks.bench_import_jobs [--students N] [--dates N] [--chunk-rows N]
+
+The sheet is wide-format (Roll No plus one column per date) for one
+subject with every student enrolled. "request" is the time until the
+upload answers; "finished" is the time until GET /api/jobs/<id> reports
+the job done, polling every 50 ms.
+"""
+
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from benchmarks.common import make_app, login, cleanup
+from database import db
+from models.gecr_models import Faculty, Student, Subject, StudentEnrollment
+from utils.jobs import import_jobs
+
+
+def build_sheet(students, dates):
+    columns = {'Roll No': [f'R{i:05d}' for i in range(students)]}
+    for day in pd.date_range('2026-07-01', periods=dates):
+        columns[day.strftime('%d/%m/%Y')] = ['P' if (i + day.day) % 5 else 'A' for i in range(students)]
+    buffer = io.BytesIO()
+    pd.DataFrame(columns).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def run(students, dates, chunk_rows):
+    app = make_app()
+    workbook = build_sheet(students, dates)
+    rows = []
+    try:
+        with app.app_context():
+            faculty = Faculty(name='Bench Faculty', email='bench@gecr.edu', password='x')
+            db.session.add(faculty)
+            db.session.flush()
+            subject = Subject(subject_name='Bench Subject', subject_code='BENCH1', faculty_id=faculty.faculty_id)
+            db.session.add(subject)
+            db.session.flush()
+            db.session.execute(db.insert(Student), [
+                {'roll_no': f'R{i:05d}', 'name': f'Student {i}', 'email': f's{i}@gecr.edu', 'password': 'x'}
+                for i in range(students)
+            ])
+            db.session.execute(db.insert(StudentEnrollment), [
+                {'student_id': student_id, 'subject_id': subject.subject_id, 'status': 'active'}
+                for (student_id,) in db.session.query(Student.student_id)
+            ])
+            db.session.commit()
+            faculty_id, subject_id = faculty.faculty_id, subject.subject_id
+        client = app.test_client()
+        login(client, faculty_id, 'faculty', email='bench@gecr.edu')
+
+        import_jobs.chunk_rows = chunk_rows
+        for label, workers in (('inline (IMPORT_JOB_WORKERS=0)', 0), ('background job', 2)):
+            import_jobs.workers = workers
+            started = time.perf_counter()
+            response = client.post('/api/faculty/attendance/upload', content_type='multipart/form-data',
+                                   data={'file': (io.BytesIO(workbook), 'attendance.xlsx'),
+                                         'subject_id': str(subject_id)})
+            answered = time.perf_counter() - started
+            assert response.status_code in (200, 202), response.get_json()
+            job = response.get_json()['job']
+            polls = 0
+            while job['status'] in ('queued', 'running'):
+                time.sleep(0.05)
+                job = client.get(f"/api/jobs/{job['job_id']}").get_json()['job']
+                polls += 1
+            finished = time.perf_counter() - started
+            assert job['status'] == 'succeeded', job
+            rows.append((label, response.status_code, answered, finished, job['chunks_done'], polls,
+                         job['result']['records_inserted'] + job['result']['records_updated']))
+    finally:
+        cleanup(app)
+
+    print(f"{students} students x {dates} dates, {chunk_rows} rows per chunk\n")
+    print(f"{'mode':<30} | {'status':>6} | {'request s':>9} | {'finished s':>10} | {'chunks':>6} | "
+          f"{'polls':>5} | {'records':>8}")
+    print('-' * 92)
+    for label, status, answered, finished, chunks, polls, records in rows:
+        print(f"{label:<30} | {status:>6} | {answered:>9.3f} | {finished:>10.2f} | {chunks:>6} | "
+              f"{polls:>5} | {records:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000, help='rows in the sheet')
+    parser.add_argument('--dates', type=int, default=30, help='date columns in the sheet')
+    parser.add_argument('--chunk-rows', type=int, default=500, help='IMPORT_JOB_CHUNK_ROWS')
+    args = parser.parse_args()
+    run(args.students, args.dates, args.chunk_rows)
@@ -0,0 +1,75 @@
+"""
+Notification Fan-out Benchmark
+Latency and peak Python memory of POST /api/faculty/announcements as the student body grows
+
+Usage: python -m benchmarks.bench_notification_fanout [--repeat N]
+"""
+
+import argparse
+import tracemalloc
+
+from benchmarks.common import make_app, login, time_call, summarize, cleanup
+from database import db
+from models.gecr_models import Faculty, Student, BroadcastNotification
+
+STUDENT_COUNTS = [500, 5000, 50000]
+
+
+def seed_students(count, start=0):
+    """Insert `count` students (ids continue from `start`) spread over two departments"""
+    db.session.execute(db.insert(Student), [
+        {'roll_no': f'N{i:06d}', 'name': f'Student {i:06d}', 'email': f'n{i}@gecr.edu', 'password': 'x',
+         'department': 'AI&DS' if i % 2 else 'Computer Engineering', 'semester': i % 8 + 1}
+        for i in range(start, start + count)
+    ])
+    db.session.commit()
+
+
+def run(repeat):
+    app = make_app()
+    client = app.test_client()
+    results = []
+
+    try:
+        with app.app_context():
+            faculty = Faculty(name='Bench Faculty', email='bench@gecr.edu', password='x', department='AI&DS')
+            db.session.add(faculty)
+            db.session.commit()
+            faculty_id = faculty.faculty_id
+        login(client, faculty_id, 'faculty')
+
+        seeded = 0
+        for students in STUDENT_COUNTS:
+            with app.app_context():
+                seed_students(students - seeded, seeded)
+            seeded = students
+
+            def announce():
+                response = client.post('/api/faculty/announcements', json={'title': 'Bench', 'message': 'Hello'})
+                assert response.status_code == 201
+                assert response.get_json()['notifications_sent'] == students
+
+            tracemalloc.start()
+            announce()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            stats = summarize(time_call(announce, repeat))
+            results.append((students, stats, peak))
+
+            with app.app_context():
+                db.session.query(BroadcastNotification).delete()
+                db.session.commit()
+    finally:
+        cleanup(app)
+
+    print(f"{'students':>9} | {'p50 ms':>10} | {'mean ms':>10} | {'peak KiB':>10}")
+    print('-' * 48)
+    for students, stats, peak in results:
+        print(f"{students:>9} | {stats['p50_ms']:>10} | {stats['mean_ms']:>10} | {peak / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='announcements per student count')
+    run(parser.parse_args().repeat)
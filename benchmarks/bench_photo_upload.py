@@ -0,0 +1,84 @@
+"""
+Profile Photo Upload Benchmark
+Upload request latency with photos resized inline (IMAGE_WORKERS=0) and on the background image pipeline
+
+Usage: python -m benchmarks.bench_photo_upload [--width N] [--height N] [--repeat N] [--workers N]
+
+Uploads a phone-sized JPEG (with an EXIF orientation tag) and also reports
+how long the background pool takes until the status endpoint says 'ready'.
+"""
+
+import argparse
+import io
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from benchmarks.common import make_app, login, summarize, cleanup
+from database import db
+from models.gecr_models import Student
+from utils.image_pipeline import image_pipeline
+
+
+def phone_photo(width, height):
+    """A JPEG shaped like a phone camera shot, rotated by its EXIF Orientation tag"""
+    image = Image.merge('RGB', [Image.linear_gradient('L').resize((width, height))] * 2
+                        + [Image.radial_gradient('L').resize((width, height))])
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def run(width, height, repeat, workers):
+    photo = phone_photo(width, height)
+    results = {}
+    for mode, image_workers in (('inline', 0), (f'{workers} workers', workers)):
+        app = make_app(page_routes=True)
+        upload_dir = tempfile.mkdtemp(prefix='gecr_bench_uploads_')
+        app.config.update({'UPLOAD_FOLDER': upload_dir, 'IMAGE_WORKERS': image_workers})
+        image_pipeline.init_app(app)
+        try:
+            with app.app_context():
+                student = Student(roll_no='B001', name='Bench Student', email='bench@gecr.edu', password='x')
+                db.session.add(student)
+                db.session.commit()
+                student_id = student.student_id
+            client = app.test_client()
+            login(client, student_id, 'student')
+
+            request_ms, ready_ms = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.post('/student/upload-photo', content_type='multipart/form-data',
+                                       data={'photo': (io.BytesIO(photo), 'IMG_0001.JPG')})
+                request_ms.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 302, response.status_code
+                while client.get('/profile/photo-status').get_json()['status'] == 'processing':
+                    time.sleep(0.005)
+                ready_ms.append((time.perf_counter() - started) * 1000)
+            assert client.get('/profile/photo-status').get_json()['status'] == 'ready'
+            results[mode] = (summarize(request_ms), summarize(ready_ms))
+        finally:
+            cleanup(app)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+    print(f"{width}x{height} JPEG, {len(photo) // 1024} KiB, {repeat} uploads per mode\n")
+    print(f"{'mode':<12} | {'request p50':>11} | {'request p95':>11} | {'ready p50':>9} | {'ready p95':>9}")
+    print('-' * 65)
+    for mode, (request_stats, ready_stats) in results.items():
+        print(f"{mode:<12} | {request_stats['p50_ms']:>11} | {request_stats['p95_ms']:>11} | "
+              f"{ready_stats['p50_ms']:>9} | {ready_stats['p95_ms']:>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=4032, help='photo width in pixels')
+    parser.add_argument('--height', type=int, default=3024, help='photo height in pixels')
+    parser.add_argument('--repeat', type=int, default=10, help='uploads per mode')
+    parser.add_argument('--workers', type=int, default=2, help='IMAGE_WORKERS for the background run')
+    args = parser.parse_args()
+    run(args.width, args.height, args.repeat, args.workers)
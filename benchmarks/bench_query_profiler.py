@@ -0,0 +1,114 @@
+"""
+Query Profiler Benchmark
+Request latency without the profiler, with its hooks installed but not sampling, and profiling every request
+
+Usage: python -m benchmarks.bench_query_profiler [--students N] [--repeat N]
+
+Also prints the statement counts and likely N+1 statements the profiler
+found on each endpoint.
+"""
+
+import argparse
+import logging
+import time
+
+from benchmarks.common import make_app, login, time_call, summarize, cleanup
+from benchmarks.bench_faculty_students import seed_department
+from database import db
+from utils.query_profiler import QueryProfiler, _before_cursor_execute, _after_cursor_execute
+
+
+def endpoints(faculty_id, student_id):
+    return [
+        ('faculty', faculty_id, '/api/faculty/students'),
+        ('student', student_id, '/api/attendance/student/overview'),
+        ('student', student_id, '/api/enrollment/student/available-subjects'),
+    ]
+
+
+def unsampled_hook_ns(calls=200000):
+    """Cost of the cursor hooks per statement on a request that was not sampled"""
+    class Connection:
+        info = {}
+
+    connection = Connection()
+    started = time.perf_counter()
+    for _ in range(calls):
+        _before_cursor_execute(connection, None, 'SELECT 1', (), None, False)
+        _after_cursor_execute(connection, None, 'SELECT 1', (), None, False)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def run(students, repeat):
+    plain = make_app()
+    try:
+        with plain.app_context():
+            faculty_id = seed_department(students)
+            db.session.close()
+        student_id = 1
+
+        profiled = make_app(plain.bench_db_path)
+        profiled.config['QUERY_PROFILER_SAMPLE_RATE'] = 1.0
+        profiled.config['QUERY_PROFILER_REPEAT_THRESHOLD'] = 5
+        profiler = QueryProfiler(profiled)
+        logging.getLogger('utils.query_profiler').setLevel(logging.ERROR)  # counted in the summary instead
+
+        def client_for(app, user_type, user_id):
+            client = app.test_client()
+            login(client, user_id, user_type)
+            return client
+
+        def request_fn(client, url, sample_rate=None):
+            def call():
+                if sample_rate is not None:
+                    profiler.sample_rate = sample_rate
+                response = client.get(url)
+                response.get_data()
+                assert response.status_code == 200, (url, response.status_code)
+                return response
+            return call
+
+        rows = []
+        for user_type, user_id, url in endpoints(faculty_id, student_id):
+            plain_client = client_for(plain, user_type, user_id)
+            profiled_client = client_for(profiled, user_type, user_id)
+            modes = {
+                'no profiler': request_fn(plain_client, url),
+                'hooks, rate 0': request_fn(profiled_client, url, 0.0),
+                'rate 1': request_fn(profiled_client, url, 1.0),
+            }
+            for call in modes.values():
+                call()  # warm up
+            timings = {name: [] for name in modes}
+            for _ in range(repeat):  # interleave so drift hits every mode alike
+                for name, call in modes.items():
+                    timings[name] += time_call(call, 1)
+
+            profiler.sample_rate = 1.0
+            server_timing = request_fn(profiled_client, url)().headers.get('Server-Timing')
+            rows.append((url, {name: summarize(values) for name, values in timings.items()}, server_timing))
+    finally:
+        cleanup(plain)
+
+    print(f"{'endpoint':<45} | {'mode':>13} | {'p50 ms':>8} | {'mean ms':>8} | {'overhead':>8}")
+    print('-' * 95)
+    for url, stats, _ in rows:
+        base = stats['no profiler']['p50_ms']
+        for name, result in stats.items():
+            overhead = (result['p50_ms'] / base - 1) * 100 if base else 0.0
+            print(f"{url:<45} | {name:>13} | {result['p50_ms']:>8} | {result['mean_ms']:>8} | {overhead:>7.1f}%")
+
+    print(f"\nUnsampled hook cost: {unsampled_hook_ns():.0f} ns per statement (wall-clock deltas above are mostly noise)")
+    for url, _, server_timing in rows:
+        print(f"{url}: Server-Timing {server_timing}")
+    for entry in profiler.slowest():
+        print(f"{entry['endpoint']}: {entry['avg_queries']} queries/request, "
+              f"{entry['avg_db_ms']} ms DB, N+1 flagged on {entry['n_plus_one']}/{entry['requests']} requests")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=300, help='students in the seeded department')
+    parser.add_argument('--repeat', type=int, default=100, help='requests per endpoint and mode')
+    args = parser.parse_args()
+    run(args.students, args.repeat)
@@ -0,0 +1,194 @@
+"""
+Sheet Parser Benchmark
+Throughput of the columnar sheet parser against the row-at-a-time parsers it replaced, on a corpus of large sheets
+
+Usage: python -m benchmarks.bench_sheet_parser [--students N] [--attendance-rows N] [--dates N] [--repeat N] [--keep DIR]
+
+The corpus is generated once: a student sheet (Roll No, Name, Email,
+Password, Department, Semester, Phone; ~1% of rows with a missing name or
+a bad email) and a wide attendance sheet (Roll No, Name, one column per
+date), each as .xlsx and .csv. "legacy" are the previous parsers kept
+below for reference: pandas.read_excel with iterrows for students and
+openpyxl cell by cell for attendance; they could not read CSV. Both sides
+are checked to produce the same students / records before timing.
+
+On .xlsx most of the time on both sides is openpyxl parsing the sheet XML
+(pandas writes inline strings, its slowest case); the columnar side only
+removes the per-cell Python work after that.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+
+from utils.excel_parser import stream_attendance_excel, _parse_header_date, ROLL_COLUMNS, METADATA_COLUMNS
+from utils.sheet_parser import STATUS_CODES, cell_text
+from utils.student_parser import parse_students_excel
+
+STATUSES = ['P', 'P', 'P', 'A', 'L', '', 'Present', '1', '0']
+
+
+def legacy_students(path):
+    """The former utils.student_parser.parse_students_excel loop (student dicts, row errors)"""
+    df = pd.read_excel(path)
+    df.columns = df.columns.str.strip().str.lower()
+    columns = {'roll_no': 'roll no', 'name': 'name', 'email': 'email', 'password': 'password',
+               'department': 'department', 'semester': 'semester', 'phone': 'phone'}
+    students, errors = [], []
+    for idx, row in df.iterrows():
+        roll_no = str(row[columns['roll_no']]).strip()
+        if roll_no.lower() in ['nan', 'roll no', '']:
+            continue
+        name = str(row[columns['name']]).strip()
+        if name.lower() in ['nan', 'name', '']:
+            errors.append(f"Row {idx + 2}: Name is required")
+            continue
+        email = str(row[columns['email']]).strip()
+        if email.lower() in ['nan', 'email', '']:
+            errors.append(f"Row {idx + 2}: Email is required")
+            continue
+        if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
+            errors.append(f"Row {idx + 2}: Invalid email format: {email}")
+            continue
+        password = str(row['password']).strip() if pd.notna(row.get('password')) else 'student123'
+        department = str(row['department']).strip() if pd.notna(row.get('department')) else None
+        semester = None
+        if pd.notna(row.get('semester')):
+            try:
+                semester = int(row['semester'])
+            except (TypeError, ValueError):
+                pass
+        phone = str(row['phone']).strip() if pd.notna(row.get('phone')) else None
+        students.append({'roll_no': roll_no, 'name': name, 'email': email, 'password': password,
+                         'department': department, 'semester': semester, 'phone': phone})
+    return students, errors
+
+
+def legacy_attendance(path):
+    """The former utils.excel_parser.stream_attendance_excel loop, collected into (roll_no, date, status) tuples"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows)
+        roll_col_idx, dates, date_columns = None, [], []
+        for idx, header in enumerate(headers):
+            header_lower = cell_text(header).lower()
+            if header_lower in ROLL_COLUMNS:
+                roll_col_idx = idx if roll_col_idx is None else roll_col_idx
+            elif header_lower not in METADATA_COLUMNS:
+                date_obj = _parse_header_date(header)
+                if date_obj:
+                    dates.append(date_obj)
+                    date_columns.append(idx)
+        records = []
+        for row in rows:
+            roll_no = cell_text(row[roll_col_idx])
+            if roll_no.lower() in ['', 'roll no', 'roll_no', 'nan', 'none']:
+                continue
+            for date_obj, col_idx in zip(dates, date_columns):
+                status = STATUS_CODES.get(cell_text(row[col_idx]).upper())
+                if status:
+                    records.append((roll_no, date_obj, status))
+        return records
+    finally:
+        workbook.close()
+
+
+def engine_students(path):
+    parsed = parse_students_excel(path)
+    return parsed['students'], parsed['errors']
+
+
+def engine_attendance(path):
+    parsed = stream_attendance_excel(path)
+    return [record for batch in parsed['batches'] for record in batch]
+
+
+def build_corpus(directory, students, attendance_rows, dates):
+    """Write the corpus sheets; returns {name: (rows, cells, {format: path})}"""
+    student_frame = pd.DataFrame({
+        'Roll No': [f'22CE{i:06d}' for i in range(students)],
+        'Name': ['' if i % 173 == 5 else f'Student {i}' for i in range(students)],
+        'Email': [f'student{i}@gecr.edu' if i % 131 != 7 else f'student{i}.gecr.edu' for i in range(students)],
+        'Password': [f'pw{i}' if i % 3 else '' for i in range(students)],
+        'Department': ['Computer Engineering', 'Civil Engineering', 'Mechanical Engineering', ''] * (students // 4)
+        + [''] * (students % 4),
+        'Semester': [1 + i % 8 for i in range(students)],
+        'Phone': [f'98{i:08d}' for i in range(students)],
+    })
+    attendance = {'Roll No': [f'22CE{i:06d}' for i in range(attendance_rows)],
+                  'Name': [f'Student {i}' for i in range(attendance_rows)]}
+    for day in pd.date_range('2026-07-01', periods=dates):
+        attendance[day.strftime('%d/%m/%Y')] = [STATUSES[(i * 7 + day.day) % len(STATUSES)]
+                                                for i in range(attendance_rows)]
+    attendance_frame = pd.DataFrame(attendance)
+
+    corpus = {}
+    for name, frame in (('students', student_frame), ('attendance', attendance_frame)):
+        paths = {}
+        for extension in ('xlsx', 'csv'):
+            paths[extension] = os.path.join(directory, f'{name}.{extension}')
+            if extension == 'csv':
+                frame.to_csv(paths[extension], index=False)
+            else:
+                frame.to_excel(paths[extension], index=False)
+        corpus[name] = (len(frame), frame.size, paths)
+    return corpus
+
+
+def best_of(fn, path, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(path)
+        durations.append(time.perf_counter() - started)
+    return min(durations), result
+
+
+def run(students, attendance_rows, dates, repeat, keep):
+    directory = keep or tempfile.mkdtemp(prefix='gecr_sheets_')
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    corpus = build_corpus(directory, students, attendance_rows, dates)
+    print(f"Corpus written to {directory} in {time.perf_counter() - started:.1f} s\n")
+
+    parsers = {'students': (legacy_students, engine_students), 'attendance': (legacy_attendance, engine_attendance)}
+    rows = []
+    try:
+        for name, (row_count, cell_count, paths) in corpus.items():
+            legacy, engine = parsers[name]
+            legacy_seconds, expected = best_of(legacy, paths['xlsx'], repeat)
+            rows.append((name, 'xlsx', 'legacy', row_count, cell_count, legacy_seconds, None))
+            for extension, path in paths.items():
+                seconds, result = best_of(engine, path, repeat)
+                assert result == expected, f'{name}.{extension}: engine output differs from the legacy parser'
+                rows.append((name, extension, 'columnar', row_count, cell_count, seconds, legacy_seconds / seconds))
+    finally:
+        if not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"best of {repeat}; students: {students} rows x 7 columns, attendance: {attendance_rows} rows x {dates} dates\n")
+    print(f"{'sheet':<11} | {'format':<6} | {'parser':<8} | {'rows':>7} | {'cells':>8} | {'seconds':>7} | "
+          f"{'rows/s':>9} | {'cells/s':>10} | {'speedup':>7}")
+    print('-' * 97)
+    for name, extension, parser, row_count, cell_count, seconds, speedup in rows:
+        print(f"{name:<11} | {extension:<6} | {parser:<8} | {row_count:>7} | {cell_count:>8} | {seconds:>7.2f} | "
+              f"{row_count / seconds:>9.0f} | {cell_count / seconds:>10.0f} | "
+              f"{f'{speedup:.1f}x' if speedup else '':>7}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000, help='rows in the student sheet')
+    parser.add_argument('--attendance-rows', type=int, default=3000, help='rows in the attendance sheet')
+    parser.add_argument('--dates', type=int, default=90, help='date columns in the attendance sheet')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per parser; the fastest counts')
+    parser.add_argument('--keep', metavar='DIR', help='write the corpus to DIR and keep it')
+    args = parser.parse_args()
+    run(args.students, args.attendance_rows, args.dates, args.repeat, args.keep)
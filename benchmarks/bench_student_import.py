@@ -0,0 +1,83 @@
+"""
+Student Import Benchmark
+Time per stage and SQL statements of the student import behind POST /api/faculty/students/upload
+
+Usage: python -m benchmarks.bench_student_import [--students N] [--existing N] [--workers N ...]
+
+Password hashing (PBKDF2, ~0.3 s per password on one core) dominates; the
+statement count stays flat as the sheet grows. `--existing` students are
+already in the database and are skipped. The sheet is parsed the way the
+import job parses it, then imported in one chunk.
+"""
+
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from benchmarks.common import make_app, count_queries, cleanup
+from database import db
+from models.gecr_models import Student
+from utils.student_import import import_students
+from utils.student_parser import parse_students_excel
+
+
+def build_sheet(students, prefix):
+    frame = pd.DataFrame([
+        (f'{prefix}{i:05d}', f'Student {i}', f'{prefix.lower()}{i}@gecr.edu', 'Computer Engineering', 1 + i % 8)
+        for i in range(students)
+    ], columns=['Roll No', 'Name', 'Email', 'Department', 'Semester'])
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def run(students, existing, worker_counts):
+    rows = []
+    for workers in worker_counts:
+        app = make_app()
+        prefix = f'W{workers}R'
+        try:
+            with app.app_context():
+                db.session.execute(db.insert(Student), [
+                    {'roll_no': f'{prefix}{i:05d}', 'name': f'Existing {i}', 'email': f'{prefix.lower()}{i}@gecr.edu',
+                     'password': 'x'} for i in range(existing)
+                ])
+                db.session.commit()
+
+                stages = {}
+                started = last = time.perf_counter()
+                students_data = parse_students_excel(io.BytesIO(build_sheet(students, prefix)))['students']
+                stages['parse'] = time.perf_counter() - last
+                with count_queries(app) as queries:
+                    last = time.perf_counter()
+                    for step in import_students(students_data, workers):
+                        now = time.perf_counter()
+                        stages[step['stage']] = stages.get(step['stage'], 0) + now - last
+                        last = now
+                        final = step
+                total = time.perf_counter() - started
+            assert final['stage'] == 'done', final
+            final = {'created': len(final['result']['created']), 'skipped': len(final['result']['skipped'])}
+            rows.append((workers, final, stages, total, queries['count']))
+        finally:
+            cleanup(app)
+
+    print(f"{students} rows, {existing} already exist\n")
+    print(f"{'workers':>7} | {'created':>7} | {'skipped':>7} | {'parse s':>7} | {'check s':>7} | {'hash s':>7} | "
+          f"{'insert s':>8} | {'total s':>7} | {'statements':>10}")
+    print('-' * 94)
+    for workers, final, stages, total, statements in rows:
+        print(f"{workers:>7} | {final['created']:>7} | {final['skipped']:>7} | {stages['parse']:>7.2f} | "
+              f"{stages.get('checking', 0):>7.2f} | {stages.get('hashing', 0):>7.2f} | "
+              f"{stages.get('inserting', 0):>8.2f} | {total:>7.2f} | {statements:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=100, help='rows in the sheet')
+    parser.add_argument('--existing', type=int, default=10, help='rows already in the database')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='PASSWORD_HASH_WORKERS values to try')
+    args = parser.parse_args()
+    run(args.students, args.existing, args.workers)
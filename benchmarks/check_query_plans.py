@@ -0,0 +1,157 @@
+"""
+Query Plan Check
+Runs the hot endpoints against seeded data and EXPLAIN QUERY PLANs every statement they issue
+
+Usage: python -m benchmarks.check_query_plans [--students N] [--verbose]
+
+Exits non-zero if any statement does a full table scan of a large table.
+"""
+
+import argparse
+import re
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, login, cleanup
+from benchmarks.bench_faculty_students import seed_department
+from database import db
+from models.gecr_models import (
+    Subject, Student, Timetable, Assignment, Submission, Notification
+)
+from utils.dashboard_helpers import get_faculty_dashboard_data, get_student_dashboard_data
+from utils.notifications import broadcast_to_students
+
+# Tables that grow with students x subjects x days; a plain SCAN of one is a regression
+LARGE_TABLES = {
+    'attendance', 'attendance_summary', 'student_enrollments', 'notifications',
+    'notification_receipts', 'submissions', 'assignments', 'timetable',
+}
+
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING)')
+
+
+def seed_schedule_and_work(faculty_id):
+    """Timetable slots for today, assignments with submissions and notifications for the seeded department"""
+    today = datetime.now().strftime('%A')
+    subjects = Subject.query.filter_by(faculty_id=faculty_id).all()
+    student_ids = [row[0] for row in db.session.query(Student.student_id)]
+
+    for slot, subject in enumerate(subjects):
+        db.session.add(Timetable(department='AI&DS', semester=5, day_of_week=today, subject_id=subject.subject_id,
+                                 faculty_id=faculty_id, time_slot=f'{9 + slot:02d}:00-{10 + slot:02d}:00'))
+        for a in range(3):
+            assignment = Assignment(title=f'Plan {subject.subject_id}.{a}', subject_id=subject.subject_id,
+                                    faculty_id=faculty_id, due_date=date(2030, 1, 1 + a))
+            db.session.add(assignment)
+            db.session.flush()
+            db.session.execute(db.insert(Submission), [
+                {'assignment_id': assignment.assignment_id, 'student_id': sid,
+                 'submitted_at': date(2024, 1, 1), 'grade': 'A' if sid % 2 else None}
+                for sid in student_ids
+            ])
+
+    db.session.execute(db.insert(Notification), [
+        {'user_id': sid, 'user_type': 'student', 'title': 'Personal', 'message': 'm', 'read': bool(sid % 3)}
+        for sid in student_ids
+    ] + [
+        {'user_id': faculty_id, 'user_type': 'faculty', 'title': f'RSVP {i}', 'message': 'm', 'read': bool(i % 2)}
+        for i in range(50)
+    ])
+    broadcast_to_students('Broadcast', 'm', 'announcement', department='AI&DS')
+    db.session.commit()
+    return subjects[0].subject_id, student_ids
+
+
+def capture_statements(app, calls):
+    """Run calls() and return the distinct (statement, parameters) pairs it sent to the database"""
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+            statements.setdefault(statement, parameters)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        calls()
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def explain(app, statements):
+    """EXPLAIN QUERY PLAN each statement; return [(statement, plan lines, scanned large tables)]"""
+    results = []
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in statements.items():
+                plan = [row[-1] for row in cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scanned = sorted({table for line in plan for table in FULL_SCAN.findall(line)
+                                  if table in LARGE_TABLES})
+                results.append((statement, plan, scanned))
+        finally:
+            connection.close()
+    return results
+
+
+def run(students, verbose):
+    app = make_app()
+    try:
+        with app.app_context():
+            faculty_id = seed_department(students)
+            subject_id, student_ids = seed_schedule_and_work(faculty_id)
+        student_id = student_ids[0]
+
+        faculty_client = app.test_client()
+        login(faculty_client, faculty_id, 'faculty')
+        student_client = app.test_client()
+        login(student_client, student_id, 'student', email=f's{student_id - 1}@gecr.edu')
+
+        def hot_paths():
+            for client, method, url, body in [
+                (faculty_client, 'get', '/api/faculty/students', None),
+                (faculty_client, 'get', f'/api/faculty/students?subject_id={subject_id}&limit=50', None),
+                (faculty_client, 'get', '/api/faculty/notifications/unread-count', None),
+                (faculty_client, 'get', '/api/faculty/notifications?limit=5', None),
+                (faculty_client, 'post', '/api/attendance/faculty/mark', {
+                    'subject_id': subject_id, 'date': '2024-01-02',
+                    'attendance': [{'student_id': sid, 'status': 'Present'} for sid in student_ids[:50]]
+                }),
+                (student_client, 'get', '/api/student/attendance', None),
+                (student_client, 'get', '/api/student/attendance?start_date=2024-01-01&end_date=2024-01-05', None),
+                (student_client, 'get', '/api/student/subjects', None),
+                (student_client, 'get', '/api/student/notifications', None),
+            ]:
+                response = getattr(client, method)(url, json=body)
+                response.get_data()  # drain streamed bodies so their queries run
+                assert response.status_code == 200, (url, response.status_code)
+            with app.app_context():
+                get_faculty_dashboard_data(faculty_id)
+                get_student_dashboard_data(student_id)
+
+        results = explain(app, capture_statements(app, hot_paths))
+    finally:
+        cleanup(app)
+
+    failures = [result for result in results if result[2]]
+    for statement, plan, scanned in results:
+        if scanned or verbose:
+            print(('FULL SCAN of ' + ', '.join(scanned)) if scanned else 'ok')
+            print('  ' + ' '.join(statement.split())[:300])
+            for line in plan:
+                print('    ' + line)
+    print(f"{len(results)} statements checked, {len(failures)} with full scans of large tables")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=300, help='students in the seeded department')
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not just failures')
+    args = parser.parse_args()
+    sys.exit(run(args.students, args.verbose))
@@ -0,0 +1,131 @@
+"""
+Benchmark Helpers
+Builds an isolated Flask app on a throwaway SQLite file and times requests
+"""
+
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from statistics import mean, median
+
+from flask import Flask
+from sqlalchemy import event
+
+from database import db, configure_engines
+
+
+def make_app(db_path=None, sqlite_pragmas=None, read_uri=None, page_routes=False):
+    """
+    Create a minimal app with all API blueprints on its own SQLite database.
+    Never touches instance/gec_rajkot.db. Connections get the production
+    PRAGMAs unless `sqlite_pragmas` overrides them; `read_uri` adds a read bind.
+    `page_routes` also registers app.py's pages (dashboards etc.).
+    """
+    from routes import auth_bp, student_bp, faculty_bp, attendance_bp, enrollment_bp, subject_bp, upload_bp, job_bp
+
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='gecr_bench_', suffix='.db')
+        os.close(fd)
+
+    app = Flask('benchmarks', root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config.update({
+        'SECRET_KEY': 'benchmark',
+        'JWT_SECRET_KEY': 'benchmark',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'TESTING': True,
+        'SQLALCHEMY_BINDS': {'read': read_uri} if read_uri else {},
+    })
+    db.init_app(app)
+    with app.app_context():
+        configure_engines(sqlite_pragmas)
+
+    from flask_jwt_extended import JWTManager
+    JWTManager(app)
+
+    for bp in (auth_bp, student_bp, faculty_bp, attendance_bp, enrollment_bp, subject_bp, upload_bp, job_bp):
+        app.register_blueprint(bp)
+
+    # Excel/CSV uploads import inside the request, as in the testing config, so a timed upload covers the import
+    from utils.jobs import import_jobs
+    app.config['IMPORT_JOB_WORKERS'] = 0
+    import_jobs.init_app(app)
+
+    if page_routes:
+        from app import get_config, register_main_routes
+        for key, value in get_config('testing').items():
+            app.config.setdefault(key, value)
+        register_main_routes(app)
+
+    with app.app_context():
+        from database import upgrade_schema
+        db.create_all(bind_key=None)  # the read bind, if any, mirrors the primary
+        upgrade_schema()
+
+    app.bench_db_path = db_path
+    return app
+
+
+def login(client, user_id, user_type, email=None):
+    """Put a logged-in user into the test client's session"""
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['user_type'] = user_type
+        if email:
+            sess['user_email'] = email
+
+
+def time_call(fn, repeat):
+    """Call fn() `repeat` times and return the list of durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(durations):
+    """Return mean/median/p95/p99/max of a list of millisecond durations"""
+    return {
+        'mean_ms': round(mean(durations), 2),
+        'p50_ms': round(median(durations), 2),
+        'p95_ms': round(percentile(durations, 95), 2),
+        'p99_ms': round(percentile(durations, 99), 2),
+        'max_ms': round(max(durations), 2),
+    }
+
+
+@contextmanager
+def count_queries(app):
+    """Count statements sent on any of the app's engines; yields a dict whose 'count' keeps updating"""
+    counter = {'count': 0}
+
+    def record(*args):
+        counter['count'] += 1
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', record)
+
+
+def cleanup(app):
+    """Remove the benchmark database file"""
+    try:
+        os.remove(app.bench_db_path)
+    except OSError:
+        pass
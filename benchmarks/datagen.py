@@ -0,0 +1,193 @@
+"""
+Synthetic College Generator
+Deterministic seed data shaped like a whole college: departments x semesters
+of students, faculty teaching several subjects, active enrollments,
+timetables, assignments with submissions and multi-year attendance
+
+Usage (from a benchmark): college = seed_college('small', seed=42)
+
+The same scale and seed always produce the same rows and ids.
+"""
+
+import random
+from datetime import date, timedelta
+
+from database import db
+from models.gecr_models import (
+    Faculty, Subject, Student, StudentEnrollment, Attendance, Timetable,
+    Assignment, Submission, Notification
+)
+from utils.attendance_writer import rebuild_attendance_summary
+
+DEPARTMENTS = [
+    'AI&DS', 'Computer Engineering', 'Information Technology',
+    'Electrical Engineering', 'Mechanical Engineering', 'Civil Engineering',
+]
+SEMESTERS = range(1, 9)
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+TIME_SLOTS = ['09:00-10:00', '10:00-11:00', '11:15-12:15', '12:15-13:15', '14:00-15:00', '15:00-16:00']
+
+# students = departments x 8 semesters x students_per_class; attendance rows =
+# students x subjects_per_class x sessions_per_year x years
+SCALES = {
+    'tiny': {'departments': 2, 'students_per_class': 15, 'subjects_per_class': 3,
+             'faculty_per_department': 4, 'years': 1, 'sessions_per_year': 10},
+    'small': {'departments': 4, 'students_per_class': 60, 'subjects_per_class': 4,
+              'faculty_per_department': 6, 'years': 2, 'sessions_per_year': 15},
+    'medium': {'departments': 6, 'students_per_class': 60, 'subjects_per_class': 6,
+               'faculty_per_department': 12, 'years': 2, 'sessions_per_year': 40},
+    'large': {'departments': 6, 'students_per_class': 120, 'subjects_per_class': 6,
+              'faculty_per_department': 16, 'years': 4, 'sessions_per_year': 45},
+}
+
+# Present / Absent / Late weights of a typical class
+STATUS_WEIGHTS = (('Present', 80), ('Absent', 12), ('Late', 8))
+
+
+def session_dates(years, sessions_per_year, first_year=2021):
+    """Teaching days: `sessions_per_year` weekdays per academic year starting July of `first_year`"""
+    dates = []
+    for year in range(years):
+        day = date(first_year + year, 7, 1)
+        step = max(1, 280 // sessions_per_year)
+        while len(dates) < (year + 1) * sessions_per_year:
+            if day.weekday() < 6:
+                dates.append(day)
+            day += timedelta(days=step)
+    return dates
+
+
+def seed_college(scale='small', seed=42):
+    """
+    Insert a whole synthetic college into the current app's database and commit.
+
+    Returns a dict describing what was created:
+        classes: {(department, semester): {'student_ids': [...], 'subject_ids': [...]}}
+        subjects: {subject_id: {'faculty_id', 'department', 'semester'}}
+        faculty: {faculty_id: [subject_id, ...]}
+        students: {student_id: (department, semester)}
+        dates: teaching days that already have attendance (ascending)
+        counts: rows per table
+    """
+    shape = SCALES[scale]
+    rng = random.Random(seed)
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+
+    college = {'classes': {}, 'subjects': {}, 'faculty': {}, 'students': {}, 'counts': {}}
+    departments = DEPARTMENTS[:shape['departments']]
+
+    for d, department in enumerate(departments):
+        faculty_rows = [
+            Faculty(name=f'Faculty {d}-{f:02d}', email=f'faculty{d}_{f}@gecr.edu', password='x',
+                    department=department, designation='Assistant Professor')
+            for f in range(shape['faculty_per_department'])
+        ]
+        db.session.add_all(faculty_rows)
+        db.session.flush()
+        faculty_ids = [faculty.faculty_id for faculty in faculty_rows]
+        for faculty_id in faculty_ids:
+            college['faculty'][faculty_id] = []
+
+        for semester in SEMESTERS:
+            subjects = [
+                Subject(subject_name=f'{department[:3]} S{semester} Subject {s}', subject_code=f'{d}{semester}{s:02d}',
+                        department=department, semester=semester, credits=rng.choice((3, 4)),
+                        faculty_id=faculty_ids[(semester * shape['subjects_per_class'] + s) % len(faculty_ids)])
+                for s in range(shape['subjects_per_class'])
+            ]
+            db.session.add_all(subjects)
+            db.session.flush()
+
+            db.session.execute(db.insert(Student), [
+                {'roll_no': f'{d}{semester}{i:04d}', 'name': f'Student {d}-{semester}-{i:04d}',
+                 'email': f's{d}_{semester}_{i}@gecr.edu', 'password': 'x',
+                 'department': department, 'semester': semester, 'fees_paid': rng.random() < 0.9}
+                for i in range(shape['students_per_class'])
+            ])
+            student_ids = [row[0] for row in db.session.query(Student.student_id).filter(
+                Student.department == department, Student.semester == semester
+            ).order_by(Student.student_id)]
+
+            subject_ids = [subject.subject_id for subject in subjects]
+            college['classes'][(department, semester)] = {'student_ids': student_ids, 'subject_ids': subject_ids}
+            for subject in subjects:
+                college['subjects'][subject.subject_id] = {
+                    'faculty_id': subject.faculty_id, 'department': department, 'semester': semester
+                }
+                college['faculty'][subject.faculty_id].append(subject.subject_id)
+            for student_id in student_ids:
+                college['students'][student_id] = (department, semester)
+
+    db.session.execute(db.insert(StudentEnrollment), [
+        {'student_id': student_id, 'subject_id': subject_id, 'status': 'active', 'academic_year': '2024-2025'}
+        for cls in college['classes'].values()
+        for student_id in cls['student_ids'] for subject_id in cls['subject_ids']
+    ])
+
+    # Each class meets once a day per subject; every weekday has a full timetable
+    timetable = []
+    for (department, semester), cls in college['classes'].items():
+        for day_index, day in enumerate(WEEKDAYS):
+            for slot, subject_id in enumerate(cls['subject_ids']):
+                timetable.append({
+                    'department': department, 'semester': semester, 'day_of_week': day,
+                    'subject_id': subject_id, 'faculty_id': college['subjects'][subject_id]['faculty_id'],
+                    'time_slot': TIME_SLOTS[(slot + day_index) % len(TIME_SLOTS)], 'room': f'R{semester}{slot:02d}'
+                })
+    db.session.execute(db.insert(Timetable), timetable)
+
+    dates = session_dates(shape['years'], shape['sessions_per_year'])
+    college['dates'] = dates
+
+    # One executemany per subject keeps memory flat at any scale
+    attendance_count = 0
+    for cls in college['classes'].values():
+        for subject_id in cls['subject_ids']:
+            rows = [
+                {'student_id': student_id, 'subject_id': subject_id, 'date': day, 'status': status}
+                for day in dates
+                for student_id, status in zip(cls['student_ids'],
+                                              rng.choices(statuses, weights, k=len(cls['student_ids'])))
+            ]
+            db.session.execute(db.insert(Attendance), rows)
+            attendance_count += len(rows)
+    rebuild_attendance_summary()
+
+    # Two assignments per subject (one past, one upcoming); ~70% submit the past one
+    submissions = 0
+    today = date.today()
+    for subject_id, info in college['subjects'].items():
+        student_ids = college['classes'][(info['department'], info['semester'])]['student_ids']
+        for a, due in enumerate((today - timedelta(days=10), today + timedelta(days=7))):
+            assignment = Assignment(title=f'Assignment {subject_id}.{a}', subject_id=subject_id,
+                                    faculty_id=info['faculty_id'], due_date=due)
+            db.session.add(assignment)
+            db.session.flush()
+            if a == 0:
+                rows = [
+                    {'assignment_id': assignment.assignment_id, 'student_id': student_id,
+                     'submitted_at': due - timedelta(days=rng.randint(0, 5)),
+                     'grade': rng.choice(('A', 'B', 'C', None))}
+                    for student_id in student_ids if rng.random() < 0.7
+                ]
+                if rows:
+                    db.session.execute(db.insert(Submission), rows)
+                    submissions += len(rows)
+
+    notifications = [
+        {'user_id': student_id, 'user_type': 'student', 'title': 'Fee reminder', 'message': 'Pay fees',
+         'notification_type': 'general', 'read': rng.random() < 0.5}
+        for student_id in college['students'] if rng.random() < 0.3
+    ]
+    if notifications:
+        db.session.execute(db.insert(Notification), notifications)
+    db.session.commit()
+
+    enrollments = sum(len(cls['student_ids']) * len(cls['subject_ids']) for cls in college['classes'].values())
+    college['counts'] = {
+        'departments': len(departments), 'faculty': len(college['faculty']), 'subjects': len(college['subjects']),
+        'students': len(college['students']), 'enrollments': enrollments, 'timetable': len(timetable),
+        'attendance': attendance_count, 'submissions': submissions, 'notifications': len(notifications),
+    }
+    return college
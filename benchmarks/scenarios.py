@@ -0,0 +1,222 @@
+"""
+Load Scenarios
+Scripted traffic against a synthetic college: lecture-hour attendance marking, dashboard refresh storms, Excel uploads and announcement fan-out
+
+Usage: python -m benchmarks.scenarios [--scale tiny|small|medium|large] [--seed N] [--requests N]
+                                      [--scenario NAME ...] [--save FILE] [--baseline FILE] [--tolerance F]
+
+Every scenario reports p50/p95/p99 latency and SQL statements per request.
+--save writes the results as JSON; --baseline compares against a saved run
+and exits non-zero when a request issues more statements than before
+(deterministic for a given scale and seed) or, for labels with at least
+MIN_LATENCY_SAMPLES requests, p95 grows by more than --tolerance (default 50%;
+timings on a shared machine are noisy).
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from benchmarks.common import make_app, login, summarize, count_queries, cleanup
+from benchmarks.datagen import SCALES, seed_college
+
+
+class Harness:
+    """Logged-in clients per user plus timed, query-counted requests grouped by label"""
+
+    def __init__(self, app, college, seed):
+        self.app = app
+        self.college = college
+        self.rng = random.Random(seed)
+        self.samples = {}
+        self._clients = {}
+        from models.gecr_models import Student
+        with app.app_context():
+            self._emails = dict(Student.query.with_entities(Student.student_id, Student.email))
+
+    def client(self, user_type, user_id):
+        key = (user_type, user_id)
+        if key not in self._clients:
+            client = self.app.test_client()
+            login(client, user_id, user_type, email=self._emails.get(user_id) if user_type == 'student' else None)
+            self._clients[key] = client
+        return self._clients[key]
+
+    def request(self, label, client, method, url, expect=200, **kwargs):
+        with count_queries(self.app) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            response.get_data()  # streamed bodies run their queries here
+            elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == expect, (label, url, response.status_code, response.get_data()[:300])
+        self.samples.setdefault(label, []).append((elapsed, queries['count']))
+        return response
+
+
+def attendance_marking(h, requests):
+    """Every subject in session marks a new day for its whole class (the top of a lecture hour)"""
+    subject_ids = sorted(h.college['subjects'])
+    h.rng.shuffle(subject_ids)
+    first_day = h.college['dates'][-1] + timedelta(days=1)
+    statuses = ('Present', 'Present', 'Present', 'Absent', 'Late')
+    for n in range(requests):
+        subject_id = subject_ids[n % len(subject_ids)]
+        info = h.college['subjects'][subject_id]
+        student_ids = h.college['classes'][(info['department'], info['semester'])]['student_ids']
+        payload = {
+            'subject_id': subject_id,
+            'date': (first_day + timedelta(days=n // len(subject_ids))).isoformat(),
+            'attendance': [{'student_id': sid, 'status': h.rng.choice(statuses)} for sid in student_ids],
+        }
+        h.request('mark attendance', h.client('faculty', info['faculty_id']),
+                  'post', '/api/attendance/faculty/mark', json=payload)
+
+
+def dashboard_storm(h, requests):
+    """Random students (85%) and faculty reloading their dashboard pages (dashboard cache off)"""
+    student_ids = sorted(h.college['students'])
+    faculty_ids = sorted(h.college['faculty'])
+    for _ in range(requests):
+        if h.rng.random() < 0.85:
+            h.request('student dashboard', h.client('student', h.rng.choice(student_ids)),
+                      'get', '/student/dashboard')
+        else:
+            h.request('faculty dashboard', h.client('faculty', h.rng.choice(faculty_ids)),
+                      'get', '/faculty/dashboard')
+
+
+def excel_upload(h, requests, days=5):
+    """Faculty upload a week of attendance for one class as .xlsx (roll_no, subject_id, date, status)"""
+    from models.gecr_models import Student
+
+    with h.app.app_context():
+        roll_numbers = dict(Student.query.with_entities(Student.student_id, Student.roll_no))
+    subject_ids = sorted(h.college['subjects'])
+    first_day = h.college['dates'][-1] + timedelta(days=400)  # clear of attendance_marking's days
+    for n in range(requests):
+        subject_id = h.rng.choice(subject_ids)
+        info = h.college['subjects'][subject_id]
+        student_ids = h.college['classes'][(info['department'], info['semester'])]['student_ids']
+        start = first_day + timedelta(days=n * days)
+        frame = pd.DataFrame([
+            (roll_numbers[sid], subject_id, (start + timedelta(days=d)).isoformat(),
+             h.rng.choice(('Present', 'Absent', 'Late')))
+            for d in range(days) for sid in student_ids
+        ], columns=['roll_no', 'subject_id', 'date', 'status'])
+        workbook = io.BytesIO()
+        frame.to_excel(workbook, index=False)
+        h.request('attendance upload', h.client('faculty', info['faculty_id']), 'post',
+                  '/api/attendance/faculty/upload', content_type='multipart/form-data',
+                  data={'file': (io.BytesIO(workbook.getvalue()), 'attendance.xlsx')})
+
+
+def announcement_fanout(h, requests):
+    """Announcements to a whole department, and every tenth one to the whole college"""
+    faculty_ids = sorted(h.college['faculty'])
+    departments = sorted({department for department, _ in h.college['classes']})
+    for n in range(requests):
+        faculty_id = h.rng.choice(faculty_ids)
+        if n % 10 == 9:
+            h.request('announcement (college)', h.client('faculty', faculty_id), 'post',
+                      '/api/faculty/announcements', expect=201, json={'title': f'Notice {n}', 'message': 'All students'})
+        else:
+            h.request('announcement (department)', h.client('faculty', faculty_id), 'post',
+                      '/api/faculty/announcements', expect=201,
+                      json={'title': f'Notice {n}', 'message': 'Department', 'department': h.rng.choice(departments)})
+
+
+# Labels with fewer requests than this are compared on statement counts only
+MIN_LATENCY_SAMPLES = 20
+
+# Upload requests are much heavier; they run requests // UPLOAD_DIVISOR times
+UPLOAD_DIVISOR = 5
+
+SCENARIOS = {
+    'attendance_marking': attendance_marking,
+    'dashboard_storm': dashboard_storm,
+    'excel_upload': lambda h, requests: excel_upload(h, max(1, requests // UPLOAD_DIVISOR)),
+    'announcement_fanout': announcement_fanout,
+}
+
+
+def run(scale, seed, requests, names):
+    app = make_app(page_routes=True)
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            college = seed_college(scale, seed)
+            seeded_in = time.perf_counter() - started
+        print(f"Seeded '{scale}' college in {seeded_in:.1f}s: "
+              + ', '.join(f'{count} {table}' for table, count in college['counts'].items()))
+
+        results = {}
+        for name in names:
+            harness = Harness(app, college, seed)
+            SCENARIOS[name](harness, requests)
+            for label, samples in harness.samples.items():
+                stats = summarize([elapsed for elapsed, _ in samples])
+                results[f'{name}: {label}'] = {
+                    'requests': len(samples),
+                    'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms'], 'p99_ms': stats['p99_ms'],
+                    'queries_per_request': round(sum(q for _, q in samples) / len(samples), 1),
+                    'max_queries': max(q for _, q in samples),
+                }
+    finally:
+        cleanup(app)
+
+    print(f"\n{'scenario':<50} | {'n':>4} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'q/req':>6} | {'max q':>5}")
+    print('-' * 105)
+    for label, result in results.items():
+        print(f"{label:<50} | {result['requests']:>4} | {result['p50_ms']:>8} | {result['p95_ms']:>8} | "
+              f"{result['p99_ms']:>8} | {result['queries_per_request']:>6} | {result['max_queries']:>5}")
+    return {'scale': scale, 'seed': seed, 'requests': requests, 'results': results}
+
+
+def compare(current, baseline, tolerance):
+    """Print regressions against a saved run; returns how many were found"""
+    if (baseline['scale'], baseline['seed']) != (current['scale'], current['seed']):
+        print(f"\nBaseline was recorded with scale={baseline['scale']} seed={baseline['seed']}; results are not comparable")
+        return 1
+    regressions = 0
+    print()
+    for label, result in current['results'].items():
+        before = baseline['results'].get(label)
+        if before is None:
+            continue
+        problems = []
+        if result['requests'] >= MIN_LATENCY_SAMPLES and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            problems.append(f"p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if result['queries_per_request'] > before['queries_per_request']:
+            problems.append(f"queries/request {before['queries_per_request']} -> {result['queries_per_request']}")
+        if problems:
+            regressions += 1
+            print(f"REGRESSION {label}: " + '; '.join(problems))
+    print(f"{regressions} regression(s) against baseline")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='size of the synthetic college')
+    parser.add_argument('--seed', type=int, default=42, help='data and traffic seed')
+    parser.add_argument('--requests', type=int, default=50, help='requests per scenario')
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='scenarios to run (default: all)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative p95 growth')
+    args = parser.parse_args()
+
+    current = run(args.scale, args.seed, args.requests, args.scenario)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            sys.exit(1 if compare(current, json.load(f), args.tolerance) else 0)
@@ -4,40 +4,154 @@ SQLite database setup with SQLAlchemy - GECR Schema
 Author: GEC Rajkot Development Team
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
+from sqlalchemy import event, text
+
+# Bind key of the optional read-only engine (SQLALCHEMY_BINDS['read'])
+READ_BIND = 'read'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs to the read bind inside @use_read_replica
+    views. Flushes, UPDATE/DELETE statements and all other views use the
+    primary engine; without a read bind everything does.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_read_only'):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None and (clause is None or getattr(clause, 'is_select', False)):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 # Initialize SQLAlchemy
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
+
+def use_read_replica(f):
+    """
+    Decorator for read-only views: their queries go to the read bind for the
+    rest of the request (including streamed response bodies). The replica
+    may lag the primary, so never use it on views that write.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def use_primary():
+    """
+    Send the queries inside the block to the primary, even in a
+    @use_read_replica view (for results that must include the latest
+    commits, e.g. ones cached until the next write invalidates them)
+    """
+    read_only = has_app_context() and g.get('db_read_only')
+    if read_only:
+        g.db_read_only = False
+    try:
+        yield
+    finally:
+        if read_only:
+            g.db_read_only = True
+
+# Applied to every new SQLite connection; override per key with the
+# SQLITE_PRAGMAS config dict (a value of None skips that pragma)
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',      # readers and the writer no longer block each other
+    'synchronous': 'NORMAL',    # fsync on checkpoint instead of every commit (safe with WAL)
+    'busy_timeout': 5000,       # ms to wait for the write lock before "database is locked"
+    'mmap_size': 268435456,     # 256 MiB of the file read through mmap
+    'cache_size': -65536,       # 64 MiB page cache per connection (negative = KiB)
+    'temp_store': 'MEMORY',     # sorts and temporary B-trees stay in memory
+}
+
 def init_database(app):
     """
     Initialize database with Flask app
     """
-    # Configure SQLite database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///gec_rajkot.db'
+    # Configure SQLite database (get_config / DATABASE_URL may already have chosen one)
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///gec_rajkot.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_ECHO'] = False  # Set to True for SQL debugging
     
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Batch mode lets autogenerated revisions alter SQLite tables (copy and move)
+    migrate.init_app(app, db, render_as_batch=True, compare_type=True)
+    
+    # Tune SQLite connections before the first one is opened
+    with app.app_context():
+        configure_engines(app.config.get('SQLITE_PRAGMAS'))
     
     # Import all models to ensure they are registered
     from models.gecr_models import (
         Student, Faculty, Subject, Timetable, 
         Attendance, Assignment, Submission, 
-        Message, Fee, Salary, Announcement, Event, Activity, Notification
+        Message, Fee, Salary, Announcement, Event, Activity, Notification,
+        AttendanceSummary, BroadcastNotification, NotificationReceipt
     )
     
     return db
 
+def configure_sqlite(engine, pragmas=None):
+    """
+    Run PRAGMA statements on every connection the engine opens (no-op for
+    other databases). `pragmas` overrides DEFAULT_SQLITE_PRAGMAS key by key.
+    """
+    if engine.dialect.name != 'sqlite' or getattr(engine, 'sqlite_pragmas', None) is not None:
+        return
+    settings = {**DEFAULT_SQLITE_PRAGMAS, **(pragmas or {})}
+    engine.sqlite_pragmas = {name: value for name, value in settings.items() if value is not None}
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in engine.sqlite_pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def configure_engines(pragmas=None):
+    """
+    Apply configure_sqlite() to the primary and any read bind of the current
+    app. A read bind (e.g. the same file opened with ?mode=ro) cannot switch
+    the journal mode, so that pragma is left to the primary.
+    """
+    for bind_key, engine in db.engines.items():
+        configure_sqlite(engine, pragmas if bind_key is None else {**(pragmas or {}), 'journal_mode': None})
+
+class SchemaUpgradeError(RuntimeError):
+    """The existing data prevents upgrade_schema() from completing"""
+
+
 def create_tables(app):
     """
     Create all database tables
+
+    Skipped once the database is managed by the Alembic revisions in
+    migrations/ (it has an alembic_version table), or when
+    AUTO_UPGRADE_SCHEMA is off; `flask db upgrade` changes the schema then.
     """
     with app.app_context():
+        from sqlalchemy import inspect
+        if not app.config.get('AUTO_UPGRADE_SCHEMA', True) or inspect(db.engine).has_table('alembic_version'):
+            return
+
         # Import models
         from models.gecr_models import (
             Student, Faculty, Subject, Timetable, 
@@ -46,8 +160,60 @@ def create_tables(app):
         )
         
         db.create_all()
+        upgrade_schema()
         print("Database tables created successfully!")
 
+def upgrade_schema():
+    """
+    Bring an existing database up to the current model definitions.
+    create_all() skips tables that already exist, so nullable columns and
+    indexes added to models later are created here (idempotent, safe on
+    every startup).
+    """
+    from sqlalchemy import inspect, text
+    from models.gecr_models import Attendance
+
+    inspector = inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present and column.nullable:
+                quote = db.engine.dialect.identifier_preparer.quote
+                db.session.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                    f"{column.type.compile(db.engine.dialect)}"
+                ))
+    db.session.commit()
+    existing = {ix['name'] for ix in inspector.get_indexes(Attendance.__tablename__)}
+
+    if 'unique_student_subject_date' not in existing:
+        # The unique index cannot be built over duplicate (student, subject, date)
+        # rows; removing them is left to an explicit, reporting command
+        from utils.attendance_writer import find_duplicate_attendance
+        duplicates = find_duplicate_attendance()
+        if duplicates:
+            raise SchemaUpgradeError(
+                f"{len(duplicates)} duplicate attendance rows block the unique_student_subject_date index; "
+                f"review them with 'flask dedupe-attendance --dry-run' and remove them with "
+                f"'flask dedupe-attendance' before starting the app"
+            )
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    # Backfill the attendance_summary counters the first time the table appears
+    from models.gecr_models import AttendanceSummary
+    if not db.session.query(AttendanceSummary.summary_id).first() \
+            and db.session.query(Attendance.attendance_id).first():
+        from utils.attendance_writer import rebuild_attendance_summary
+        rows = rebuild_attendance_summary()
+        db.session.commit()
+        print(f"Backfilled attendance summary ({rows} rows)")
+
 def drop_tables(app):
     """
     Drop all database tables (use with caution!)
@@ -73,20 +239,99 @@ def reset_database(app):
         print("Database reset completed!")
 
 # Database utility functions
+
+# One thread runs readiness pings so a hung connection cannot block the probe itself.
+# At most one ping is in flight: probes arriving meanwhile wait on it instead of
+# queueing more behind a hung connection.
+_ping_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-ping')
+_ping_state = {'future': None}
+_ping_lock = threading.Lock()
+
+def ping_database(timeout=None):
+    """
+    Check the database answers `SELECT 1` (touches no tables), within
+    `timeout` seconds if given; without one it runs on the caller's session.
+    While an earlier ping is still running no new one is started: the call
+    waits for that one and reports not-ready if it does not finish in time.
+    """
+    try:
+        if timeout is None:
+            db.session.execute(text('SELECT 1'))
+            return True
+        engine = db.engine
+
+        def ping():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        with _ping_lock:
+            future = _ping_state['future']
+            if future is None or future.done():
+                future = _ping_state['future'] = _ping_executor.submit(ping)
+        future.result(timeout=timeout)
+        return True
+    except FutureTimeoutError:
+        print(f"Database ping timed out after {timeout}s")
+        return False
+    except Exception as e:
+        print(f"Database ping failed: {e}")
+        return False
+
 def get_db_stats():
     """
-    Get database statistics
+    Get database statistics (full table counts; request paths should use get_cached_db_stats)
     """
     try:
         # Import models here to avoid circular imports
         from models.gecr_models import Student, Faculty
         
+        students = Student.query.count()
+        faculty = Faculty.query.count()
         stats = {
-            'students': Student.query.count(),
-            'faculty': Faculty.query.count(),
-            'total_users': Student.query.count() + Faculty.query.count()
+            'students': students,
+            'faculty': faculty,
+            'total_users': students + faculty
         }
         return stats
     except Exception as e:
         print(f"Error getting database stats: {e}")
-        return None
\ No newline at end of file
+        return None
+
+_stats_cache = {'stats': None, 'as_of': None, 'refreshing': False}
+_stats_lock = threading.Lock()
+
+def get_cached_db_stats(max_age=300):
+    """
+    get_db_stats() computed at most once per `max_age` seconds per process.
+    Only the first call waits for the counts; after that a stale value is
+    returned at once while a background thread refreshes it.
+    Returns (stats, as_of datetime), or (None, None) if counting failed.
+    """
+    with _stats_lock:
+        stats, as_of = _stats_cache['stats'], _stats_cache['as_of']
+        stale = as_of is None or (datetime.utcnow() - as_of).total_seconds() >= max_age
+        start_refresh = stale and stats is not None and not _stats_cache['refreshing']
+        if start_refresh:
+            _stats_cache['refreshing'] = True
+    
+    if stats is None:
+        return _refresh_db_stats()
+    if start_refresh:
+        app = current_app._get_current_object()
+        threading.Thread(target=_refresh_db_stats, args=(app,), name='db-stats-refresh', daemon=True).start()
+    return stats, as_of
+
+def _refresh_db_stats(app=None):
+    try:
+        if app is None:
+            stats = get_db_stats()
+        else:
+            with app.app_context():
+                stats = get_db_stats()
+        with _stats_lock:
+            if stats is not None:
+                _stats_cache['stats'], _stats_cache['as_of'] = stats, datetime.utcnow()
+            return _stats_cache['stats'], _stats_cache['as_of']
+    finally:
+        with _stats_lock:
+            _stats_cache['refreshing'] = False
@@ -27,6 +27,12 @@ class Student(db.Model):
     phone = db.Column(db.String(15))
     fees_paid = db.Column(db.Boolean, default=False)
     email_notifications_enabled = db.Column(db.Boolean, default=True)  # Email notification preference
+    photo_filename = db.Column(db.String(100))  # Profile photo in UPLOAD_FOLDER (see utils.avatars)
+    photo_thumb_filename = db.Column(db.String(100))
+    photo_status = db.Column(db.String(20))  # processing / ready / failed while a new photo is resized
+    photo_pending = db.Column(db.String(100))  # key of the upload being processed
+    photo_updated_at = db.Column(db.DateTime)  # last photo_status change (stale 'processing' is re-queued)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # NULL for students added before it existed
     
     # Relationships
     attendance_records = db.relationship('Attendance', backref='student', lazy=True)
@@ -120,6 +126,11 @@ class Faculty(db.Model):
     designation = db.Column(db.String(50))
     salary = db.Column(db.Integer, default=0)
     phone = db.Column(db.String(15))
+    photo_filename = db.Column(db.String(100))  # Profile photo in UPLOAD_FOLDER (see utils.avatars)
+    photo_thumb_filename = db.Column(db.String(100))
+    photo_status = db.Column(db.String(20))  # processing / ready / failed while a new photo is resized
+    photo_pending = db.Column(db.String(100))  # key of the upload being processed
+    photo_updated_at = db.Column(db.DateTime)  # last photo_status change (stale 'processing' is re-queued)
     
     # Relationships
     subjects = db.relationship('Subject', backref='faculty', lazy=True)
@@ -166,6 +177,10 @@ class Subject(db.Model):
     description = db.Column(db.String(500))
     faculty_id = db.Column(db.Integer, db.ForeignKey('faculty.faculty_id'))
     
+    __table_args__ = (
+        db.Index('ix_subjects_faculty', 'faculty_id'),
+    )
+    
     # Relationships
     timetable_slots = db.relationship('Timetable', backref='subject', lazy=True)
     attendance_records = db.relationship('Attendance', backref='subject', lazy=True)
@@ -219,9 +234,12 @@ class StudentEnrollment(db.Model):
     academic_year = db.Column(db.String(20))  # e.g., "2024-2025"
     status = db.Column(db.String(20), default='active')  # active, dropped, completed
     
-    # Unique constraint to prevent duplicate enrollments
+    # Unique constraint to prevent duplicate enrollments; the indexes serve
+    # "active roster of a subject" and "active subjects of a student"
     __table_args__ = (
         db.UniqueConstraint('student_id', 'subject_id', name='unique_student_subject'),
+        db.Index('ix_enrollments_subject_status', 'subject_id', 'status'),
+        db.Index('ix_enrollments_student_status', 'student_id', 'status'),
     )
     
     def to_dict(self):
@@ -253,6 +271,12 @@ class Timetable(db.Model):
     room = db.Column(db.String(100), nullable=True)
     class_type = db.Column(db.String(20), default='Lecture')
     
+    # Today's schedule by faculty or by enrolled subject
+    __table_args__ = (
+        db.Index('ix_timetable_faculty_day', 'faculty_id', 'day_of_week'),
+        db.Index('ix_timetable_subject_day', 'subject_id', 'day_of_week'),
+    )
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -280,7 +304,14 @@ class Attendance(db.Model):
     date = db.Column(db.Date)
     status = db.Column(db.String(10))  # Present, Absent, Late
     marked_at = db.Column(db.DateTime, nullable=True)  # Timestamp when attendance was marked
-    
+
+    # One record per student, subject and day (also the conflict target for upserts);
+    # subject/date serves per-class views that do not filter by student
+    __table_args__ = (
+        db.Index('unique_student_subject_date', 'student_id', 'subject_id', 'date', unique=True),
+        db.Index('ix_attendance_subject_date', 'subject_id', 'date'),
+    )
+
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -295,6 +326,37 @@ class Attendance(db.Model):
         }
 
 
+class AttendanceSummary(db.Model):
+    """Per student/subject attendance counters, kept in step with the attendance table"""
+    __tablename__ = 'attendance_summary'
+
+    summary_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.student_id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.subject_id'), nullable=False)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # One counter row per student and subject (also the conflict target for upserts)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'subject_id', name='unique_summary_student_subject'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'student_id': self.student_id,
+            'subject_id': self.subject_id,
+            'present': self.present,
+            'absent': self.absent,
+            'late': self.late,
+            'total': self.total,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
 class Announcement(db.Model):
     """Announcements for dashboard and site-wide notices"""
     __tablename__ = 'announcements'
@@ -402,6 +464,12 @@ class Assignment(db.Model):
     faculty_id = db.Column(db.Integer, db.ForeignKey('faculty.faculty_id'))
     due_date = db.Column(db.Date)
     
+    # Upcoming (unsubmitted) assignments by due date; a faculty's assignments newest-due first
+    __table_args__ = (
+        db.Index('ix_assignments_due_date', 'due_date'),
+        db.Index('ix_assignments_faculty_due', 'faculty_id', 'due_date'),
+    )
+    
     # Relationships
     submissions = db.relationship('Submission', backref='assignment', lazy=True)
     
@@ -430,6 +498,12 @@ class Submission(db.Model):
     file_path = db.Column(db.String(200))
     grade = db.Column(db.String(5))
     
+    # Ungraded/graded counts per assignment, and a student's own submissions
+    __table_args__ = (
+        db.Index('ix_submissions_assignment_grade', 'assignment_id', 'grade'),
+        db.Index('ix_submissions_student_assignment', 'student_id', 'assignment_id'),
+    )
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -527,6 +601,11 @@ class Notification(db.Model):
     read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Unread counts and newest-first lists per user
+    __table_args__ = (
+        db.Index('ix_notifications_user_read_created', 'user_id', 'user_type', 'read', 'created_at'),
+    )
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -542,6 +621,178 @@ class Notification(db.Model):
         }
 
 
+class BroadcastNotification(db.Model):
+    """One notification addressed to a student audience (stored once, not per student)"""
+    __tablename__ = 'broadcast_notifications'
+
+    broadcast_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    notification_type = db.Column(db.String(50))
+    link = db.Column(db.String(200))
+    # Audience filters; NULL means "any"
+    department = db.Column(db.String(50))
+    semester = db.Column(db.Integer)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.subject_id'), nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('faculty.faculty_id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self, read=False):
+        """Convert to dictionary, shaped like Notification.to_dict() for a student"""
+        return {
+            'notification_id': self.broadcast_id,
+            'broadcast': True,
+            'user_type': 'student',
+            'title': self.title,
+            'message': self.message,
+            'notification_type': self.notification_type,
+            'link': self.link,
+            'read': read,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class NotificationReceipt(db.Model):
+    """Read receipt for a broadcast notification; a missing row means unread"""
+    __tablename__ = 'notification_receipts'
+
+    receipt_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    broadcast_id = db.Column(db.Integer, db.ForeignKey('broadcast_notifications.broadcast_id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.student_id'), nullable=False)
+    read_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('broadcast_id', 'student_id', name='unique_receipt_broadcast_student'),
+    )
+
+
+class FileBlob(db.Model):
+    """Uploaded file content, stored once per SHA-256 in the private FILE_STORE_FOLDER/blobs (utils.file_store)"""
+    __tablename__ = 'file_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StoredFile(db.Model):
+    """A file uploaded by a student or faculty member; identical contents share one FileBlob"""
+    __tablename__ = 'stored_files'
+
+    file_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    owner_type = db.Column(db.String(20), nullable=False)  # 'student' or 'faculty'
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Per-user file lists and quota sums
+    __table_args__ = (
+        db.Index('ix_stored_files_owner', 'owner_type', 'owner_id'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'file_id': self.file_id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'sha256': self.sha256,
+            'size': self.size,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class UploadSession(db.Model):
+    """Chunked upload in progress; the bytes so far are in the private FILE_STORE_FOLDER/parts/<upload_id>.part"""
+    __tablename__ = 'upload_sessions'
+
+    upload_id = db.Column(db.String(32), primary_key=True)
+    owner_id = db.Column(db.Integer, nullable=False)
+    owner_type = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_upload_sessions_owner', 'owner_type', 'owner_id'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.total_size,
+            'offset': self.received,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class ImportJob(db.Model):
+    """
+    Background import of an uploaded sheet (see utils.jobs); the file waits in
+    the private FILE_STORE_FOLDER/jobs until the job ends
+    """
+    __tablename__ = 'import_jobs'
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    owner_type = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(255))
+    params = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    stage = db.Column(db.String(50))
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    state = db.Column(db.JSON)  # handler counters carried from one chunk to the next
+    errors = db.Column(db.JSON)  # per-row errors, the first IMPORT_JOB_MAX_ERRORS of them
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(100))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_import_jobs_owner', 'owner_type', 'owner_id', 'created_at'),
+        db.Index('ix_import_jobs_status', 'status', 'heartbeat_at'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': self.stage,
+            'done': self.done,
+            'total': self.total,
+            'chunks_done': self.chunks_done,
+            'errors': self.errors or [],
+            'error_count': self.error_count,
+            'result': self.result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class OTP(db.Model):
     """OTP table for email verification"""
     __tablename__ = 'otps'
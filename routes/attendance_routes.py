@@ -6,18 +6,23 @@ Author: GEC Rajkot Development Team
 
 from flask import Blueprint, request, jsonify, render_template, session, redirect, url_for, flash
 from datetime import datetime, date
-from werkzeug.utils import secure_filename
 import os
-import pandas as pd
 from database import db
 from models.gecr_models import Student, Faculty, Subject, Attendance, StudentEnrollment
+from utils.metrics import metrics
+from utils.jobs import import_jobs
+from utils.attendance_writer import bulk_upsert_attendance, VALID_STATUSES
+from utils.attendance_summary import (
+    get_student_attendance_summary, get_subject_attendance_summary,
+    attendance_percentage, combine_counts, empty_counts
+)
 
 # Create attendance blueprint
 attendance_bp = Blueprint('attendance', __name__, url_prefix='/api/attendance')
 
 # Configuration for Excel uploads
 UPLOAD_FOLDER = 'temp_uploads'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -34,30 +39,8 @@ def calculate_attendance_percentage(student_id, subject_id=None):
     If subject_id is provided, calculate for that subject only
     Otherwise, calculate overall attendance
     """
-    if subject_id:
-        # Subject-specific attendance
-        total_classes = Attendance.query.filter_by(
-            student_id=student_id,
-            subject_id=subject_id
-        ).count()
-        
-        attended_classes = Attendance.query.filter_by(
-            student_id=student_id,
-            subject_id=subject_id,
-            status='Present'
-        ).count()
-    else:
-        # Overall attendance
-        total_classes = Attendance.query.filter_by(student_id=student_id).count()
-        attended_classes = Attendance.query.filter_by(
-            student_id=student_id,
-            status='Present'
-        ).count()
-    
-    if total_classes == 0:
-        return 0.0
-    
-    return round((attended_classes / total_classes) * 100, 2)
+    summary = get_student_attendance_summary(student_id, subject_id)
+    return attendance_percentage(combine_counts(summary.values()))
 
 
 # ==================== FACULTY ROUTES ====================
@@ -97,54 +80,36 @@ def faculty_mark_attendance():
         if not subject or subject.faculty_id != session['user_id']:
             return jsonify({'error': 'You are not authorized to mark attendance for this subject'}), 403
         
-        marked_count = 0
-        duplicate_count = 0
+        records = []
         errors = []
-        
-        # Mark attendance for each student
+
+        # Validate every record before touching the database
         for record in attendance_list:
             student_id = record.get('student_id')
             status = record.get('status', 'Absent')
-            
+
             if not student_id:
                 errors.append('Student ID missing in attendance record')
                 continue
-            
+
             # Validate status
-            if status not in ['Present', 'Absent', 'Late']:
+            if status not in VALID_STATUSES:
                 errors.append(f'Invalid status for student {student_id}: {status}')
                 continue
-            
-            # Check for duplicate entry (same student, subject, date)
-            existing = Attendance.query.filter_by(
-                student_id=student_id,
-                subject_id=subject_id,
-                date=attendance_date
-            ).first()
-            
-            if existing:
-                # Update existing record instead of creating duplicate
-                existing.status = status
-                duplicate_count += 1
-            else:
-                # Create new attendance record
-                new_attendance = Attendance(
-                    student_id=student_id,
-                    subject_id=subject_id,
-                    date=attendance_date,
-                    status=status
-                )
-                db.session.add(new_attendance)
-                marked_count += 1
-        
+
+            records.append((student_id, attendance_date, status))
+
+        # Insert new rows and update existing ones (same student, subject, date) in bulk
+        result = bulk_upsert_attendance(subject.subject_id, records)
+
         # Commit all changes
         db.session.commit()
-        
+
         return jsonify({
             'success': True,
             'message': f'Attendance marked successfully',
-            'marked': marked_count,
-            'updated': duplicate_count,
+            'marked': result['inserted'],
+            'updated': result['updated'],
             'errors': errors if errors else None
         }), 200
         
@@ -154,10 +119,14 @@ def faculty_mark_attendance():
 
 
 @attendance_bp.route('/faculty/upload', methods=['POST'])
+@metrics.time_upload('attendance')
 def faculty_upload_attendance():
     """
-    Upload attendance via Excel file
+    Upload attendance via Excel or CSV file
     Excel format: Columns: student_id OR roll_no, subject_id OR subject_name, date, status
+    
+    The file is imported in the background: answers 202 with the job; poll
+    GET /api/jobs/<job_id> for progress, per-row errors and the summary.
     """
     try:
         # Check if user is faculty
@@ -174,153 +143,18 @@ def faculty_upload_attendance():
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file format. Only .xlsx and .xls allowed'}), 400
-        
-        # Save file temporarily
-        ensure_upload_folder()
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-        file.save(filepath)
-        
-        # Read Excel file using pandas
-        try:
-            df = pd.read_excel(filepath)
-        except Exception as e:
-            os.remove(filepath)  # Clean up file
-            return jsonify({'error': f'Failed to read Excel file: {str(e)}'}), 400
-        
-        # Validate required columns
-        required_cols = ['date', 'status']
-        if not all(col in df.columns for col in required_cols):
-            os.remove(filepath)
-            return jsonify({'error': f'Excel must contain columns: {", ".join(required_cols)}, and either student_id/roll_no and subject_id/subject_name'}), 400
-        
-        # Check for student identifier
-        if 'student_id' not in df.columns and 'roll_no' not in df.columns:
-            os.remove(filepath)
-            return jsonify({'error': 'Excel must contain either student_id or roll_no column'}), 400
-        
-        # Check for subject identifier
-        if 'subject_id' not in df.columns and 'subject_name' not in df.columns:
-            os.remove(filepath)
-            return jsonify({'error': 'Excel must contain either subject_id or subject_name column'}), 400
-        
-        success_count = 0
-        duplicate_count = 0
-        error_count = 0
-        errors = []
-        
-        # Process each row
-        for index, row in df.iterrows():
-            try:
-                # Get student
-                if 'student_id' in df.columns and pd.notna(row['student_id']):
-                    student = Student.query.get(int(row['student_id']))
-                elif 'roll_no' in df.columns and pd.notna(row['roll_no']):
-                    student = Student.query.filter_by(roll_no=str(row['roll_no'])).first()
-                else:
-                    errors.append(f'Row {index + 2}: No valid student identifier')
-                    error_count += 1
-                    continue
-                
-                if not student:
-                    errors.append(f'Row {index + 2}: Student not found')
-                    error_count += 1
-                    continue
-                
-                # Get subject
-                if 'subject_id' in df.columns and pd.notna(row['subject_id']):
-                    subject = Subject.query.get(int(row['subject_id']))
-                elif 'subject_name' in df.columns and pd.notna(row['subject_name']):
-                    subject = Subject.query.filter_by(subject_name=str(row['subject_name'])).first()
-                else:
-                    errors.append(f'Row {index + 2}: No valid subject identifier')
-                    error_count += 1
-                    continue
-                
-                if not subject:
-                    errors.append(f'Row {index + 2}: Subject not found')
-                    error_count += 1
-                    continue
-                
-                # Verify faculty teaches this subject
-                if subject.faculty_id != session['user_id']:
-                    errors.append(f'Row {index + 2}: You are not authorized to mark attendance for {subject.subject_name}')
-                    error_count += 1
-                    continue
-                
-                # Parse date
-                if pd.notna(row['date']):
-                    if isinstance(row['date'], str):
-                        attendance_date = datetime.strptime(row['date'], '%Y-%m-%d').date()
-                    else:
-                        attendance_date = row['date'].date() if hasattr(row['date'], 'date') else row['date']
-                else:
-                    errors.append(f'Row {index + 2}: Invalid date')
-                    error_count += 1
-                    continue
-                
-                # Get status
-                status = str(row['status']).strip().capitalize()
-                if status not in ['Present', 'Absent', 'Late']:
-                    errors.append(f'Row {index + 2}: Invalid status "{status}". Must be Present, Absent, or Late')
-                    error_count += 1
-                    continue
-                
-                # Check for duplicate
-                existing = Attendance.query.filter_by(
-                    student_id=student.student_id,
-                    subject_id=subject.subject_id,
-                    date=attendance_date
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.status = status
-                    duplicate_count += 1
-                else:
-                    # Create new record
-                    new_attendance = Attendance(
-                        student_id=student.student_id,
-                        subject_id=subject.subject_id,
-                        date=attendance_date,
-                        status=status
-                    )
-                    db.session.add(new_attendance)
-                    success_count += 1
-                
-            except Exception as e:
-                errors.append(f'Row {index + 2}: {str(e)}')
-                error_count += 1
-        
-        # Commit all changes
-        db.session.commit()
-        
-        # Clean up uploaded file
-        try:
-            os.remove(filepath)
-        except:
-            pass
+            return jsonify({'error': 'Invalid file format. Only .xlsx, .xls and .csv allowed'}), 400
         
+        job, queued = import_jobs.start('attendance_sheet', 'faculty', session['user_id'], file)
         return jsonify({
             'success': True,
-            'message': f'Attendance upload completed',
-            'inserted': success_count,
-            'updated': duplicate_count,
-            'errors': error_count,
-            'error_details': errors if errors else None
-        }), 200
+            'message': 'Attendance upload started',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.job_id}'
+        }), 202 if queued else 200
         
     except Exception as e:
         db.session.rollback()
-        # Clean up file if exists
-        try:
-            if 'filepath' in locals():
-                os.remove(filepath)
-        except:
-            pass
         return jsonify({'error': f'Failed to upload attendance: {str(e)}'}), 500
 
 
@@ -442,25 +276,25 @@ def faculty_get_students_for_subject(subject_id):
             return jsonify({'error': 'Unauthorized - You do not teach this subject'}), 403
         
         # Get enrolled students
-        enrollments = StudentEnrollment.query.filter_by(
-            subject_id=subject_id,
-            status='active'
-        ).all()
+        students = Student.query.join(
+            StudentEnrollment, StudentEnrollment.student_id == Student.student_id
+        ).filter(
+            StudentEnrollment.subject_id == subject_id,
+            StudentEnrollment.status == 'active'
+        ).order_by(StudentEnrollment.enrollment_id).all()
+        
+        # Attendance counts for every student of the subject in one query
+        summary = get_subject_attendance_summary(subject_id)
         
         students_data = []
-        for enrollment in enrollments:
-            student = enrollment.student
-            
-            # Calculate attendance percentage for this subject
-            attendance_percentage = calculate_attendance_percentage(student.student_id, subject_id)
-            
+        for student in students:
             students_data.append({
                 'student_id': student.student_id,
                 'roll_no': student.roll_no,
                 'name': student.name,
                 'department': student.department,
                 'semester': student.semester,
-                'attendance_percentage': attendance_percentage
+                'attendance_percentage': attendance_percentage(summary.get(student.student_id, empty_counts()))
             })
         
         return jsonify({
@@ -491,53 +325,29 @@ def student_attendance_overview():
         
         student_id = session['user_id']
         
-        # Calculate overall attendance
-        overall_percentage = calculate_attendance_percentage(student_id)
+        # Present/absent/late/total for every subject in one query
+        summary = get_student_attendance_summary(student_id)
+        overall_percentage = attendance_percentage(combine_counts(summary.values()))
         
         # Get subject-wise attendance
-        enrollments = StudentEnrollment.query.filter_by(
-            student_id=student_id,
-            status='active'
-        ).all()
+        subjects = Subject.query.join(
+            StudentEnrollment, StudentEnrollment.subject_id == Subject.subject_id
+        ).filter(
+            StudentEnrollment.student_id == student_id,
+            StudentEnrollment.status == 'active'
+        ).order_by(StudentEnrollment.enrollment_id).all()
         
         subjects_data = []
-        for enrollment in enrollments:
-            subject = enrollment.subject
-            
-            # Calculate subject attendance
-            total_classes = Attendance.query.filter_by(
-                student_id=student_id,
-                subject_id=subject.subject_id
-            ).count()
-            
-            attended = Attendance.query.filter_by(
-                student_id=student_id,
-                subject_id=subject.subject_id,
-                status='Present'
-            ).count()
-            
-            absent = Attendance.query.filter_by(
-                student_id=student_id,
-                subject_id=subject.subject_id,
-                status='Absent'
-            ).count()
-            
-            late = Attendance.query.filter_by(
-                student_id=student_id,
-                subject_id=subject.subject_id,
-                status='Late'
-            ).count()
-            
-            percentage = calculate_attendance_percentage(student_id, subject.subject_id)
-            
+        for subject in subjects:
+            counts = summary.get(subject.subject_id, empty_counts())
             subjects_data.append({
                 'subject_id': subject.subject_id,
                 'subject_name': subject.subject_name,
-                'total_classes': total_classes,
-                'attended': attended,
-                'absent': absent,
-                'late': late,
-                'percentage': percentage
+                'total_classes': counts['total'],
+                'attended': counts['present'],
+                'absent': counts['absent'],
+                'late': counts['late'],
+                'percentage': attendance_percentage(counts)
             })
         
         return jsonify({
@@ -9,47 +9,56 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_j
 from datetime import datetime
 from functools import wraps
 
+from database import use_read_replica
+from utils.metrics import metrics
+
 # Import models (will be available once database is set up)
 # from models import Faculty, Student
 # from database import db
 
 faculty_bp = Blueprint('faculty', __name__, url_prefix='/api/faculty')
 
-def create_notifications_for_students(title, message, notification_type, link=None):
+def create_notifications_for_students(title, message, notification_type, link=None,
+                                      department=None, semester=None, subject_id=None, created_by=None):
     """
-    Create notifications for all students
+    Notify all students, optionally narrowed to a department, semester
+    and/or subject enrollment. Stored as one broadcast row; returns the
+    number of students it reaches.
     """
+    from database import db
     try:
-        from models.gecr_models import Student, Notification
-        from database import db
-        
-        # Get all students
-        students = Student.query.all()
-        
-        # Create a notification for each student
-        notifications = []
-        for student in students:
-            notif = Notification(
-                user_id=student.student_id,
-                user_type='student',
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                link=link
-            )
-            notifications.append(notif)
+        from utils.notifications import broadcast_to_students
         
-        # Bulk insert
-        db.session.bulk_save_objects(notifications)
+        broadcast, count = broadcast_to_students(
+            title, message, notification_type, link,
+            department=department, semester=semester, subject_id=subject_id, created_by=created_by
+        )
         db.session.commit()
         
-        current_app.logger.info(f"Created {len(notifications)} notifications for {notification_type}")
-        return len(notifications)
+        current_app.logger.info(f"Broadcast {notification_type} {broadcast.broadcast_id} to {count} students")
+        return count
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Create notifications error: {str(e)}")
         return 0
 
 
+def get_notification_audience(data):
+    """
+    Read optional audience filters (department, semester, subject_id) from a
+    request body. Raises ValueError on a non-integer semester/subject_id.
+    """
+    audience = {'department': data.get('department') or None, 'semester': None, 'subject_id': None}
+    for key in ('semester', 'subject_id'):
+        value = data.get(key)
+        if value not in (None, ''):
+            try:
+                audience[key] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'{key} must be an integer')
+    return audience
+
+
 
 # Email notification functions removed - no longer sending emails
 
@@ -114,6 +123,7 @@ def require_faculty_auth():
     return decorator
 
 @faculty_bp.route('/dashboard', methods=['GET'])
+@use_read_replica
 @require_faculty_auth()
 def get_dashboard():
     """
@@ -240,6 +250,42 @@ def faculty_unread_notifications_count():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@faculty_bp.route('/notifications/stream', methods=['GET'])
+@require_faculty_auth()
+def faculty_notification_stream():
+    """
+    Server-Sent Events: `notification` for each new notification and
+    `unread_count` whenever it changes. An idle stream runs no queries;
+    /notifications/unread-count stays available for clients without SSE.
+    """
+    try:
+        from flask import Response, stream_with_context
+        from database import db
+        from models.gecr_models import Notification
+        from utils.notification_stream import notification_stream
+
+        faculty_id = get_current_faculty_id()
+        if not faculty_id:
+            return jsonify({'error': 'Faculty not authenticated'}), 401
+
+        def unread_count():
+            try:
+                return Notification.query.filter_by(user_id=faculty_id, user_type='faculty', read=False).count()
+            finally:
+                # Do not hold a connection/transaction open between events
+                db.session.close()
+
+        return Response(
+            stream_with_context(notification_stream.events('faculty', faculty_id, unread_count)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"Faculty notification stream error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @faculty_bp.route('/notifications', methods=['GET'])
 @require_faculty_auth()
 def faculty_get_notifications():
@@ -535,17 +581,26 @@ def remove_student_enrollment(subject_id, enrollment_id):
 
 @faculty_bp.route('/subjects/<int:subject_id>/enrollments/bulk-upload', methods=['POST'])
 @require_faculty_auth()
+@metrics.time_upload('enrollments')
 def bulk_upload_enrollments(subject_id):
     """
     Bulk upload students to a subject from Excel or CSV file
     Expects file with columns: enrollment_no or roll_no (required), name (optional)
+    
+    The roster is reconciled with the subject's enrollments in one pass:
+    new students are enrolled and dropped ones reactivated. Optional form
+    fields:
+        - drop_missing: also drop active students missing from the file
+        - dry_run: only report the changes (send it first to preview)
+    
+    The file is imported in the background: answers 202 with the job; poll
+    GET /api/jobs/<job_id> for progress, per-row errors and the summary.
     """
     try:
         from database import db
-        from models.gecr_models import Faculty, Subject, Student, StudentEnrollment
-        from sqlalchemy import or_
-        import pandas as pd
+        from models.gecr_models import Faculty, Subject
         from werkzeug.utils import secure_filename
+        from utils.jobs import import_jobs
         import os
         
         current_user_email = get_current_user_email()
@@ -579,82 +634,14 @@ def bulk_upload_enrollments(subject_id):
         if file_ext not in allowed_extensions:
             return jsonify({'error': 'Invalid file format. Only Excel (.xlsx, .xls) and CSV (.csv) files are allowed'}), 400
         
-        # Read file into pandas DataFrame
-        try:
-            if file_ext == '.csv':
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-        except Exception as e:
-            return jsonify({'error': f'Failed to read file: {str(e)}'}), 400
-        
-        # Validate required columns
-        enrollment_col = None
-        for col in df.columns:
-            col_lower = col.lower().strip()
-            if col_lower in ['enrollment_no', 'enrollment', 'enroll_no', 'roll_no', 'rollno', 'roll no']:
-                enrollment_col = col
-                break
-        
-        if not enrollment_col:
-            return jsonify({'error': 'File must contain an "enrollment_no" or "roll_no" column'}), 400
-        
-        # Process enrollments
-        added_count = 0
-        skipped_count = 0
-        not_found = []
-        
-        for index, row in df.iterrows():
-            enrollment_no = str(row[enrollment_col]).strip()
-            
-            if pd.isna(enrollment_no) or not enrollment_no or enrollment_no.lower() == 'nan':
-                continue
-            
-            # Find student by enrollment number
-            student = Student.query.filter(
-                or_(
-                    Student.enrollment_no == enrollment_no,
-                    Student.roll_no == enrollment_no
-                )
-            ).first()
-            
-            if not student:
-                not_found.append(enrollment_no)
-                continue
-            
-            # Check if already enrolled
-            existing = StudentEnrollment.query.filter_by(
-                student_id=student.student_id,
-                subject_id=subject_id
-            ).first()
-            
-            if existing:
-                # If dropped, reactivate
-                if existing.status == 'dropped':
-                    existing.status = 'active'
-                    added_count += 1
-                else:
-                    skipped_count += 1
-                continue
-            
-            # Create new enrollment
-            new_enrollment = StudentEnrollment(
-                student_id=student.student_id,
-                subject_id=subject_id,
-                status='active'
-            )
-            db.session.add(new_enrollment)
-            added_count += 1
-        
-        db.session.commit()
-        
+        flags = {name: request.form.get(name, 'false').lower() in ('1', 'true', 'yes')
+                 for name in ('drop_missing', 'dry_run')}
+        job, queued = import_jobs.start('enrollments', 'faculty', faculty_id, file, {'subject_id': subject_id, **flags})
         return jsonify({
-            'success': True,
-            'added': added_count,
-            'skipped': skipped_count,
-            'not_found': not_found,
-            'message': f'Successfully added {added_count} students'
-        }), 200
+            'message': 'Enrollment preview started' if flags['dry_run'] else 'Enrollment upload started',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.job_id}'
+        }), 202 if queued else 200
         
     except Exception as e:
         db.session.rollback()
@@ -856,42 +843,80 @@ def reject_enrollment_request(enrollment_id):
 
 
 @faculty_bp.route('/students', methods=['GET'])
+@use_read_replica
 @require_faculty_auth()
 def get_students():
     """
     Get students - optionally filtered by subject, semester, or search query
-    Query parameters: subject_id, semester, search
+    Query parameters: subject_id, semester, search, limit, cursor
+    
+    Without limit/cursor the full list is returned as a JSON array. With them the
+    response is {'students': [...], 'next_cursor': ...}; pass next_cursor back
+    as ?cursor= to fetch the following page (null on the last page).
+    Attendance and enrollment counts come from grouped subqueries joined to
+    Student, so any page is a single query; the body is streamed.
     """
     try:
+        import json
+        from flask import Response, stream_with_context
         from database import db
-        from models.gecr_models import Student, StudentEnrollment, Subject
-        
-        current_app.logger.info("=== Faculty Students API Called ===")
-        current_user_email = get_current_user_email()
-        current_app.logger.info(f"User: {current_user_email}")
+        from models.gecr_models import Student, StudentEnrollment, AttendanceSummary
+        from utils.attendance_summary import attendance_percentage
+        from utils.pagination import (
+            encode_cursor, decode_cursor, parse_page_size, iter_json_array, DEFAULT_PAGE_SIZE
+        )
         
         # Get query parameters
         subject_id = request.args.get('subject_id', type=int)
         semester = request.args.get('semester', type=int)
         search = request.args.get('search', '')
-        current_app.logger.info(f"Params: subject_id={subject_id}, semester={semester}, search={search}")
+        cursor = request.args.get('cursor')
         
-        # Build query
-        query = Student.query
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+            after = decode_cursor(cursor, 2) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if after and limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        
+        # Per-student totals, aggregated once and joined below
+        attendance = db.session.query(
+            AttendanceSummary.student_id.label('student_id'),
+            db.func.sum(AttendanceSummary.present).label('present'),
+            db.func.sum(AttendanceSummary.total).label('total')
+        ).group_by(AttendanceSummary.student_id).subquery()
+        
+        enrollments = db.session.query(
+            StudentEnrollment.student_id.label('student_id'),
+            db.func.count(StudentEnrollment.enrollment_id).label('enrolled')
+        ).filter(
+            StudentEnrollment.status == 'active'
+        ).group_by(StudentEnrollment.student_id).subquery()
+        
+        query = db.session.query(
+            Student,
+            db.func.coalesce(attendance.c.present, 0),
+            db.func.coalesce(attendance.c.total, 0),
+            db.func.coalesce(enrollments.c.enrolled, 0)
+        ).outerjoin(
+            attendance, attendance.c.student_id == Student.student_id
+        ).outerjoin(
+            enrollments, enrollments.c.student_id == Student.student_id
+        )
         
         # Filter by subject enrollment if subject_id provided
         if subject_id:
-            # Get students enrolled in this subject
-            enrolled_student_ids = db.session.query(StudentEnrollment.student_id).filter_by(
-                subject_id=subject_id,
-                status='active'
-            ).all()
-            enrolled_ids = [sid[0] for sid in enrolled_student_ids]
-            query = query.filter(Student.student_id.in_(enrolled_ids))
+            query = query.filter(Student.student_id.in_(
+                db.session.query(StudentEnrollment.student_id).filter_by(
+                    subject_id=subject_id,
+                    status='active'
+                )
+            ))
         
         # Filter by semester
         if semester:
-            query = query.filter_by(semester=semester)
+            query = query.filter(Student.semester == semester)
         
         # Search by name, roll_no, or email
         if search:
@@ -904,55 +929,52 @@ def get_students():
                 )
             )
         
-        students = query.order_by(Student.name).all()
-        current_app.logger.info(f"Found {len(students)} students")
+        # Keyset pagination on (name, student_id)
+        if after:
+            after_name, after_id = after
+            query = query.filter(db.or_(
+                Student.name > after_name,
+                db.and_(Student.name == after_name, Student.student_id > after_id)
+            ))
+        
+        query = query.order_by(Student.name, Student.student_id)
+        if limit:
+            # One extra row tells us whether there is a next page
+            query = query.limit(limit + 1)
+        
+        current_app.logger.debug(
+            f"Faculty students: subject_id={subject_id}, semester={semester}, "
+            f"search={search!r}, limit={limit}, user={get_current_user_email()}"
+        )
+        
+        rows = query.yield_per(500)
         
-        # Get attendance percentage for each student
-        student_list = []
-        for idx, student in enumerate(students):
-            try:
-                current_app.logger.info(f"Processing student {idx+1}/{len(students)}: {student.name}")
+        def serialize(row_iter):
+            for student, present, total, enrolled in row_iter:
                 student_dict = student.to_dict()
-                
-                # Calculate attendance percentage using proper ORM
-                from models.gecr_models import Attendance
-                
-                # Simpler query that works across SQLAlchemy versions
-                # Get unique class dates for this student
-                total_classes_query = db.session.query(
-                    Attendance.subject_id,
-                    Attendance.date
-                ).filter(
-                    Attendance.student_id == student.student_id
-                ).distinct()
-                
-                total_classes = total_classes_query.count()
-                
-                present_count = db.session.query(db.func.count(Attendance.attendance_id)).filter(
-                    Attendance.student_id == student.student_id,
-                    Attendance.status == 'present'
-                ).scalar() or 0
-                
-                attendance_percentage = (present_count / total_classes * 100) if total_classes > 0 else 0
-                student_dict['attendance_percentage'] = round(attendance_percentage, 2)
-                
-                # Get enrolled subjects count
-                enrolled_count = StudentEnrollment.query.filter_by(
-                    student_id=student.student_id,
-                    status='active'
-                ).count()
-                student_dict['enrolled_subjects_count'] = enrolled_count
-                
-                student_list.append(student_dict)
-                
-            except Exception as student_error:
-                current_app.logger.error(f"Error processing student {student.name}: {str(student_error)}")
-                import traceback
-                traceback.print_exc()
-                # Continue with other students
-        
-        current_app.logger.info(f"Successfully processed {len(student_list)} students")
-        return jsonify(student_list), 200
+                student_dict['attendance_percentage'] = attendance_percentage({'present': present, 'total': total})
+                student_dict['enrolled_subjects_count'] = enrolled
+                yield student_dict
+        
+        if not limit:
+            return Response(
+                stream_with_context(iter_json_array(serialize(rows))),
+                mimetype='application/json'
+            ), 200
+        
+        page = list(rows)
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1][0]
+            next_cursor = encode_cursor([last.name, last.student_id])
+        
+        def generate():
+            yield '{"students":'
+            yield from iter_json_array(serialize(page))
+            yield f',"limit":{limit},"next_cursor":{json.dumps(next_cursor)}}}'
+        
+        return Response(stream_with_context(generate()), mimetype='application/json'), 200
         
     except Exception as e:
         current_app.logger.error(f"Faculty students error: {str(e)}")
@@ -1046,26 +1068,32 @@ def add_student():
 
 @faculty_bp.route('/students/upload', methods=['POST'])
 @require_faculty_auth()
+@metrics.time_upload('students')
 def upload_students_excel():
     """
     Upload multiple students from Excel file
     Expected form data:
-        - file: Excel file (.xlsx or .xls)
+        - file: Excel or CSV file (.xlsx, .xls or .csv)
     
     Excel format:
         - Columns: Roll No, Name, Email, Password, Department, Semester, Phone
+    
+    The file is imported in the background: answers 202 with the job; poll
+    GET /api/jobs/<job_id> for progress, per-row errors and the summary.
     """
     try:
         import os
-        from werkzeug.utils import secure_filename
-        from database import db
-        from models.gecr_models import Student, Notification, Faculty
+        from models.gecr_models import Faculty
+        from utils.jobs import import_jobs
         
-        # Get current faculty for activity logging
+        # Get current faculty (owner of the import job)
         current_user_email = get_current_user_email()
         faculty = Faculty.find_by_email(current_user_email) if current_user_email else None
         faculty_id = faculty.faculty_id if faculty else get_current_faculty_id()
         
+        if not faculty_id:
+            return jsonify({'error': 'Faculty not found'}), 404
+        
         # Check if file is present
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
@@ -1075,129 +1103,22 @@ def upload_students_excel():
             return jsonify({'error': 'No file selected'}), 400
         
         # Validate file extension
-        allowed_extensions = {'.xlsx', '.xls'}
+        allowed_extensions = {'.xlsx', '.xls', '.csv'}
         file_ext = os.path.splitext(file.filename)[1].lower()
         if file_ext not in allowed_extensions:
-            return jsonify({'error': 'Invalid file format. Please upload .xlsx or .xls file'}), 400
+            return jsonify({'error': 'Invalid file format. Please upload .xlsx, .xls or .csv file'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        temp_dir = os.path.join(current_app.root_path, 'temp_uploads')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_path = os.path.join(temp_dir, f"students_{datetime.now().timestamp()}_{filename}")
-        file.save(temp_path)
-        
-        try:
-            # Parse Excel file
-            from utils.student_parser import parse_students_excel
-            result = parse_students_excel(temp_path)
-            
-            if result['errors']:
-                return jsonify({
-                    'error': 'Errors found in Excel file',
-                    'details': result['errors']
-                }), 400
-            
-            students_data = result.get('students', [])
-            if not students_data:
-                return jsonify({'error': 'No student records found in Excel file'}), 400
-            
-            # Create students
-            created_students = []
-            skipped = []
-            errors = []
-            
-            for student_data in students_data:
-                try:
-                    # Check if student already exists
-                    existing = Student.query.filter(
-                        db.or_(
-                            Student.roll_no == student_data['roll_no'],
-                            Student.email == student_data['email']
-                        )
-                    ).first()
-                    
-                    if existing:
-                        skipped.append({
-                            'roll_no': student_data['roll_no'],
-                            'reason': 'Already exists'
-                        })
-                        continue
-                    
-                    # Create student
-                    student = Student(
-                        roll_no=student_data['roll_no'],
-                        name=student_data['name'],
-                        email=student_data['email'],
-                        department=student_data.get('department'),
-                        semester=student_data.get('semester'),
-                        phone=student_data.get('phone'),
-                        email_notifications_enabled=True
-                    )
-                    student.set_password(student_data.get('password', 'student123'))
-                    
-                    db.session.add(student)
-                    db.session.flush()  # Get student_id
-                    
-                    # Create welcome notification
-                    notification = Notification(
-                        user_id=student.student_id,
-                        user_type='student',
-                        title='Welcome to GEC Rajkot!',
-                        message=f'Welcome {student.name}! Your account has been created. Roll No: {student.roll_no}',
-                        notification_type='system',
-                        link='/student/profile'
-                    )
-                    db.session.add(notification)
-                    
-                    created_students.append(student.to_dict())
-                    
-                except Exception as e:
-                    errors.append({
-                        'roll_no': student_data.get('roll_no', 'Unknown'),
-                        'error': str(e)
-                    })
-            
-            db.session.commit()
-            
-            # Log activity
-            if faculty_id:
-                try:
-                    from models.gecr_models import Activity
-                    activity = Activity(
-                        type='student_upload',
-                        title='Students uploaded from Excel',
-                        details=f'Created {len(created_students)} students, Skipped {len(skipped)}, Errors {len(errors)}',
-                        created_by=faculty_id
-                    )
-                    db.session.add(activity)
-                    db.session.commit()
-                except:
-                    pass
-            
-            return jsonify({
-                'message': 'Students upload completed',
-                'created': len(created_students),
-                'skipped': len(skipped),
-                'errors': len(errors),
-                'students': created_students,
-                'skipped_details': skipped,
-                'error_details': errors
-            }), 200
-            
-        finally:
-            # Clean up temp file
-            try:
-                os.remove(temp_path)
-            except Exception as e:
-                current_app.logger.error(f"Failed to remove temp file: {e}")
+        job, queued = import_jobs.start('students', 'faculty', faculty_id, file)
+        return jsonify({
+            'message': 'Students upload started',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.job_id}'
+        }), 202 if queued else 200
         
     except Exception as e:
+        from database import db
         db.session.rollback()
         current_app.logger.error(f"Students upload error: {str(e)}")
-        import traceback
-        traceback.print_exc()
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
 
@@ -1293,26 +1214,33 @@ def mark_attendance():
         if not faculty_id:
             return jsonify({'error': 'Faculty not found'}), 404
 
-        # Very basic save loop (could be optimized/batched)
-        marked = 0
+        from utils.attendance_writer import bulk_upsert_attendance
+
+        try:
+            attendance_date = datetime.fromisoformat(date).date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        # Ensure students exist with a single IN query
+        requested_ids = {entry.get('student_id') for entry in attendance_data}
+        known_ids = {
+            row.student_id for row in db.session.query(Student.student_id).filter(
+                Student.student_id.in_([sid for sid in requested_ids if sid is not None])
+            )
+        }
+
+        records = []
         errors = []
         for entry in attendance_data:
             sid = entry.get('student_id')
-            status = entry.get('status')
-            try:
-                # Ensure student exists
-                student = Student.query.get(sid)
-                if not student:
-                    errors.append({'student_id': sid, 'error': 'Student not found'})
-                    continue
-
-                att = Attendance(student_id=sid, subject_id=subject_id, date=datetime.fromisoformat(date).date() if 'T' not in date and ' ' not in date else datetime.fromisoformat(date), status=status)
-                db.session.add(att)
-                marked += 1
-            except Exception as e:
-                errors.append({'student_id': sid, 'error': str(e)})
+            if sid not in known_ids:
+                errors.append({'student_id': sid, 'error': 'Student not found'})
+                continue
+            records.append((sid, attendance_date, entry.get('status')))
 
         try:
+            result = bulk_upsert_attendance(subject_id, records)
+            marked = result['inserted'] + result['updated']
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -1362,23 +1290,25 @@ def mark_attendance():
 
 @faculty_bp.route('/attendance/upload', methods=['POST'])
 @require_faculty_auth()
+@metrics.time_upload('attendance_excel')
 def upload_attendance_excel():
     """
     Upload attendance data from Excel file
     Expected form data:
-        - file: Excel file (.xlsx or .xls)
+        - file: Excel or CSV file (.xlsx, .xls or .csv)
         - subject_id: Subject ID for which attendance is being marked
     
     Excel format:
         - First row: Roll No, [Date1], [Date2], ...
         - Each row: student roll number, attendance status (P/A/L)
+    
+    The file is imported in the background: answers 202 with the job; poll
+    GET /api/jobs/<job_id> for progress, per-row errors and the summary.
     """
     try:
         import os
-        from werkzeug.utils import secure_filename
-        from database import db
-        from models.gecr_models import Faculty, Attendance, Student
-        from utils.excel_parser import parse_attendance_excel
+        from models.gecr_models import Faculty, Subject
+        from utils.jobs import import_jobs
         
         # Get current faculty
         current_user_email = get_current_user_email()
@@ -1397,10 +1327,10 @@ def upload_attendance_excel():
             return jsonify({'error': 'No file selected'}), 400
         
         # Validate file extension
-        allowed_extensions = {'.xlsx', '.xls'}
+        allowed_extensions = {'.xlsx', '.xls', '.csv'}
         file_ext = os.path.splitext(file.filename)[1].lower()
         if file_ext not in allowed_extensions:
-            return jsonify({'error': 'Invalid file format. Please upload .xlsx or .xls file'}), 400
+            return jsonify({'error': 'Invalid file format. Please upload .xlsx, .xls or .csv file'}), 400
         
         # Get subject_id from form data
         subject_id = request.form.get('subject_id')
@@ -1412,134 +1342,21 @@ def upload_attendance_excel():
         except ValueError:
             return jsonify({'error': 'Invalid subject ID'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        temp_dir = os.path.join(current_app.root_path, 'temp_uploads')
-        os.makedirs(temp_dir, exist_ok=True)
+        # Verify faculty teaches this subject
+        subject = Subject.query.get(subject_id)
+        if not subject:
+            return jsonify({'error': 'Subject not found'}), 404
         
-        temp_path = os.path.join(temp_dir, f"{faculty_id}_{datetime.now().timestamp()}_{filename}")
-        file.save(temp_path)
+        if subject.faculty_id != faculty_id:
+            return jsonify({'error': 'You are not authorized to mark attendance for this subject'}), 403
         
-        try:
-            # Parse Excel file
-            result = parse_attendance_excel(temp_path)
-            
-            if result['errors']:
-                return jsonify({
-                    'error': 'Errors found in Excel file',
-                    'details': result['errors'],
-                    'dates_found': [d.strftime('%Y-%m-%d') for d in result.get('dates', [])]
-                }), 400
-            
-            records = result.get('records', [])
-            if not records:
-                return jsonify({'error': 'No attendance records found in Excel file'}), 400
-            
-            # Map roll numbers to student IDs and validate enrollment
-            roll_numbers = list(set([r['student_roll_no'] for r in records]))
-            students_dict = {}
-            not_enrolled = []
-            
-            # Import StudentEnrollment model
-            from models.gecr_models import StudentEnrollment, Subject
-            
-            # Verify faculty teaches this subject
-            subject = Subject.query.get(subject_id)
-            if not subject:
-                return jsonify({'error': 'Subject not found'}), 404
-            
-            if subject.faculty_id != faculty_id:
-                return jsonify({'error': 'You are not authorized to mark attendance for this subject'}), 403
-            
-            for roll_no in roll_numbers:
-                student = Student.query.filter_by(roll_no=roll_no).first()
-                if student:
-                    # Check if student is enrolled in this subject
-                    enrollment = StudentEnrollment.query.filter_by(
-                        student_id=student.student_id,
-                        subject_id=subject_id,
-                        status='active'
-                    ).first()
-                    
-                    if enrollment:
-                        students_dict[roll_no] = student.student_id
-                    else:
-                        not_enrolled.append(roll_no)
-                        current_app.logger.warning(f"Student {roll_no} not enrolled in subject {subject_id}")
-                else:
-                    current_app.logger.warning(f"Student with roll number {roll_no} not found")
-            
-            # Create attendance records
-            attendance_objects = []
-            skipped = 0
-            not_enrolled_count = len(not_enrolled)
-            
-            for record in records:
-                roll_no = record['student_roll_no']
-                if roll_no not in students_dict:
-                    skipped += 1
-                    continue
-                
-                # Check if attendance already exists for this student, subject, and date
-                existing = Attendance.query.filter_by(
-                    student_id=students_dict[roll_no],
-                    subject_id=subject_id,
-                    date=record['date']
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.status = record['status']
-                else:
-                    # Create new record
-                    att = Attendance(
-                        student_id=students_dict[roll_no],
-                        subject_id=subject_id,
-                        date=record['date'],
-                        status=record['status']
-                    )
-                    attendance_objects.append(att)
-            
-            # Bulk insert new records
-            if attendance_objects:
-                db.session.bulk_save_objects(attendance_objects)
-            
-            db.session.commit()
-            
-            # Create activity log
-            try:
-                from models.gecr_models import Activity
-                dates_str = ', '.join([d.strftime('%Y-%m-%d') for d in result['dates']])
-                activity = Activity(
-                    type='attendance_upload',
-                    title=f'Attendance uploaded for subject {subject_id}',
-                    details=f'Uploaded {len(attendance_objects)} records for dates: {dates_str}',
-                    created_by=faculty_id
-                )
-                db.session.add(activity)
-                db.session.commit()
-            except Exception as e:
-                current_app.logger.error(f"Failed to log activity: {e}")
-            
-            return jsonify({
-                'message': 'Attendance uploaded successfully',
-                'records_inserted': len(attendance_objects),
-                'records_updated': result['total_records'] - len(attendance_objects) - skipped - not_enrolled_count,
-                'records_skipped': skipped,
-                'not_enrolled': not_enrolled_count,
-                'not_enrolled_students': not_enrolled if not_enrolled else [],
-                'dates': [d.strftime('%Y-%m-%d') for d in result['dates']],
-                'total_students': len(students_dict),
-                'subject_id': subject_id,
-                'subject_name': subject.subject_name
-            }), 200
-            
-        finally:
-            # Clean up temp file
-            try:
-                os.remove(temp_path)
-            except Exception as e:
-                current_app.logger.error(f"Failed to remove temp file: {e}")
+        job, queued = import_jobs.start('attendance_excel', 'faculty', faculty_id, file,
+                                        {'subject_id': subject_id})
+        return jsonify({
+            'message': 'Attendance upload started',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.job_id}'
+        }), 202 if queued else 200
         
     except Exception as e:
         current_app.logger.error(f"Attendance upload error: {str(e)}")
@@ -1610,6 +1427,11 @@ def create_announcement():
         if not title or not message:
             return jsonify({'error': 'Title and message are required'}), 400
 
+        try:
+            audience = get_notification_audience(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         from database import db
         from models.gecr_models import Faculty, Announcement
         from datetime import datetime
@@ -1639,12 +1461,14 @@ def create_announcement():
             title=f"📢 New Announcement: {title}",
             message=message[:200],  # Truncate long messages
             notification_type='announcement',
-            link='/student/dashboard'
+            link='/student/dashboard',
+            created_by=author_id,
+            **audience
         )
 
         # Email notifications removed - no longer sending emails
 
-        return jsonify({'message': 'Announcement created', 'announcement_id': ann.announcement_id, 'announcement': ann.to_dict()}), 201
+        return jsonify({'message': 'Announcement created', 'announcement_id': ann.announcement_id, 'announcement': ann.to_dict(), 'notifications_sent': notif_count}), 201
 
     except Exception as e:
         current_app.logger.error(f"Create announcement error: {e}")
@@ -1757,6 +1581,11 @@ def create_event():
         if not title or not start_time:
             return jsonify({'error': 'Title and start_time are required'}), 400
 
+        try:
+            audience = get_notification_audience(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         from database import db
         from models.gecr_models import Faculty, Event
         user_email = get_current_user_email()
@@ -1779,16 +1608,18 @@ def create_event():
 
         # Create in-app notifications for all students
         event_time = start_dt.strftime('%B %d, %Y at %I:%M %p')
-        create_notifications_for_students(
+        notif_count = create_notifications_for_students(
             title=f"📅 New Event: {title}",
             message=f"{description} - {event_time}" + (f" at {location}" if location else ""),
             notification_type='event',
-            link='/student/events'
+            link='/student/events',
+            created_by=created_by,
+            **audience
         )
 
         # Email notifications removed - no longer sending emails
 
-        return jsonify({'message': 'Event created', 'event_id': ev.event_id, 'event': ev.to_dict()}), 201
+        return jsonify({'message': 'Event created', 'event_id': ev.event_id, 'event': ev.to_dict(), 'notifications_sent': notif_count}), 201
 
     except Exception as e:
         current_app.logger.error(f"Create event error: {e}")
@@ -1906,6 +1737,7 @@ def delete_event(event_id):
 
 
 @faculty_bp.route('/events/<int:event_id>/registrations/download', methods=['GET'])
+@use_read_replica
 @require_faculty_auth()
 def download_event_registrations(event_id):
     """Download event registrations as CSV"""
@@ -1982,12 +1814,14 @@ def faculty_mark_all_notifications_read():
     try:
         from database import db
         from models.gecr_models import Notification
+        from utils.notification_stream import notification_stream
 
         faculty_id = get_current_faculty_id()
         if not faculty_id:
             return jsonify({'error': 'Faculty not authenticated'}), 401
 
         Notification.query.filter_by(user_id=faculty_id, user_type='faculty', read=False).update({'read': True})
+        notification_stream.mark_changed(db.session, 'faculty', faculty_id)
         db.session.commit()
         return jsonify({'message': 'All notifications marked as read'}), 200
     except Exception as e:
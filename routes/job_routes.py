@@ -0,0 +1,48 @@
+"""
+Import Job Routes
+Progress, per-row errors and results of background imports started by the
+Excel/CSV upload endpoints
+Author: GEC Rajkot Development Team
+"""
+
+from flask import Blueprint, jsonify
+from database import db
+from models.gecr_models import ImportJob
+from utils.jobs import import_jobs
+import utils.import_jobs  # noqa: F401  (registers the job handlers)
+from .session_helpers import get_current_user
+
+# Create job blueprint
+job_bp = Blueprint('job', __name__, url_prefix='/api')
+
+
+@job_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """The logged-in user's 20 most recent import jobs"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    jobs = ImportJob.query.filter_by(owner_type=user[0], owner_id=user[1]) \
+        .order_by(ImportJob.created_at.desc()).limit(20).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs]})
+
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Progress of an import job: status (queued, running, succeeded, failed),
+    stage, rows done of total, per-row errors and, once finished, its result
+    """
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    job = db.session.get(ImportJob, job_id)
+    if job is None or (job.owner_type, job.owner_id) != user:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if import_jobs.is_stale(job):
+        # Its worker went away (restart, crash); continue it from the last committed chunk
+        import_jobs.resume_stale()
+        db.session.refresh(job)
+    return jsonify({'job': job.to_dict()})
@@ -0,0 +1,14 @@
+"""
+Session Helpers
+Who is logged in, for routes open to both students and faculty
+Author: GEC Rajkot Development Team
+"""
+
+from flask import session
+
+
+def get_current_user():
+    """(user_type, user_id) of the logged-in student or faculty member, or None"""
+    if 'user_id' not in session or session.get('user_type') not in ('student', 'faculty'):
+        return None
+    return session['user_type'], session['user_id']
@@ -9,6 +9,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_j
 from datetime import datetime
 from functools import wraps
 
+from database import use_read_replica
+
 # Import models (will be available once database is set up)
 # from models import Student
 # from database import db
@@ -72,7 +74,7 @@ def require_student_auth():
     return decorator
 
 @student_bp.route('/dashboard', methods=['GET'])
-
+@use_read_replica
 @require_student_auth()
 def get_dashboard():
     """
@@ -259,6 +261,9 @@ def get_attendance():
     try:
         from database import db
         from models.gecr_models import Student, Attendance, Subject, StudentEnrollment
+        from utils.attendance_summary import (
+            get_student_attendance_summary, attendance_percentage, combine_counts, empty_counts
+        )
         from datetime import datetime, timedelta
         
         current_user_email = get_current_user_email()
@@ -280,6 +285,7 @@ def get_attendance():
             query = query.filter_by(subject_id=subject_id)
         
         # Filter by date range
+        start = end = None
         if start_date:
             try:
                 start = datetime.strptime(start_date, '%Y-%m-%d').date()
@@ -297,60 +303,49 @@ def get_attendance():
         # Get attendance records
         attendance_records = query.order_by(Attendance.date.desc()).all()
         
-        # Group by subject and calculate percentages
-        subject_attendance = {}
+        # Counts per subject from one GROUP BY query with the same filters
+        summary = get_student_attendance_summary(
+            student.student_id, subject_id, start_date=start, end_date=end
+        )
+        subject_names = dict(db.session.query(Subject.subject_id, Subject.subject_name).filter(
+            Subject.subject_id.in_(list(summary.keys()))
+        ).all()) if summary else {}
         
+        # Subjects are listed in order of their most recent record
+        subject_attendance = {}
         for record in attendance_records:
             subject_id_key = record.subject_id
             if subject_id_key not in subject_attendance:
-                subject = Subject.query.get(subject_id_key)
+                counts = summary.get(subject_id_key) or empty_counts()
                 subject_attendance[subject_id_key] = {
                     'subject_id': subject_id_key,
-                    'subject_name': subject.subject_name if subject else 'Unknown',
-                    'total_classes': 0,
-                    'present_count': 0,
-                    'absent_count': 0,
-                    'late_count': 0,
-                    'attendance_percentage': 0,
+                    'subject_name': subject_names.get(subject_id_key, 'Unknown'),
+                    'total_classes': counts['total'],
+                    'present_count': counts['present'],
+                    'absent_count': counts['absent'],
+                    'late_count': counts['late'],
+                    'attendance_percentage': attendance_percentage(counts),
                     'records': []
                 }
             
-            subject_attendance[subject_id_key]['total_classes'] += 1
-            
-            if record.status == 'Present':
-                subject_attendance[subject_id_key]['present_count'] += 1
-            elif record.status == 'Absent':
-                subject_attendance[subject_id_key]['absent_count'] += 1
-            elif record.status == 'Late':
-                subject_attendance[subject_id_key]['late_count'] += 1
-            
             subject_attendance[subject_id_key]['records'].append({
                 'date': record.date.strftime('%Y-%m-%d'),
                 'status': record.status,
                 'attendance_id': record.attendance_id
             })
         
-        # Calculate percentages
-        for subj_data in subject_attendance.values():
-            if subj_data['total_classes'] > 0:
-                subj_data['attendance_percentage'] = round(
-                    (subj_data['present_count'] / subj_data['total_classes']) * 100, 2
-                )
-        
         # Calculate overall attendance
-        total_all = len(attendance_records)
-        present_all = sum(1 for r in attendance_records if r.status == 'Present')
-        overall_percentage = round((present_all / total_all * 100), 2) if total_all > 0 else 0
+        overall = combine_counts(summary.values())
         
         return jsonify({
-            'overall_attendance_percentage': overall_percentage,
-            'total_classes_attended': total_all,
-            'present_count': present_all,
+            'overall_attendance_percentage': attendance_percentage(overall),
+            'total_classes_attended': overall['total'],
+            'present_count': overall['present'],
             'by_subject': list(subject_attendance.values()),
             'recent_records': [
                 {
                     'date': r.date.strftime('%Y-%m-%d'),
-                    'subject_name': r.subject.subject_name if r.subject else 'Unknown',
+                    'subject_name': subject_names.get(r.subject_id, 'Unknown'),
                     'status': r.status
                 }
                 for r in attendance_records[:10]  # Last 10 records
@@ -431,7 +426,10 @@ def get_subjects():
     """
     try:
         from database import db
-        from models.gecr_models import Student, StudentEnrollment, Attendance
+        from models.gecr_models import Student, StudentEnrollment
+        from utils.attendance_summary import (
+            get_student_attendance_summary, empty_counts, attendance_percentage as attendance_percentage_of
+        )
         
         current_user_email = get_current_user_email()
         student = Student.find_by_email(current_user_email) if current_user_email else None
@@ -445,25 +443,19 @@ def get_subjects():
             status='active'
         ).all()
         
+        # Attendance counters for all subjects in one read
+        summary = get_student_attendance_summary(student.student_id)
+        
         subjects_list = []
         for enrollment in enrollments:
             subject = enrollment.subject
             if not subject:
                 continue
             
-            # Calculate attendance for this subject
-            total_classes = Attendance.query.filter_by(
-                student_id=student.student_id,
-                subject_id=subject.subject_id
-            ).count()
-            
-            present_count = Attendance.query.filter_by(
-                student_id=student.student_id,
-                subject_id=subject.subject_id,
-                status='Present'
-            ).count()
-            
-            attendance_percentage = round((present_count / total_classes * 100), 2) if total_classes > 0 else 0
+            counts = summary.get(subject.subject_id) or empty_counts()
+            total_classes = counts['total']
+            present_count = counts['present']
+            attendance_percentage = attendance_percentage_of(counts)
             
             subjects_list.append({
                 'id': subject.subject_id,  # Add 'id' field
@@ -1052,6 +1044,7 @@ def get_event_registrations(event_id):
 
 
 @student_bp.route('/events/<int:event_id>/download-registrations', methods=['GET'])
+@use_read_replica
 @require_student_auth()
 def download_event_registrations(event_id):
     """
@@ -1248,40 +1241,25 @@ def get_recent_activities():
 @require_student_auth()
 def get_notifications():
     """
-    Get notifications for the student
+    Get notifications for the student (personal and broadcast, newest first)
     Query parameters: unread_only (boolean), limit (int)
     """
     try:
-        from models.gecr_models import Notification
+        from models.gecr_models import Student
+        from utils.notifications import get_student_notifications
         
         student_id = get_current_student_id()
-        if not student_id:
+        student = Student.query.get(student_id) if student_id else None
+        if not student:
             return jsonify({'error': 'Student not found'}), 404
         
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         limit = int(request.args.get('limit', 20))
         
-        query = Notification.query.filter_by(
-            user_id=student_id,
-            user_type='student'
-        )
-        
-        if unread_only:
-            query = query.filter_by(read=False)
-        
-        notifications = query.order_by(
-            Notification.created_at.desc()
-        ).limit(limit).all()
-        
-        # Count unread notifications
-        unread_count = Notification.query.filter_by(
-            user_id=student_id,
-            user_type='student',
-            read=False
-        ).count()
+        notifications, unread_count = get_student_notifications(student, limit, unread_only)
         
         return jsonify({
-            'notifications': [n.to_dict() for n in notifications],
+            'notifications': notifications,
             'unread_count': unread_count
         }), 200
         
@@ -1290,6 +1268,47 @@ def get_notifications():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@student_bp.route('/notifications/stream', methods=['GET'])
+@require_student_auth()
+def notification_stream_events():
+    """
+    Server-Sent Events: `notification` for each new personal or broadcast
+    notification addressed to the student and `unread_count` whenever it
+    changes. An idle stream runs no queries; GET /notifications stays
+    available for clients without SSE.
+    """
+    try:
+        from flask import Response, stream_with_context
+        from models.gecr_models import Student
+        from utils.notifications import count_student_unread, audience_matcher
+        from utils.notification_stream import notification_stream
+        from database import db
+        
+        student_id = get_current_student_id()
+        student = Student.query.get(student_id) if student_id else None
+        if not student:
+            return jsonify({'error': 'Student not found'}), 404
+        
+        matches = audience_matcher(student)
+        
+        def unread_count():
+            try:
+                return count_student_unread(student)
+            finally:
+                # Do not hold a connection/transaction open between events
+                db.session.close()
+        
+        return Response(
+            stream_with_context(notification_stream.events('student', student_id, unread_count, matches)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Notification stream error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @student_bp.route('/notifications/<int:notification_id>/mark-read', methods=['POST'])
 @require_student_auth()
 def mark_notification_read(notification_id):
@@ -1323,6 +1342,33 @@ def mark_notification_read(notification_id):
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@student_bp.route('/notifications/broadcast/<int:broadcast_id>/mark-read', methods=['POST'])
+@require_student_auth()
+def mark_broadcast_notification_read(broadcast_id):
+    """
+    Mark a broadcast notification (announcement, event) as read
+    """
+    try:
+        from models.gecr_models import Student
+        from utils.notifications import mark_broadcast_read
+        from database import db
+        
+        student_id = get_current_student_id()
+        student = Student.query.get(student_id) if student_id else None
+        if not student:
+            return jsonify({'error': 'Student not found'}), 404
+        
+        if not mark_broadcast_read(student, broadcast_id):
+            return jsonify({'error': 'Notification not found'}), 404
+        db.session.commit()
+        
+        return jsonify({'message': 'Notification marked as read'}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Mark broadcast read error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @student_bp.route('/notifications/mark-all-read', methods=['POST'])
 @require_student_auth()
 def mark_all_notifications_read():
@@ -1330,11 +1376,14 @@ def mark_all_notifications_read():
     Mark all notifications as read for the student
     """
     try:
-        from models.gecr_models import Notification
+        from models.gecr_models import Notification, Student
+        from utils.notifications import mark_all_broadcasts_read
+        from utils.notification_stream import notification_stream
         from database import db
         
         student_id = get_current_student_id()
-        if not student_id:
+        student = Student.query.get(student_id) if student_id else None
+        if not student:
             return jsonify({'error': 'Student not found'}), 404
         
         Notification.query.filter_by(
@@ -1342,6 +1391,8 @@ def mark_all_notifications_read():
             user_type='student',
             read=False
         ).update({'read': True})
+        mark_all_broadcasts_read(student)
+        notification_stream.mark_changed(db.session, 'student', student_id)
         
         db.session.commit()
         
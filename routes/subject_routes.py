@@ -6,7 +6,7 @@ Author: GEC Rajkot Development Team
 
 from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, flash
 from datetime import datetime
-from database import db
+from database import db, use_read_replica
 from models.gecr_models import Subject, Faculty, Student, StudentEnrollment
 
 # Create subject management blueprint
@@ -85,6 +85,7 @@ def create_subject():
 
 
 @subject_bp.route('/all', methods=['GET'])
+@use_read_replica
 def get_all_subjects():
     """
     Get all subjects in the system
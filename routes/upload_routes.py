@@ -0,0 +1,178 @@
+"""
+Upload Routes
+Chunked, resumable file uploads into the content-addressed file store and
+access to the stored files
+Author: GEC Rajkot Development Team
+"""
+
+from flask import Blueprint, request, jsonify, send_file, current_app
+from werkzeug.utils import secure_filename
+from database import db
+from models.gecr_models import StoredFile, UploadSession
+from utils.file_store import (
+    UploadError, start_upload, write_chunk, cancel_upload, delete_file, blob_path, usage, quota_for
+)
+from utils.metrics import metrics
+from .session_helpers import get_current_user
+
+# Create upload blueprint
+upload_bp = Blueprint('upload', __name__, url_prefix='/api')
+
+
+def _upload_error(error):
+    return jsonify({'error': str(error), **error.details}), error.status
+
+
+def _own_upload(upload_id, user):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or (upload.owner_type, upload.owner_id) != user:
+        return None
+    return upload
+
+
+# ==================== CHUNKED UPLOADS ====================
+
+@upload_bp.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a chunked upload.
+    JSON: {"filename": "...", "size": <bytes>, "content_type": "..." (optional)}
+
+    Send the bytes with PATCH /api/uploads/<upload_id> in chunks of at most
+    chunk_size bytes, each with an Upload-Offset header.
+    """
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    if not filename:
+        return jsonify({'error': 'filename is required'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size is required'}), 400
+
+    try:
+        upload, stored = start_upload(user[0], user[1], filename, size, data.get('content_type'))
+    except UploadError as e:
+        return _upload_error(e)
+
+    if stored is not None:
+        return jsonify({'file': stored.to_dict(), 'deduplicated': False}), 201
+    return jsonify({
+        'upload': upload.to_dict(),
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE'],
+    }), 201
+
+
+@upload_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Progress of an upload; resume by sending the bytes from `offset` on"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    upload = _own_upload(upload_id, user)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify({'upload': upload.to_dict()})
+
+
+@upload_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+@metrics.time_upload('file_chunk')
+def upload_chunk(upload_id):
+    """
+    Append a chunk: the raw request body, starting at the Upload-Offset header.
+    Answers 200 with the new offset, or 201 with the stored file after the last chunk.
+    """
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    upload = _own_upload(upload_id, user)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    length = request.content_length
+    if length is not None and length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify({'error': 'Chunk is larger than chunk_size',
+                        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']}), 413
+
+    try:
+        # request.stream: the body is read straight from the socket, never buffered whole
+        received, stored, deduplicated = write_chunk(upload, offset, request.stream, length)
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        current_app.logger.error(f"Chunk upload failed for {upload_id}: {e}")
+        return jsonify({'error': 'Failed to store chunk'}), 500
+
+    if stored is not None:
+        return jsonify({'file': stored.to_dict(), 'deduplicated': deduplicated}), 201
+    return jsonify({'upload_id': upload_id, 'offset': received})
+
+
+@upload_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Cancel an upload and release the quota it reserved"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    upload = _own_upload(upload_id, user)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    cancel_upload(upload)
+    return jsonify({'message': 'Upload cancelled'})
+
+
+# ==================== STORED FILES ====================
+
+@upload_bp.route('/files', methods=['GET'])
+def list_files():
+    """The logged-in user's files, uploads in progress and quota"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    files = StoredFile.query.filter_by(owner_type=user[0], owner_id=user[1]) \
+        .order_by(StoredFile.created_at.desc()).all()
+    uploads = UploadSession.query.filter_by(owner_type=user[0], owner_id=user[1]).all()
+    return jsonify({
+        'files': [f.to_dict() for f in files],
+        'uploads': [u.to_dict() for u in uploads],
+        'used': usage(*user),
+        'quota': quota_for(user[0]) or None,
+    })
+
+
+@upload_bp.route('/files/<int:file_id>', methods=['GET'])
+def download_file(file_id):
+    """Download one of the logged-in user's files; the content hash is its ETag"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    stored = db.session.get(StoredFile, file_id)
+    if stored is None or (stored.owner_type, stored.owner_id) != user:
+        return jsonify({'error': 'File not found'}), 404
+    response = send_file(blob_path(stored.sha256), mimetype=stored.content_type or None,
+                         as_attachment=True, download_name=stored.filename, etag=stored.sha256,
+                         conditional=True)
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+@upload_bp.route('/files/<int:file_id>', methods=['DELETE'])
+def remove_file(file_id):
+    """Delete one of the logged-in user's files"""
+    user = get_current_user()
+    if user is None:
+        return jsonify({'error': 'Unauthorized'}), 401
+    stored = db.session.get(StoredFile, file_id)
+    if stored is None or (stored.owner_type, stored.owner_id) != user:
+        return jsonify({'error': 'File not found'}), 404
+    delete_file(stored)
+    return jsonify({'message': 'File deleted'})
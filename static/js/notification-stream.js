@@ -0,0 +1,42 @@
+// GEC Rajkot Notification Stream
+// Server-Sent Events for new notifications / unread counts, with a polling fallback
+window.GECUtils = window.GECUtils || {};
+
+GECUtils.NotificationStream = {
+    /**
+     * Listen to a notification stream endpoint.
+     * handlers: { onNotification(notification), onUnreadCount(count) }
+     * poll: called every pollIntervalMs only while the stream is unavailable
+     */
+    connect: function(url, handlers, poll, pollIntervalMs) {
+        let pollTimer = null;
+        const startPolling = () => {
+            if (pollTimer || !poll) return;
+            poll();
+            pollTimer = setInterval(poll, pollIntervalMs);
+        };
+        const stopPolling = () => {
+            if (pollTimer) {
+                clearInterval(pollTimer);
+                pollTimer = null;
+            }
+        };
+
+        if (!window.EventSource) {
+            startPolling();
+            return null;
+        }
+
+        const source = new EventSource(url);
+        source.addEventListener('open', stopPolling);
+        source.addEventListener('notification', (e) => {
+            if (handlers.onNotification) handlers.onNotification(JSON.parse(e.data));
+        });
+        source.addEventListener('unread_count', (e) => {
+            if (handlers.onUnreadCount) handlers.onUnreadCount(JSON.parse(e.data).unread_count);
+        });
+        // EventSource reconnects by itself; poll until it is back (or for good if it gives up)
+        source.addEventListener('error', startPolling);
+        return source;
+    }
+};
@@ -0,0 +1,100 @@
+"""
+Shared pytest fixtures: an app on the 'testing' config (in-memory SQLite)
+and small factories for the rows most tests need. pytest-flask provides
+`client` and keeps a request context pushed for each test.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from database import db
+from models.gecr_models import Faculty, Student, Subject, StudentEnrollment
+
+
+@pytest.fixture
+def database_url(request, tmp_path):
+    """
+    In memory by default; tests needing several connections parametrize it
+    indirectly with 'file' for a SQLite file in tmp_path
+    """
+    if getattr(request, 'param', None) == 'file':
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    return 'sqlite:///:memory:'
+
+
+@pytest.fixture
+def app(tmp_path, database_url, monkeypatch):
+    monkeypatch.setenv('TEST_DATABASE_URL', database_url)
+    app = create_app('testing')
+    # Uploads and job inputs stay out of the working tree
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    app.config['FILE_STORE_FOLDER'] = str(tmp_path / 'file_store')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def faculty(app):
+    faculty = Faculty(name='Test Faculty', email='faculty@gecr.edu', password='x')
+    db.session.add(faculty)
+    db.session.commit()
+    return faculty
+
+
+@pytest.fixture
+def subject(app, faculty):
+    subject = Subject(subject_name='Test Subject', subject_code='TEST1', faculty_id=faculty.faculty_id)
+    db.session.add(subject)
+    db.session.commit()
+    return subject
+
+
+@pytest.fixture
+def make_students(app):
+    """make_students(n, enroll_in=None) -> student_ids of n new students (R00000, R00001, ...)"""
+    def make(count, enroll_in=None, start=None):
+        start = db.session.query(Student).count() if start is None else start
+        db.session.execute(db.insert(Student), [
+            {'roll_no': f'R{i:05d}', 'name': f'Student {i}', 'email': f's{i}@gecr.edu', 'password': 'x'}
+            for i in range(start, start + count)
+        ])
+        student_ids = [student_id for (student_id,) in db.session.query(Student.student_id).filter(
+            Student.roll_no.in_([f'R{i:05d}' for i in range(start, start + count)])
+        ).order_by(Student.student_id)]
+        if enroll_in is not None:
+            db.session.execute(db.insert(StudentEnrollment), [
+                {'student_id': student_id, 'subject_id': enroll_in, 'status': 'active'}
+                for student_id in student_ids
+            ])
+        db.session.commit()
+        return student_ids
+    return make
+
+
+@contextmanager
+def count_statements():
+    """Count statements sent on the primary engine; yields a dict whose 'count' keeps updating"""
+    counter = {'count': 0}
+
+    def record(*args):
+        counter['count'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def login(client, user_id, user_type, email=None):
+    """Put a logged-in user into the test client's session"""
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['user_type'] = user_type
+        if email:
+            sess['user_email'] = email
@@ -0,0 +1,164 @@
+"""Bulk attendance upsert, summary counters and the duplicate cleanup"""
+
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from database import db, upgrade_schema, SchemaUpgradeError
+from models.gecr_models import Attendance, AttendanceSummary
+from utils.attendance_writer import (
+    bulk_upsert_attendance, rebuild_attendance_summary, find_duplicate_attendance, dedupe_attendance
+)
+
+DAY1, DAY2 = date(2026, 7, 1), date(2026, 7, 2)
+
+
+def counters(subject_id):
+    return {
+        row.student_id: (row.present, row.absent, row.late, row.total)
+        for row in AttendanceSummary.query.filter_by(subject_id=subject_id)
+    }
+
+
+def rebuilt_counters(subject_id):
+    rebuild_attendance_summary(subject_id)
+    db.session.commit()
+    return counters(subject_id)
+
+
+def drop_unique_index():
+    """Recreate the situation of an old database, before the unique index existed"""
+    index = next(ix for ix in Attendance.__table__.indexes if ix.name == 'unique_student_subject_date')
+    index.drop(db.engine)
+    return index
+
+
+def test_upsert_inserts_then_updates(subject, make_students):
+    first, second = make_students(2, enroll_in=subject.subject_id)
+
+    result = bulk_upsert_attendance(subject.subject_id, [
+        (first, DAY1, 'Present'), (second, DAY1, 'Absent'), (first, DAY2, 'Late')
+    ])
+    db.session.commit()
+    assert result == {'inserted': 3, 'updated': 0}
+
+    result = bulk_upsert_attendance(subject.subject_id, [(first, DAY1, 'Absent'), (second, DAY2, 'Present')])
+    db.session.commit()
+    assert result == {'inserted': 1, 'updated': 1}
+    assert Attendance.query.count() == 4
+    assert Attendance.query.filter_by(student_id=first, date=DAY1).one().status == 'Absent'
+
+
+def test_upsert_last_status_wins(subject, make_students):
+    (student,) = make_students(1, enroll_in=subject.subject_id)
+
+    bulk_upsert_attendance(subject.subject_id, [(student, DAY1, 'Present'), (student, DAY1, 'Late')])
+    db.session.commit()
+
+    assert [row.status for row in Attendance.query.all()] == ['Late']
+    assert counters(subject.subject_id) == {student: (0, 0, 1, 1)}
+
+
+def test_counters_follow_status_changes(subject, make_students):
+    first, second = make_students(2, enroll_in=subject.subject_id)
+
+    bulk_upsert_attendance(subject.subject_id, [(first, DAY1, 'Present'), (second, DAY1, 'Present')])
+    bulk_upsert_attendance(subject.subject_id, [(first, DAY1, 'Absent'), (first, DAY2, 'Present'),
+                                                (second, DAY1, 'Present')])
+    db.session.commit()
+
+    assert counters(subject.subject_id) == {first: (1, 1, 0, 2), second: (1, 0, 0, 1)}
+    assert counters(subject.subject_id) == rebuilt_counters(subject.subject_id)
+
+
+def test_dedupe_keeps_latest_mark(subject, make_students):
+    first, second = make_students(2, enroll_in=subject.subject_id)
+    drop_unique_index()
+    db.session.add_all([
+        Attendance(student_id=first, subject_id=subject.subject_id, date=DAY1, status='Absent'),
+        Attendance(student_id=first, subject_id=subject.subject_id, date=DAY1, status='Present'),
+        Attendance(student_id=second, subject_id=subject.subject_id, date=DAY1, status='Late'),
+    ])
+    db.session.commit()
+
+    assert [row['status'] for row in dedupe_attendance(dry_run=True)] == ['Absent']
+    assert Attendance.query.count() == 3
+
+    removed = dedupe_attendance()
+    db.session.commit()
+    assert [(row['student_id'], row['status']) for row in removed] == [(first, 'Absent')]
+    assert find_duplicate_attendance() == []
+    assert sorted((row.student_id, row.status) for row in Attendance.query) == [(first, 'Present'), (second, 'Late')]
+    assert counters(subject.subject_id) == {first: (1, 0, 0, 1), second: (0, 0, 1, 1)}
+
+
+def test_upgrade_schema_refuses_to_delete_duplicates(subject, make_students):
+    (student,) = make_students(1, enroll_in=subject.subject_id)
+    drop_unique_index()
+    db.session.add_all([
+        Attendance(student_id=student, subject_id=subject.subject_id, date=DAY1, status='Absent'),
+        Attendance(student_id=student, subject_id=subject.subject_id, date=DAY1, status='Present'),
+    ])
+    db.session.commit()
+
+    with pytest.raises(SchemaUpgradeError, match='dedupe-attendance'):
+        upgrade_schema()
+    assert Attendance.query.count() == 2
+
+    dedupe_attendance()
+    db.session.commit()
+    upgrade_schema()
+    assert Attendance.query.count() == 1
+
+
+def test_dedupe_command_reports_removed_rows(app, subject, make_students, tmp_path):
+    (student,) = make_students(1, enroll_in=subject.subject_id)
+    drop_unique_index()
+    db.session.add_all([
+        Attendance(student_id=student, subject_id=subject.subject_id, date=DAY1, status='Absent'),
+        Attendance(student_id=student, subject_id=subject.subject_id, date=DAY1, status='Present'),
+    ])
+    db.session.commit()
+    backup = tmp_path / 'removed.csv'
+
+    result = app.test_cli_runner().invoke(args=['dedupe-attendance', '--backup', str(backup)])
+
+    assert result.exit_code == 0, result.output
+    assert 'status=Absent' in result.output
+    assert 'Removed 1 duplicate attendance rows' in result.output
+    assert 'Absent' in backup.read_text()
+    assert Attendance.query.count() == 1
+
+
+@pytest.mark.parametrize('database_url', ['file'], indirect=True)
+def test_concurrent_submissions_count_once(app, subject, make_students):
+    """A second writer waits for the first to commit, then sees its rows as existing"""
+    (student,) = make_students(1, enroll_in=subject.subject_id)
+    subject_id = subject.subject_id
+    first_written = threading.Event()
+    errors = []
+
+    def second_writer():
+        try:
+            with app.app_context():
+                first_written.wait(5)
+                bulk_upsert_attendance(subject_id, [(student, DAY1, 'Absent')])
+                db.session.commit()
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    with app.app_context():
+        bulk_upsert_attendance(subject_id, [(student, DAY1, 'Present')])
+        first_written.set()
+        time.sleep(0.2)
+        db.session.commit()
+    thread.join(10)
+
+    assert errors == []
+    assert Attendance.query.one().status == 'Absent'
+    assert counters(subject_id) == {student: (0, 1, 0, 1)}
+    assert counters(subject_id) == rebuilt_counters(subject_id)
@@ -0,0 +1,65 @@
+"""Profile photos whose processing job was lost are recovered when the settings page polls"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from database import db
+from models.gecr_models import Student
+from utils.avatars import PENDING_DIR
+from tests.conftest import login
+
+
+@pytest.fixture
+def student(app):
+    student = Student(roll_no='P1', name='Photo', email='p1@gecr.edu', password='x')
+    db.session.add(student)
+    db.session.commit()
+    return student
+
+
+def lost_upload(app, student, age, staged=True):
+    """The state left behind when the process holding the photo job stopped: row 'processing', file staged"""
+    key = f'student_{student.student_id}_0a1b2c3d'
+    if staged:
+        pending_dir = os.path.join(app.config['UPLOAD_FOLDER'], PENDING_DIR)
+        os.makedirs(pending_dir, exist_ok=True)
+        Image.new('RGB', (400, 300), (200, 30, 30)).save(os.path.join(pending_dir, key + '.png'))
+    student.photo_status = 'processing'
+    student.photo_pending = key
+    student.photo_updated_at = datetime.utcnow() - age
+    db.session.commit()
+    return key
+
+
+def poll(client, student):
+    login(client, student.student_id, 'student')
+    response = client.get('/profile/photo-status')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_stale_upload_is_processed_again(app, client, student):
+    key = lost_upload(app, student, timedelta(hours=1))
+
+    state = poll(client, student)
+
+    assert state['status'] == 'ready'
+    assert state['photo_url'].endswith(f'{key}.jpg')
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], f'{key}_300.webp'))
+    assert not os.listdir(os.path.join(app.config['UPLOAD_FOLDER'], PENDING_DIR))
+
+
+def test_stale_upload_without_file_fails(app, client, student):
+    lost_upload(app, student, timedelta(hours=1), staged=False)
+
+    assert poll(client, student)['status'] == 'failed'
+    assert db.session.get(Student, student.student_id).photo_pending is None
+
+
+def test_recent_upload_is_left_processing(app, client, student):
+    lost_upload(app, student, timedelta(seconds=5))
+
+    assert poll(client, student)['status'] == 'processing'
@@ -0,0 +1,52 @@
+"""Dashboard cache misses in @use_read_replica views are computed on the primary"""
+
+import sqlite3
+
+import pytest
+from flask import g
+
+from database import db
+from models.gecr_models import Student
+from utils.dashboard_cache import dashboard_cache
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    """
+    A SQLite file primary with a read bind on a second file, a replica that
+    lags until copy_to_replica() is called
+    """
+    monkeypatch.setenv('DATABASE_READ_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    yield f"sqlite:///{tmp_path / 'test.db'}"
+    # db is global: drop the bind's metadata so later apps without it can create_all()
+    db.metadatas.pop('read', None)
+
+
+def copy_to_replica(app):
+    primary = sqlite3.connect(app.config['SQLALCHEMY_DATABASE_URI'].removeprefix('sqlite:///'))
+    replica = sqlite3.connect(app.config['SQLALCHEMY_BINDS']['read'].removeprefix('sqlite:///'))
+    try:
+        primary.backup(replica)
+    finally:
+        primary.close()
+        replica.close()
+
+
+def test_cache_miss_reads_the_primary_in_replica_views(app, make_students):
+    app.config['DASHBOARD_CACHE_TTL'] = 60
+    dashboard_cache.init_app(app)
+    student_id, = make_students(1)
+    copy_to_replica(app)
+    # Committed on the primary only; the write drops any cached dashboard of this student
+    db.session.get(Student, student_id).name = 'Renamed'
+    db.session.commit()
+
+    def name():
+        return db.session.query(Student.name).filter(Student.student_id == student_id).scalar()
+
+    with app.test_request_context():
+        g.db_read_only = True
+        assert name() == 'Student 0'  # the lagging replica
+        assert dashboard_cache.get_or_compute('student', student_id, name) == 'Renamed'
+        assert g.db_read_only
+    assert dashboard_cache.get_or_compute('student', student_id, lambda: None) == 'Renamed'
@@ -0,0 +1,72 @@
+"""The dashboard queries stay a fixed number of statements as the data grows"""
+
+from datetime import date, datetime, timedelta
+
+from database import db
+from models.gecr_models import (
+    Faculty, Subject, Student, StudentEnrollment, Assignment, Submission, Announcement, Event
+)
+from utils.dashboard_helpers import get_faculty_dashboard_data
+from tests.conftest import count_statements
+
+
+def seed_faculty(subjects, assignments, students):
+    """One faculty with the given number of subjects, assignments and (half-graded) submissions"""
+    faculty = Faculty(name='Dash Faculty', email=f'dash{subjects}@gecr.edu', password='x', department='AI&DS')
+    db.session.add(faculty)
+    db.session.flush()
+
+    for s in range(subjects):
+        subject = Subject(subject_name=f'Dash {subjects}.{s}', department='AI&DS', semester=5,
+                          faculty_id=faculty.faculty_id)
+        db.session.add(subject)
+        db.session.flush()
+        roster = [
+            Student(roll_no=f'D{subjects}_{s}_{i}', name=f'Student {i}', email=f'd{subjects}_{s}_{i}@gecr.edu',
+                    password='x')
+            for i in range(students)
+        ]
+        db.session.add_all(roster)
+        db.session.flush()
+        db.session.add_all([
+            StudentEnrollment(student_id=student.student_id, subject_id=subject.subject_id, status='active')
+            for student in roster
+        ])
+        for a in range(assignments):
+            assignment = Assignment(title=f'Assignment {s}.{a}', subject_id=subject.subject_id,
+                                    faculty_id=faculty.faculty_id, due_date=date(2024, 1, 1) + timedelta(days=a))
+            db.session.add(assignment)
+            db.session.flush()
+            db.session.add_all([
+                Submission(assignment_id=assignment.assignment_id, student_id=student.student_id,
+                           submitted_at=date(2024, 1, 1), grade='A' if i % 2 else None)
+                for i, student in enumerate(roster)
+            ])
+
+    db.session.add_all([
+        Announcement(title=f'Notice {i}', message='x', author_id=faculty.faculty_id) for i in range(3)
+    ] + [
+        Event(title=f'Event {i}', start_time=datetime(2024, 1, 1 + i), created_by=faculty.faculty_id)
+        for i in range(3)
+    ])
+    db.session.commit()
+    return faculty.faculty_id
+
+
+def dashboard_statements(faculty_id):
+    db.session.expire_all()
+    with count_statements() as statements:
+        data = get_faculty_dashboard_data(faculty_id)
+    return statements['count'], data
+
+
+def test_faculty_dashboard_statement_count_does_not_grow(app):
+    small = seed_faculty(subjects=2, assignments=2, students=5)
+    large = seed_faculty(subjects=8, assignments=5, students=20)
+
+    small_count, small_data = dashboard_statements(small)
+    large_count, large_data = dashboard_statements(large)
+
+    assert (small_data['total_subjects'], small_data['total_assignments']) == (2, 4)
+    assert (large_data['total_subjects'], large_data['total_assignments']) == (8, 40)
+    assert small_count == large_count
@@ -0,0 +1,35 @@
+"""Readiness pings"""
+
+import threading
+
+import database
+from database import ping_database
+
+
+def test_ping_answers(app):
+    assert ping_database() is True
+    assert ping_database(timeout=2) is True
+
+
+def test_hung_ping_is_not_queued_behind(app, monkeypatch):
+    """While a ping hangs, later probes report not-ready without submitting more work"""
+    release = threading.Event()
+    submitted = []
+    real_submit = database._ping_executor.submit
+
+    def hanging_submit(fn):
+        submitted.append(fn)
+        return real_submit(release.wait, 5)
+
+    monkeypatch.setattr(database._ping_executor, 'submit', hanging_submit)
+    try:
+        assert ping_database(timeout=0.05) is False
+        assert ping_database(timeout=0.05) is False
+        assert ping_database(timeout=0.05) is False
+        assert len(submitted) == 1
+    finally:
+        release.set()
+    database._ping_state['future'].result(timeout=5)
+
+    monkeypatch.setattr(database._ping_executor, 'submit', real_submit)
+    assert ping_database(timeout=2) is True
@@ -0,0 +1,106 @@
+"""Roster sync: set diff of an uploaded roster against a subject's enrollments, and its bulk apply"""
+
+import io
+
+import pytest
+
+from database import db
+from models.gecr_models import StudentEnrollment
+from tests.conftest import login
+from utils.enrollment_sync import apply_roster_diff, diff_roster
+
+
+@pytest.fixture
+def roster(app, subject, make_students):
+    """Students R00000 (active), R00001 (dropped), R00002 (never enrolled), R00003 (active, off the roster)"""
+    active, dropped, new, missing = make_students(4)
+    db.session.execute(db.insert(StudentEnrollment), [
+        {'student_id': active, 'subject_id': subject.subject_id, 'status': 'active'},
+        {'student_id': dropped, 'subject_id': subject.subject_id, 'status': 'dropped'},
+        {'student_id': missing, 'subject_id': subject.subject_id, 'status': 'active'},
+    ])
+    db.session.commit()
+    return {'active': active, 'dropped': dropped, 'new': new, 'missing': missing}
+
+
+def statuses(subject_id):
+    return dict(db.session.query(StudentEnrollment.student_id, StudentEnrollment.status)
+                .filter(StudentEnrollment.subject_id == subject_id))
+
+
+def test_diff_sorts_the_roster_into_changes(subject, roster):
+    identifiers = ['R00000', 'R00001', 'R00002', 'X999', 'R00002']
+
+    diff = diff_roster(subject.subject_id, identifiers, drop_missing=True)
+
+    assert diff['add'] == [roster['new']]
+    assert diff['reactivate'] == [roster['dropped']]
+    assert diff['drop'] == [roster['missing']]
+    assert diff['unchanged'] == [roster['active']]
+    assert diff['not_found'] == ['X999']
+    assert diff['students'][roster['missing']] == ('R00003', 'Student 3')
+    assert diff_roster(subject.subject_id, identifiers)['drop'] == []
+
+
+def test_apply_writes_the_diff(subject, roster):
+    diff = diff_roster(subject.subject_id, ['R00000', 'R00001', 'R00002'], drop_missing=True)
+
+    counts = apply_roster_diff(subject.subject_id, diff)
+    db.session.commit()
+
+    assert counts == {'added': 1, 'reactivated': 1, 'dropped': 1}
+    assert statuses(subject.subject_id) == {
+        roster['active']: 'active', roster['dropped']: 'active',
+        roster['new']: 'active', roster['missing']: 'dropped',
+    }
+
+
+def test_apply_leaves_rows_changed_since_the_diff(subject, roster):
+    diff = diff_roster(subject.subject_id, ['R00001', 'R00002'], drop_missing=True)
+    # Meanwhile someone else reactivates R00001, drops R00000 and enrolls R00002
+    db.session.execute(db.update(StudentEnrollment).where(
+        StudentEnrollment.subject_id == subject.subject_id,
+        StudentEnrollment.student_id.in_([roster['dropped'], roster['active']])
+    ).values(status=db.case((StudentEnrollment.student_id == roster['active'], 'dropped'), else_='active')))
+    db.session.add(StudentEnrollment(student_id=roster['new'], subject_id=subject.subject_id, status='active'))
+    db.session.commit()
+
+    counts = apply_roster_diff(subject.subject_id, diff)
+    db.session.commit()
+
+    assert counts == {'added': 0, 'reactivated': 0, 'dropped': 1}
+    assert db.session.query(StudentEnrollment).filter_by(subject_id=subject.subject_id).count() == 4
+
+
+def upload(client, subject, sheet, **form):
+    return client.post(f'/api/faculty/subjects/{subject.subject_id}/enrollments/bulk-upload',
+                       data={'file': (io.BytesIO(sheet), 'roster.csv'), **form},
+                       content_type='multipart/form-data')
+
+
+def test_bulk_upload_reconciles_the_roster(client, faculty, subject, roster):
+    login(client, faculty.faculty_id, 'faculty')
+    sheet = b'roll_no\nR00000\nR00001\nR00002\nX999\n'
+
+    preview = upload(client, subject, sheet, drop_missing='true', dry_run='true').get_json()['job']
+    assert preview['status'] == 'succeeded' and preview['result']['dry_run']
+    assert statuses(subject.subject_id)[roster['dropped']] == 'dropped'
+
+    job = upload(client, subject, sheet, drop_missing='true').get_json()['job']
+
+    assert job['status'] == 'succeeded'
+    result = job['result']
+    assert (result['added'], result['reactivated'], result['dropped'], result['skipped']) == (2, 1, 1, 1)
+    assert result['not_found'] == ['X999'] and job['errors'] == ['X999: student not found']
+    assert [change['roll_no'] for change in result['changes']['drop']] == ['R00003']
+    assert statuses(subject.subject_id)[roster['missing']] == 'dropped'
+
+
+def test_bulk_upload_of_unknown_students_drops_nobody(client, faculty, subject, roster):
+    login(client, faculty.faculty_id, 'faculty')
+
+    job = upload(client, subject, b'roll_no\nX1\nX2\n', drop_missing='true').get_json()['job']
+
+    assert job['status'] == 'failed' and job['result'] == {'not_found': ['X1', 'X2']}
+    assert set(statuses(subject.subject_id).values()) == {'active', 'dropped'}
+    assert statuses(subject.subject_id)[roster['missing']] == 'active'
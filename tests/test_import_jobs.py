@@ -0,0 +1,121 @@
+"""Import job queue: where inputs are kept and how stale jobs are picked up again"""
+
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from database import db
+from models.gecr_models import ImportJob
+from utils.jobs import import_jobs
+
+
+@pytest.fixture
+def line_count_handler(app):
+    """A 'test_lines' job kind that counts the lines of its input"""
+    def count_lines(ctx):
+        with open(ctx.path) as f:
+            return {'lines': len(f.read().splitlines())}
+
+    import_jobs.handlers['test_lines'] = count_lines
+    yield count_lines
+    import_jobs.handlers.pop('test_lines', None)
+
+
+def make_stale_job(path, attempts=1):
+    job = ImportJob(job_id=f'stale{attempts}', kind='test_lines', owner_type='faculty', owner_id=1,
+                    filename='input.csv', file_path=str(path), params={}, status='running', attempts=attempts,
+                    heartbeat_at=datetime.utcnow() - timedelta(seconds=import_jobs.stale_seconds + 60))
+    db.session.add(job)
+    db.session.commit()
+    return job.job_id
+
+
+def test_job_inputs_are_kept_out_of_the_served_folder(app, line_count_handler):
+    upload = FileStorage(io.BytesIO(b'roll_no\nR1\nR2\n'), filename='students.csv')
+    job, queued = import_jobs.start('test_lines', 'faculty', 1, upload)
+
+    store = os.path.realpath(app.config['FILE_STORE_FOLDER'])
+    assert not queued
+    assert os.path.realpath(job.file_path).startswith(store + os.sep)
+    assert not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'))
+    assert job.status == 'succeeded' and job.result == {'lines': 3}
+
+
+@pytest.mark.parametrize('database_url', ['file'], indirect=True)
+def test_first_request_starts_a_sweeper_that_resumes_stale_jobs(app, client, line_count_handler, tmp_path,
+                                                                monkeypatch):
+    path = tmp_path / 'input.csv'
+    path.write_text('a\nb\n')
+    job_id = make_stale_job(path)
+    monkeypatch.setattr(import_jobs, 'workers', 1)
+    monkeypatch.setattr(import_jobs, '_sweeper_pid', None)
+
+    client.get('/api/health')
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = db.session.get(ImportJob, job_id)
+        if job.status == 'succeeded':
+            break
+        time.sleep(0.05)
+    assert job.status == 'succeeded' and job.result == {'lines': 2}
+    assert job.attempts == 2
+    assert import_jobs._sweeper_pid == os.getpid()
+
+
+def test_resume_stale_fails_jobs_out_of_attempts(app, line_count_handler, tmp_path):
+    path = tmp_path / 'input.csv'
+    path.write_text('a\n')
+    job_id = make_stale_job(path, attempts=import_jobs.max_attempts)
+
+    assert import_jobs.resume_stale() == 0
+
+    job = db.session.get(ImportJob, job_id)
+    assert job.status == 'failed' and 'stopped' in job.error
+    assert not path.exists()
+
+
+class WorkerKilled(BaseException):
+    """Stops a job the way a killed process would: nothing catches it and the job stays 'running'"""
+
+
+def test_stale_job_resumes_after_its_last_checkpoint(app, monkeypatch):
+    from models.gecr_models import Student
+    from utils.jobs import JobContext
+
+    monkeypatch.setattr(import_jobs, 'chunk_rows', 2)
+    real_progress = JobContext.progress
+    killed = []
+
+    def progress(ctx, stage, done=None, total=None, force=False):
+        # The first attempt dies as it starts the second chunk
+        if stage == 'importing' and done == 2 and force and not killed:
+            killed.append(ctx.job_id)
+            raise WorkerKilled()
+        return real_progress(ctx, stage, done, total, force)
+
+    monkeypatch.setattr(JobContext, 'progress', progress)
+    sheet = b'Roll No,Name,Email\n' + b''.join(f'N{i},New {i},n{i}@gecr.edu\n'.encode() for i in range(5))
+
+    with pytest.raises(WorkerKilled):
+        import_jobs.start('students', 'faculty', 1, FileStorage(io.BytesIO(sheet), filename='students.csv'))
+    db.session.rollback()
+    job = db.session.query(ImportJob).one()
+    assert (job.status, job.chunks_done, db.session.query(Student).count()) == ('running', 1, 2)
+
+    job.heartbeat_at = datetime.utcnow() - timedelta(seconds=import_jobs.stale_seconds + 1)
+    db.session.commit()
+    resumed = import_jobs.resumed
+    assert import_jobs.resume_stale() == 1
+
+    db.session.refresh(job)
+    assert job.status == 'succeeded' and job.attempts == 2 and job.chunks_done == 3
+    assert job.result['created'] == 5 and job.result['skipped'] == 0
+    assert sorted(roll_no for (roll_no,) in db.session.query(Student.roll_no)) == [f'N{i}' for i in range(5)]
+    assert import_jobs.resumed == resumed + 1
+    assert not os.path.exists(job.file_path)
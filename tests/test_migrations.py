@@ -0,0 +1,78 @@
+"""The Alembic revisions in migrations/ build the schema the models describe"""
+
+import os
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade, downgrade, stamp
+from sqlalchemy import inspect
+
+from app import create_app
+from database import db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+BASELINE = '5b0c1e7a2d41'
+
+
+@pytest.fixture
+def unmanaged_app(tmp_path, monkeypatch):
+    """An app on an empty SQLite file whose startup leaves the schema to migrations"""
+    monkeypatch.setenv('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'migrated.db'}")
+    monkeypatch.setenv('AUTO_UPGRADE_SCHEMA', '0')
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def schema_differences():
+    with db.engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection, opts={'compare_type': True}), db.metadata)
+
+
+def test_upgrade_head_matches_models(unmanaged_app):
+    assert not inspect(db.engine).has_table('students')
+
+    upgrade(directory=MIGRATIONS)
+
+    assert schema_differences() == []
+
+
+def test_downgrade_to_baseline_and_back(unmanaged_app):
+    upgrade(directory=MIGRATIONS)
+    downgrade(directory=MIGRATIONS, revision=BASELINE)
+    assert not inspect(db.engine).has_table('attendance_summary')
+
+    upgrade(directory=MIGRATIONS)
+    assert schema_differences() == []
+
+
+def test_upgrade_from_baseline_backfills_summary(unmanaged_app):
+    upgrade(directory=MIGRATIONS, revision=BASELINE)
+    db.session.execute(db.text(
+        "INSERT INTO students (student_id, roll_no, name, email, password) VALUES (1, 'R1', 'A', 'a@gecr.edu', 'x')"
+    ))
+    db.session.execute(db.text(
+        "INSERT INTO attendance (student_id, subject_id, date, status) VALUES "
+        "(1, 1, '2024-01-01', 'Present'), (1, 1, '2024-01-02', 'Absent'), (1, 1, '2024-01-03', 'Present')"
+    ))
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert db.session.execute(db.text(
+        "SELECT present, absent, late, total FROM attendance_summary WHERE student_id = 1 AND subject_id = 1"
+    )).one() == (2, 1, 0, 3)
+
+
+def test_startup_leaves_migrated_database_alone(tmp_path, monkeypatch):
+    """Once stamped, create_app() no longer runs create_all()/upgrade_schema()"""
+    monkeypatch.setenv('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'stamped.db'}")
+    monkeypatch.setenv('AUTO_UPGRADE_SCHEMA', '0')
+    with create_app('testing').app_context():
+        stamp(directory=MIGRATIONS, revision=BASELINE)
+
+    monkeypatch.setenv('AUTO_UPGRADE_SCHEMA', '1')
+    with create_app('testing').app_context():
+        assert inspect(db.engine).get_table_names() == ['alembic_version']
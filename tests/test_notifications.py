@@ -0,0 +1,52 @@
+"""Broadcast notifications reach the students in their audience, from the student's creation on"""
+
+from datetime import datetime, timedelta
+
+from database import db
+from models.gecr_models import Student, BroadcastNotification
+from utils.notifications import (
+    broadcast_to_students, count_student_unread, get_student_notifications, mark_all_broadcasts_read
+)
+
+
+def add_student(roll_no, created_at, department='AI&DS'):
+    student = Student(roll_no=roll_no, name=roll_no, email=f'{roll_no}@gecr.edu', password='x',
+                      department=department)
+    db.session.add(student)
+    db.session.flush()
+    student.created_at = created_at  # None: a student from before the column existed
+    db.session.commit()
+    return student
+
+
+def broadcast(title, created_at, department=None):
+    notification, _ = broadcast_to_students(title, 'x', 'announcement', department=department)
+    notification.created_at = created_at
+    db.session.commit()
+    return notification
+
+
+def test_new_student_does_not_inherit_old_broadcasts(app):
+    now = datetime.utcnow()
+    broadcast('Before', now - timedelta(days=30))
+    student = add_student('NEW1', now - timedelta(days=1))
+    broadcast('After', now)
+
+    notifications, unread = get_student_notifications(student)
+
+    assert [n['title'] for n in notifications] == ['After']
+    assert unread == count_student_unread(student) == 1
+
+
+def test_audience_and_receipts(app):
+    now = datetime.utcnow()
+    student = add_student('OLD1', None)
+    broadcast('All', now - timedelta(days=30))
+    broadcast('Own department', now - timedelta(days=2), department='ai&ds ')
+    broadcast('Other department', now - timedelta(days=1), department='Civil')
+
+    assert [n['title'] for n in get_student_notifications(student)[0]] == ['Own department', 'All']
+    assert mark_all_broadcasts_read(student) == 2
+    db.session.commit()
+    assert count_student_unread(student) == 0
+    assert BroadcastNotification.query.count() == 3
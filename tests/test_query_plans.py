@@ -0,0 +1,51 @@
+"""The hot queries are answered from the composite indexes, not full table scans (SQLite EXPLAIN QUERY PLAN)"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from database import db
+from models.gecr_models import (
+    Attendance, AttendanceSummary, StudentEnrollment, Notification, Submission, Assignment, Timetable, Subject
+)
+
+
+def query_plan(statement):
+    """EXPLAIN QUERY PLAN lines of a statement, with its parameters inlined"""
+    sql = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+HOT_QUERIES = [
+    (select(Attendance).where(Attendance.subject_id == 1, Attendance.date.between(date(2024, 1, 1), date(2024, 1, 31))),
+     'ix_attendance_subject_date'),
+    (select(Attendance).where(Attendance.student_id == 1, Attendance.subject_id == 1, Attendance.date == date(2024, 1, 1)),
+     'unique_student_subject_date'),
+    (select(AttendanceSummary).where(AttendanceSummary.student_id == 1, AttendanceSummary.subject_id == 1),
+     'sqlite_autoindex_attendance_summary_1'),  # the unique (student_id, subject_id) constraint
+    (select(StudentEnrollment.student_id).where(StudentEnrollment.subject_id == 1, StudentEnrollment.status == 'active'),
+     'ix_enrollments_subject_status'),
+    (select(StudentEnrollment.subject_id).where(StudentEnrollment.student_id == 1, StudentEnrollment.status == 'active'),
+     'ix_enrollments_student_status'),
+    (select(func.count()).select_from(Notification).where(
+        Notification.user_id == 1, Notification.user_type == 'student', Notification.read.is_(False)),
+     'ix_notifications_user_read_created'),
+    (select(func.count()).select_from(Submission).where(Submission.assignment_id == 1, Submission.grade.is_(None)),
+     'ix_submissions_assignment_grade'),
+    (select(Submission).where(Submission.student_id == 1, Submission.assignment_id == 1),
+     'ix_submissions_student_assignment'),
+    (select(Assignment).where(Assignment.faculty_id == 1).order_by(Assignment.due_date.desc()).limit(5),
+     'ix_assignments_faculty_due'),
+    (select(Timetable).where(Timetable.faculty_id == 1, Timetable.day_of_week == 'Monday'),
+     'ix_timetable_faculty_day'),
+    (select(Timetable).where(Timetable.subject_id == 1, Timetable.day_of_week == 'Monday'),
+     'ix_timetable_subject_day'),
+    (select(Subject).where(Subject.faculty_id == 1), 'ix_subjects_faculty'),
+]
+
+
+@pytest.mark.parametrize('statement, index', HOT_QUERIES, ids=[index for _, index in HOT_QUERIES])
+def test_hot_query_uses_index(app, statement, index):
+    plan = query_plan(statement)
+    assert any(index in line for line in plan), plan
@@ -0,0 +1,101 @@
+"""Bulk student import: duplicate checks, the insert race and the upload endpoint"""
+
+import io
+
+from werkzeug.security import check_password_hash
+
+from database import db
+from models.gecr_models import Notification, Student
+from tests.conftest import login
+from utils import student_import
+from utils.student_import import DEFAULT_PASSWORD, run_import
+
+
+def rows(*numbers, **overrides):
+    return [{'roll_no': f'N{n}', 'name': f'New {n}', 'email': f'n{n}@gecr.edu', **overrides} for n in numbers]
+
+
+def test_import_skips_existing_and_repeated_rows(app, make_students):
+    make_students(1)  # R00000 / s0@gecr.edu
+    data = rows(1, 2) + [
+        {'roll_no': 'R00000', 'name': 'Taken roll', 'email': 'other@gecr.edu'},
+        {'roll_no': 'N3', 'name': 'Taken email', 'email': 's0@gecr.edu'},
+        {'roll_no': 'N1', 'name': 'Repeated roll', 'email': 'again@gecr.edu'},
+    ]
+    data[1]['password'] = 'secret'
+
+    result = run_import(data)
+
+    assert [student['roll_no'] for student in result['created']] == ['N1', 'N2']
+    assert result['skipped'] == [
+        {'roll_no': 'R00000', 'reason': 'Already exists'},
+        {'roll_no': 'N3', 'reason': 'Already exists'},
+        {'roll_no': 'N1', 'reason': 'Duplicate in file'},
+    ]
+    assert db.session.query(Student).count() == 3
+    first, second = Student.query.filter(Student.roll_no.in_(['N1', 'N2'])).order_by(Student.roll_no)
+    assert check_password_hash(first.password, DEFAULT_PASSWORD)
+    assert check_password_hash(second.password, 'secret')
+    welcomed = {user_id for (user_id,) in db.session.query(Notification.user_id)}
+    assert welcomed == {first.student_id, second.student_id}
+
+
+def test_hashing_on_a_pool_keeps_row_order(app):
+    data = [{**row, 'password': row['roll_no']} for row in rows(*range(25))]
+
+    result = run_import(data, workers=3)
+
+    assert [student['roll_no'] for student in result['created']] == [row['roll_no'] for row in data]
+    student = Student.query.filter_by(roll_no='N24').one()
+    assert check_password_hash(student.password, 'N24')
+
+
+def test_rows_added_by_a_concurrent_import_are_skipped(app, make_students, monkeypatch):
+    make_students(1)
+    real_find_existing = student_import.find_existing
+    calls = []
+
+    def find_existing(students_data):
+        # The first check misses R00000, as if another import added it just after
+        calls.append(len(students_data))
+        return (set(), set()) if len(calls) == 1 else real_find_existing(students_data)
+
+    monkeypatch.setattr(student_import, 'find_existing', find_existing)
+    data = rows(1) + [{'roll_no': 'R00000', 'name': 'Raced', 'email': 'raced@gecr.edu'}]
+
+    result = run_import(data)
+
+    assert len(calls) == 2
+    assert [student['roll_no'] for student in result['created']] == ['N1']
+    assert result['skipped'] == [{'roll_no': 'R00000', 'reason': 'Already exists'}]
+    assert db.session.query(Student).count() == 2
+    assert db.session.query(Notification).count() == 1
+
+
+def test_upload_endpoint_imports_the_sheet(app, client, faculty, make_students):
+    make_students(1)
+    login(client, faculty.faculty_id, 'faculty')
+    sheet = b'Roll No,Name,Email\nN1,New 1,n1@gecr.edu\nR00000,Old,old@gecr.edu\nN2,New 2,n2@gecr.edu\n'
+
+    response = client.post('/api/faculty/students/upload',
+                           data={'file': (io.BytesIO(sheet), 'students.csv')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    job = response.get_json()['job']
+    assert job['status'] == 'succeeded'
+    assert job['result']['created'] == 2 and job['result']['skipped'] == 1
+    assert Student.query.filter_by(roll_no='N2').one().name == 'New 2'
+
+
+def test_upload_endpoint_rejects_sheets_with_row_errors(app, client, faculty):
+    login(client, faculty.faculty_id, 'faculty')
+    sheet = b'Roll No,Name,Email\nN1,New 1,n1@gecr.edu\nN2,New 2,not-an-email\n'
+
+    response = client.post('/api/faculty/students/upload',
+                           data={'file': (io.BytesIO(sheet), 'students.csv')},
+                           content_type='multipart/form-data')
+
+    job = response.get_json()['job']
+    assert job['status'] == 'failed' and job['error'] == 'Errors found in Excel file'
+    assert db.session.query(Student).count() == 0
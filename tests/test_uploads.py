@@ -0,0 +1,205 @@
+"""Chunked uploads into the private file store, the chunk compare-and-set and who may download what"""
+
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+from sqlalchemy.orm import Session
+
+from database import db
+from models.gecr_models import Faculty, StoredFile, UploadSession
+from utils.file_store import UploadError, start_upload, write_chunk, blob_path, part_path
+from tests.conftest import login
+
+CONTENT = b'0123456789' * 1000
+
+
+@pytest.fixture
+def owner(app):
+    faculty = Faculty(name='Owner', email='owner@gecr.edu', password='x')
+    other = Faculty(name='Other', email='other@gecr.edu', password='x')
+    db.session.add_all([faculty, other])
+    db.session.commit()
+    return faculty.faculty_id, other.faculty_id
+
+
+def upload_in_chunks(client, data, chunk):
+    response = client.post('/api/uploads', json={'filename': 'notes.pdf', 'size': len(data)})
+    assert response.status_code == 201
+    upload_id = response.get_json()['upload']['upload_id']
+    for offset in range(0, len(data), chunk):
+        response = client.patch(f'/api/uploads/{upload_id}', data=data[offset:offset + chunk],
+                                headers={'Upload-Offset': str(offset)})
+    assert response.status_code == 201, response.get_json()
+    return upload_id, response.get_json()['file']
+
+
+def test_chunked_upload_lands_in_private_store(app, client, owner):
+    login(client, owner[0], 'faculty')
+
+    _, stored = upload_in_chunks(client, CONTENT, 4096)
+
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    assert stored['sha256'] == sha256
+    path = blob_path(sha256)
+    assert path.startswith(app.config['FILE_STORE_FOLDER'])
+    with open(path, 'rb') as f:
+        assert f.read() == CONTENT
+    assert not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], 'blobs'))
+
+
+def test_chunk_at_wrong_offset_reports_current_offset(app, client, owner):
+    login(client, owner[0], 'faculty')
+    upload_id = client.post('/api/uploads', json={'filename': 'a.bin', 'size': 10}).get_json()['upload']['upload_id']
+    client.patch(f'/api/uploads/{upload_id}', data=b'abc', headers={'Upload-Offset': '0'})
+
+    response = client.patch(f'/api/uploads/{upload_id}', data=b'xyz', headers={'Upload-Offset': '0'})
+
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 3
+
+
+def test_chunk_compare_and_set_rejects_a_concurrent_writer(app, owner):
+    """A writer whose view of the offset went stale loses the compare-and-set instead of advancing it twice"""
+    upload, _ = start_upload('faculty', owner[0], 'a.bin', 10)
+    write_chunk(upload, 0, io.BytesIO(b'abc'), 3)
+    # Another worker writes the next chunk; this session's copy still says 3 bytes arrived
+    with Session(db.engine) as other:
+        other.execute(db.update(UploadSession).where(UploadSession.upload_id == upload.upload_id).values(received=6))
+        other.commit()
+    assert upload.received == 3
+
+    with pytest.raises(UploadError) as error:
+        write_chunk(upload, 3, io.BytesIO(b'def'), 3)
+
+    assert error.value.status == 409
+    assert error.value.details['offset'] == 6
+    assert db.session.get(UploadSession, upload.upload_id).received == 6
+
+
+class StallingStream(io.BytesIO):
+    """A request body that stalls before its first byte while `meanwhile` runs"""
+
+    def __init__(self, data, meanwhile):
+        super().__init__(data)
+        self.meanwhile = meanwhile
+
+    def read(self, size=-1):
+        if self.meanwhile is not None:
+            meanwhile, self.meanwhile = self.meanwhile, None
+            meanwhile()
+        return super().read(size)
+
+
+def in_other_worker(app, fn):
+    """Run fn in its own thread, app context and database session, as another worker would"""
+    outcome = []
+
+    def run():
+        with app.app_context():
+            try:
+                outcome.append(fn())
+            except Exception as e:
+                outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return outcome[0]
+
+
+def race_on_offset(app, upload, offset, loser_data, winner_data):
+    """
+    A request for `offset` stalls mid-body while a retry of the same chunk
+    completes elsewhere; returns the stalled request's UploadError and the
+    retry's (received, sha256 of the stored file or None)
+    """
+    def retry():
+        received, stored, _ = write_chunk(db.session.get(UploadSession, upload.upload_id), offset,
+                                          io.BytesIO(winner_data), len(winner_data))
+        return received, stored and stored.sha256
+
+    retried = []
+    with pytest.raises(UploadError) as error:
+        write_chunk(upload, offset, StallingStream(loser_data, lambda: retried.append(in_other_worker(app, retry))),
+                    len(loser_data))
+    return error.value, retried[0]
+
+
+@pytest.mark.parametrize('database_url', ['file'], indirect=True)
+def test_request_losing_a_race_on_one_offset_leaves_the_part_file_alone(app, owner):
+    upload, _ = start_upload('faculty', owner[0], 'a.bin', 9)
+    write_chunk(upload, 0, io.BytesIO(b'abc'), 3)
+
+    error, retried = race_on_offset(app, upload, 3, b'XYZ', b'def')
+
+    assert retried == (6, None)
+    assert error.status == 409 and error.details['offset'] == 6
+    with open(part_path(upload.upload_id), 'rb') as f:
+        assert f.read() == b'abcdef'
+    _, stored, _ = write_chunk(db.session.get(UploadSession, upload.upload_id), 6, io.BytesIO(b'ghi'), 3)
+    assert stored.sha256 == hashlib.sha256(b'abcdefghi').hexdigest()
+    assert os.listdir(os.path.dirname(part_path(upload.upload_id))) == []
+
+
+@pytest.mark.parametrize('database_url', ['file'], indirect=True)
+def test_request_losing_a_race_on_the_last_chunk_leaves_the_blob_alone(app, owner):
+    upload, _ = start_upload('faculty', owner[0], 'a.bin', 6)
+    upload_id = upload.upload_id
+    write_chunk(upload, 0, io.BytesIO(b'abc'), 3)
+
+    error, retried = race_on_offset(app, upload, 3, b'XYZ', b'def')
+
+    assert error.status == 404
+    sha256 = hashlib.sha256(b'abcdef').hexdigest()
+    assert retried == (6, sha256)
+    with open(blob_path(sha256), 'rb') as f:
+        assert f.read() == b'abcdef'
+    assert not os.path.exists(part_path(upload_id))
+
+
+def test_last_chunk_is_rejected_when_the_part_file_does_not_match_its_hash(app, owner):
+    upload, _ = start_upload('faculty', owner[0], 'a.bin', 6)
+    upload_id = upload.upload_id
+    write_chunk(upload, 0, io.BytesIO(b'abc'), 3)
+    with open(part_path(upload_id), 'r+b') as f:
+        f.write(b'x')
+
+    with pytest.raises(UploadError) as error:
+        write_chunk(upload, 3, io.BytesIO(b'def'), 3)
+
+    assert error.value.status == 410
+    assert db.session.get(UploadSession, upload_id) is None
+    assert db.session.query(StoredFile).count() == 0
+    assert not os.path.exists(part_path(upload_id))
+
+
+def test_only_the_owner_downloads_a_file(app, client, owner):
+    login(client, owner[0], 'faculty')
+    _, stored = upload_in_chunks(client, CONTENT, 8192)
+    url = f"/api/files/{stored['file_id']}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+    login(client, owner[1], 'faculty')
+    assert client.get(url).status_code == 404
+
+
+def test_uploads_route_serves_profile_photos_only(app, client, owner):
+    login(client, owner[0], 'faculty')
+    _, stored = upload_in_chunks(client, CONTENT, 8192)
+    upload_dir = app.config['UPLOAD_FOLDER']
+    os.makedirs(os.path.join(upload_dir, 'blobs'), exist_ok=True)
+    with open(os.path.join(upload_dir, 'faculty_1_0a1b2c3d.jpg'), 'wb') as f:
+        f.write(b'photo')
+    with open(os.path.join(upload_dir, 'blobs', 'leftover'), 'wb') as f:
+        f.write(b'private')
+
+    assert client.get('/uploads/faculty_1_0a1b2c3d.jpg').data == b'photo'
+    for path in ('/uploads/blobs/leftover', f"/uploads/blobs/{stored['sha256'][:2]}/{stored['sha256']}",
+                 '/uploads/pending/faculty_1_0a1b2c3d.png'):
+        assert client.get(path).status_code == 404, path
@@ -0,0 +1,116 @@
+"""
+Attendance Summary Helpers
+Present/absent/late/total counts read from the attendance_summary counters,
+or computed with a single GROUP BY query when a date range is requested
+"""
+
+from sqlalchemy import func
+from database import db
+from models.gecr_models import Attendance, AttendanceSummary
+from utils.attendance_writer import chunked, MAX_STATEMENT_PARAMS
+
+COUNTER_COLUMNS = ('present', 'absent', 'late', 'total')
+
+
+def empty_counts():
+    """Zeroed counts for a subject or student with no attendance"""
+    return dict.fromkeys(COUNTER_COLUMNS, 0)
+
+
+def attendance_percentage(counts):
+    """Percentage of classes marked Present, rounded to 2 places"""
+    if not counts['total']:
+        return 0.0
+    return round((counts['present'] / counts['total']) * 100, 2)
+
+
+def combine_counts(counts_list):
+    """Add up several count dicts (e.g. all subjects for an overall figure)"""
+    combined = empty_counts()
+    for counts in counts_list:
+        for key in combined:
+            combined[key] += counts[key]
+    return combined
+
+
+def _read_counters(key_column, *filters):
+    """Read attendance_summary rows keyed by key_column (no attendance scan)"""
+    rows = db.session.query(
+        key_column, *(getattr(AttendanceSummary, column) for column in COUNTER_COLUMNS)
+    ).filter(*filters).all()
+    return {row[0]: dict(zip(COUNTER_COLUMNS, row[1:])) for row in rows}
+
+
+def _summarize(group_column, *filters):
+    """Run one GROUP BY (group_column, status) query and fold it into count dicts"""
+    rows = db.session.query(
+        group_column, Attendance.status, func.count(Attendance.attendance_id)
+    ).filter(*filters).group_by(group_column, Attendance.status).all()
+
+    summary = {}
+    for key, status, count in rows:
+        counts = summary.setdefault(key, empty_counts())
+        status_key = (status or '').lower()
+        if status_key in counts:
+            counts[status_key] += count
+        counts['total'] += count
+    return summary
+
+
+def get_student_attendance_summary(student_id, subject_id=None, start_date=None, end_date=None):
+    """
+    Attendance counts for one student, keyed by subject_id.
+
+    Args:
+        student_id: Student to summarize
+        subject_id: Optional subject filter
+        start_date / end_date: Optional inclusive date range
+
+    Returns:
+        {subject_id: {'present', 'absent', 'late', 'total'}}; subjects with
+        no attendance are absent from the dict
+
+    Without a date range this reads the precomputed attendance_summary rows;
+    a date range needs the GROUP BY over the attendance table.
+    """
+    if not start_date and not end_date:
+        filters = [AttendanceSummary.student_id == student_id, AttendanceSummary.total > 0]
+        if subject_id:
+            filters.append(AttendanceSummary.subject_id == subject_id)
+        return _read_counters(AttendanceSummary.subject_id, *filters)
+
+    filters = [Attendance.student_id == student_id]
+    if subject_id:
+        filters.append(Attendance.subject_id == subject_id)
+    if start_date:
+        filters.append(Attendance.date >= start_date)
+    if end_date:
+        filters.append(Attendance.date <= end_date)
+    return _summarize(Attendance.subject_id, *filters)
+
+
+def get_subject_attendance_summary(subject_id):
+    """Attendance counts for one subject, keyed by student_id"""
+    return _read_counters(
+        AttendanceSummary.student_id,
+        AttendanceSummary.subject_id == subject_id,
+        AttendanceSummary.total > 0
+    )
+
+
+def get_overall_attendance(student_ids):
+    """
+    Attendance counts across all subjects for several students, keyed by
+    student_id. One query over the summary rows, whatever the history size.
+    """
+    overall = {}
+    for student_batch in chunked(list(student_ids), MAX_STATEMENT_PARAMS):
+        rows = db.session.query(
+            AttendanceSummary.student_id,
+            *(func.sum(getattr(AttendanceSummary, column)) for column in COUNTER_COLUMNS)
+        ).filter(
+            AttendanceSummary.student_id.in_(student_batch)
+        ).group_by(AttendanceSummary.student_id).all()
+        for row in rows:
+            overall[row[0]] = dict(zip(COUNTER_COLUMNS, (value or 0 for value in row[1:])))
+    return overall
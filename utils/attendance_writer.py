@@ -0,0 +1,352 @@
+"""
+Attendance Write Helpers
+Set-based insert/update of attendance records shared by the marking and upload routes,
+keeping the attendance_summary counters in step
+"""
+
+from datetime import datetime
+import logging
+
+from sqlalchemy import update, func, case, literal, text, false
+from database import db
+from models.gecr_models import Attendance, AttendanceSummary
+from utils.dashboard_cache import dashboard_cache
+
+logger = logging.getLogger(__name__)
+
+VALID_STATUSES = ('Present', 'Absent', 'Late')
+
+# Keep each statement under SQLite's default bound-parameter limit (999)
+MAX_STATEMENT_PARAMS = 900
+
+# First key of the PostgreSQL advisory locks taken by lock_subject_attendance()
+ATTENDANCE_LOCK_NAMESPACE = 5001
+
+
+def chunked(items, size):
+    """Yield successive slices of a list"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _get_insert(dialect_name):
+    """Return the dialect-specific insert() that supports ON CONFLICT, or None"""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
+
+
+def _counter_column(status):
+    """Name of the attendance_summary counter a status is counted under, or None"""
+    status = (status or '').lower()
+    return status if status in ('present', 'absent', 'late') else None
+
+
+def lock_subject_attendance(subject_id):
+    """
+    Hold off other attendance writers of the subject until the caller's
+    transaction ends, so the rows read next are still current when the
+    counter deltas derived from them are applied.
+
+    SQLite has one write lock per database: a write that matches no rows
+    takes it (waiting up to busy_timeout) without changing anything. On
+    PostgreSQL a transaction-scoped advisory lock per subject serializes
+    writers of the same subject only; other databases lock the rows read.
+
+    Returns:
+        True when the subject is locked here, False if the pre-read has to
+        lock its rows instead
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        db.session.execute(
+            update(AttendanceSummary).where(false()).values(total=AttendanceSummary.total)
+            .execution_options(synchronize_session=False)
+        )
+        return True
+    if dialect == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:namespace, :subject_id)'),
+                           {'namespace': ATTENDANCE_LOCK_NAMESPACE, 'subject_id': subject_id})
+        return True
+    return False
+
+
+def find_existing_attendance(subject_id, keys, for_update=False):
+    """
+    Map the (student_id, date) keys that already have attendance for a subject
+    to (attendance_id, status). Issues one query per batch of students, limited
+    to the date range of the keys, instead of one per student. `for_update`
+    locks the rows read (SELECT ... FOR UPDATE).
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    student_ids = sorted({student_id for student_id, _ in keys})
+    dates = [attendance_date for _, attendance_date in keys]
+    first_date, last_date = min(dates), max(dates)
+
+    existing = {}
+    for student_batch in chunked(student_ids, MAX_STATEMENT_PARAMS - 3):
+        query = db.session.query(
+            Attendance.attendance_id, Attendance.student_id, Attendance.date, Attendance.status
+        ).filter(
+            Attendance.subject_id == subject_id,
+            Attendance.student_id.in_(student_batch),
+            Attendance.date.between(first_date, last_date)
+        )
+        rows = (query.with_for_update() if for_update else query).all()
+        for row in rows:
+            if (row.student_id, row.date) in keys:
+                existing[(row.student_id, row.date)] = (row.attendance_id, row.status)
+    return existing
+
+
+def bulk_upsert_attendance(subject_id, records, marked_at=None):
+    """
+    Insert or update attendance for one subject in bulk.
+
+    Args:
+        subject_id: Subject the attendance belongs to
+        records: iterable of (student_id, date, status) tuples. If the same
+            student/date appears more than once the last status wins.
+        marked_at: Timestamp stored on every written row (defaults to now)
+
+    Returns:
+        dict with 'inserted' and 'updated' counts
+
+    The attendance_summary counters of the affected students are updated in
+    the same transaction, from a read of the existing rows taken under
+    lock_subject_attendance(), so concurrent submissions for the subject
+    cannot both count the same change. The caller owns the transaction;
+    nothing is committed here, and the lock is held until it commits.
+    """
+    marked_at = marked_at or datetime.now()
+
+    # De-duplicate so a single statement never touches the same row twice
+    statuses = {}
+    for student_id, attendance_date, status in records:
+        statuses[(student_id, attendance_date)] = status
+
+    if not statuses:
+        return {'inserted': 0, 'updated': 0}
+
+    locked = lock_subject_attendance(subject_id)
+    existing = find_existing_attendance(subject_id, statuses.keys(), for_update=not locked)
+
+    rows = [
+        {
+            'student_id': student_id,
+            'subject_id': subject_id,
+            'date': attendance_date,
+            'status': status,
+            'marked_at': marked_at
+        }
+        for (student_id, attendance_date), status in statuses.items()
+    ]
+
+    insert = _get_insert(db.engine.dialect.name)
+    if insert is not None:
+        batch_size = max(1, MAX_STATEMENT_PARAMS // len(rows[0]))
+        for batch in chunked(rows, batch_size):
+            stmt = insert(Attendance).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['student_id', 'subject_id', 'date'],
+                set_={
+                    'status': stmt.excluded.status,
+                    'marked_at': stmt.excluded.marked_at
+                }
+            )
+            db.session.execute(stmt)
+    else:
+        # No native upsert: split on the pre-fetched keys instead
+        logger.info(f"No native upsert for {db.engine.dialect.name}, using split insert/update")
+        new_rows = [r for r in rows if (r['student_id'], r['date']) not in existing]
+        updated_rows = [
+            {
+                'attendance_id': existing[(r['student_id'], r['date'])][0],
+                'status': r['status'],
+                'marked_at': marked_at
+            }
+            for r in rows if (r['student_id'], r['date']) in existing
+        ]
+        if new_rows:
+            db.session.execute(db.insert(Attendance), new_rows)
+        if updated_rows:
+            db.session.execute(update(Attendance), updated_rows)
+
+    # Counter changes per student: new rows add to total, changed statuses move between buckets
+    deltas = {}
+    for (student_id, attendance_date), status in statuses.items():
+        previous = existing.get((student_id, attendance_date))
+        if previous is not None and previous[1] == status:
+            continue
+        delta = deltas.setdefault(student_id, {'present': 0, 'absent': 0, 'late': 0, 'total': 0})
+        if previous is None:
+            delta['total'] += 1
+        elif _counter_column(previous[1]):
+            delta[_counter_column(previous[1])] -= 1
+        if _counter_column(status):
+            delta[_counter_column(status)] += 1
+    apply_summary_deltas(subject_id, deltas, marked_at)
+
+    # Core statements bypass the ORM flush hook, so flag the dashboards explicitly
+    dashboard_cache.mark_stale(db.session, student_ids=[sid for sid, delta in deltas.items() if any(delta.values())])
+
+    return {
+        'inserted': len(rows) - len(existing),
+        'updated': len(existing)
+    }
+
+
+def apply_summary_deltas(subject_id, deltas, updated_at=None):
+    """
+    Add per-student counter changes to attendance_summary for one subject.
+
+    Args:
+        subject_id: Subject the counters belong to
+        deltas: {student_id: {'present', 'absent', 'late', 'total'}} increments
+        updated_at: Timestamp stored on touched rows (defaults to now)
+    """
+    updated_at = updated_at or datetime.now()
+    rows = [
+        dict(delta, student_id=student_id, subject_id=subject_id, updated_at=updated_at)
+        for student_id, delta in deltas.items() if any(delta.values())
+    ]
+    if not rows:
+        return
+
+    insert = _get_insert(db.engine.dialect.name)
+    if insert is not None:
+        batch_size = max(1, MAX_STATEMENT_PARAMS // len(rows[0]))
+        for batch in chunked(rows, batch_size):
+            stmt = insert(AttendanceSummary).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['student_id', 'subject_id'],
+                set_={
+                    'present': AttendanceSummary.present + stmt.excluded.present,
+                    'absent': AttendanceSummary.absent + stmt.excluded.absent,
+                    'late': AttendanceSummary.late + stmt.excluded.late,
+                    'total': AttendanceSummary.total + stmt.excluded.total,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+            db.session.execute(stmt)
+        return
+
+    by_student = {row['student_id']: row for row in rows}
+    for student_batch in chunked(list(by_student), MAX_STATEMENT_PARAMS - 1):
+        summaries = AttendanceSummary.query.filter(
+            AttendanceSummary.subject_id == subject_id,
+            AttendanceSummary.student_id.in_(student_batch)
+        ).all()
+        for summary in summaries:
+            row = by_student.pop(summary.student_id)
+            for column in ('present', 'absent', 'late', 'total'):
+                setattr(summary, column, getattr(summary, column) + row[column])
+            summary.updated_at = updated_at
+    if by_student:
+        db.session.execute(db.insert(AttendanceSummary), list(by_student.values()))
+
+
+def rebuild_attendance_summary(subject_id=None):
+    """
+    Recompute attendance_summary from the attendance table with one
+    INSERT ... SELECT ... GROUP BY. Used for backfills and to repair drift.
+
+    Args:
+        subject_id: Only rebuild this subject's counters (default: all)
+
+    Returns:
+        Number of summary rows written. The caller commits.
+    """
+    delete = db.delete(AttendanceSummary)
+    if subject_id:
+        delete = delete.where(AttendanceSummary.subject_id == subject_id)
+    db.session.execute(delete)
+
+    status = func.lower(Attendance.status)
+    select = db.select(
+        Attendance.student_id,
+        Attendance.subject_id,
+        func.sum(case((status == 'present', 1), else_=0)),
+        func.sum(case((status == 'absent', 1), else_=0)),
+        func.sum(case((status == 'late', 1), else_=0)),
+        func.count(Attendance.attendance_id),
+        literal(datetime.now())
+    ).where(
+        Attendance.student_id.isnot(None),
+        Attendance.subject_id.isnot(None)
+    ).group_by(Attendance.student_id, Attendance.subject_id)
+    if subject_id:
+        select = select.where(Attendance.subject_id == subject_id)
+
+    result = db.session.execute(
+        db.insert(AttendanceSummary).from_select(
+            ['student_id', 'subject_id', 'present', 'absent', 'late', 'total', 'updated_at'],
+            select
+        )
+    )
+    return result.rowcount
+
+
+def find_duplicate_attendance():
+    """
+    Attendance rows that repeat a (student_id, subject_id, date) key, i.e.
+    every row of such a key except the one with the highest attendance_id.
+
+    Returns:
+        list of dicts (attendance_id, student_id, subject_id, date, status,
+        marked_at, kept_id), ordered by key
+    """
+    groups = db.select(
+        Attendance.student_id, Attendance.subject_id, Attendance.date,
+        func.max(Attendance.attendance_id).label('kept_id')
+    ).group_by(
+        Attendance.student_id, Attendance.subject_id, Attendance.date
+    ).having(func.count(Attendance.attendance_id) > 1).subquery()
+
+    rows = db.session.execute(
+        db.select(
+            Attendance.attendance_id, Attendance.student_id, Attendance.subject_id, Attendance.date,
+            Attendance.status, Attendance.marked_at, groups.c.kept_id
+        ).join(groups, db.and_(
+            Attendance.student_id == groups.c.student_id,
+            Attendance.subject_id == groups.c.subject_id,
+            Attendance.date == groups.c.date,
+            Attendance.attendance_id != groups.c.kept_id
+        )).order_by(Attendance.subject_id, Attendance.student_id, Attendance.date, Attendance.attendance_id)
+    ).all()
+    return [row._asdict() for row in rows]
+
+
+def dedupe_attendance(dry_run=False):
+    """
+    Delete the rows find_duplicate_attendance() reports, keeping the latest
+    mark of each key, and rebuild the affected subjects' summary counters.
+    Needed once before the unique (student, subject, date) index can be
+    built on an old database.
+
+    Returns:
+        The removed rows (those that would be removed with dry_run). The
+        caller commits.
+    """
+    duplicates = find_duplicate_attendance()
+    if dry_run or not duplicates:
+        return duplicates
+
+    for batch in chunked([row['attendance_id'] for row in duplicates], MAX_STATEMENT_PARAMS):
+        db.session.execute(
+            db.delete(Attendance).where(Attendance.attendance_id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+    # A database still at the baseline schema has no summary yet (its migration backfills it)
+    if db.inspect(db.session.connection()).has_table(AttendanceSummary.__tablename__):
+        for subject_id in sorted({row['subject_id'] for row in duplicates}):
+            rebuild_attendance_summary(subject_id)
+    logger.warning(f"Removed {len(duplicates)} duplicate attendance rows")
+    return duplicates
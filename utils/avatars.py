@@ -0,0 +1,315 @@
+"""
+Avatars
+Profile photos are indexed on the students/faculty rows (photo_filename,
+photo_thumb_filename) so pages never scan UPLOAD_FOLDER to find them.
+Uploads are staged, then resized into JPEG/WebP variants off the request
+by utils.image_pipeline
+"""
+
+import os
+import re
+import secrets
+from datetime import datetime, timedelta
+
+from database import db
+
+# Variants made for every processed photo: <key>_<size>.jpg and .webp (longest side in px)
+VARIANT_SIZES = (64, 150, 300)
+VARIANT_FORMATS = (
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+)
+# The stored photo itself is re-encoded as <key>.jpg, at most this large
+MAX_PHOTO_SIDE = 1600
+# Raw uploads wait here (never served) until they are processed
+PENDING_DIR = 'pending'
+
+# student_12.png, faculty_3_thumb.jpg
+_PHOTO_NAME = re.compile(r'^(student|faculty)_(\d+)(_thumb)?\.[A-Za-z0-9]+$')
+# student_12_0f3a9c1b.jpg (written by process_profile_photo, has variants)
+_PROCESSED_NAME = re.compile(r'^(?:student|faculty)_\d+_[0-9a-f]{8}\.jpg$')
+# Anything /uploads may serve: photos and their variants at the top of UPLOAD_FOLDER
+_PUBLIC_NAME = re.compile(r'^(?:student|faculty)_\d+(?:_[0-9a-z]+)*\.[A-Za-z0-9]+$')
+
+
+def _model(user_type):
+    from models.gecr_models import Student, Faculty
+    return {'student': Student, 'faculty': Faculty}[user_type]
+
+
+def get_avatar_filenames(user_type, user_id):
+    """
+    (photo_filename, photo_thumb_filename) for a user, either may be None.
+    Reads the user's row through the session identity map, so pages that
+    already loaded the user issue no extra query.
+    """
+    user = db.session.get(_model(user_type), user_id)
+    if user is None:
+        return None, None
+    return user.photo_filename, user.photo_thumb_filename
+
+
+def is_public_photo(filename):
+    """Whether a path under UPLOAD_FOLDER is a profile photo (or variant) that may be served"""
+    return bool(_PUBLIC_NAME.match(filename))
+
+
+def variant_filenames(photo_filename):
+    """
+    {size: {'jpg': filename, 'webp': filename}} for a processed photo; empty
+    for photos indexed before variants existed
+    """
+    if not photo_filename or not _PROCESSED_NAME.match(photo_filename):
+        return {}
+    stem = os.path.splitext(photo_filename)[0]
+    return {size: {ext: f"{stem}_{size}.{ext}" for ext, _, _ in VARIANT_FORMATS} for size in VARIANT_SIZES}
+
+
+def get_photo_state(user_type, user_id):
+    """
+    Status of a user's profile photo for the settings page to poll:
+    {'status': 'none' | 'processing' | 'ready' | 'failed', 'photo', 'thumb', 'variants'}.
+    photo/thumb/variants always describe the photo currently shown; while a
+    new upload is processing (or after it failed) that is the previous one.
+    """
+    user = db.session.get(_model(user_type), user_id)
+    if user is None:
+        return None
+    status = user.photo_status or ('ready' if user.photo_filename else 'none')
+    return {
+        'status': status,
+        'photo': user.photo_filename,
+        'thumb': user.photo_thumb_filename,
+        'variants': variant_filenames(user.photo_filename),
+    }
+
+
+def stage_profile_photo(user_type, user_id, file, upload_dir):
+    """
+    Save an upload under PENDING_DIR and mark the user's photo as processing;
+    the current photo stays in place until process_profile_photo() replaces
+    it. The caller commits, then hands the returned arguments to
+    process_profile_photo (usually through utils.image_pipeline).
+
+    Returns:
+        (key, staged_path)
+    """
+    from werkzeug.utils import secure_filename
+
+    user = db.session.get(_model(user_type), user_id)
+    if user is None:
+        raise ValueError(f"No {user_type} with id {user_id}")
+
+    _, ext = os.path.splitext(secure_filename(file.filename))
+    key = f"{user_type}_{user_id}_{secrets.token_hex(4)}"
+    pending_dir = os.path.join(upload_dir, PENDING_DIR)
+    os.makedirs(pending_dir, exist_ok=True)
+    staged_path = os.path.join(pending_dir, key + ext.lower())
+    file.save(staged_path)
+
+    # A newer upload supersedes one still in flight; that job discards its output
+    user.photo_status = 'processing'
+    user.photo_pending = key
+    user.photo_updated_at = datetime.utcnow()
+    return key, staged_path
+
+
+def recover_stale_photo(user_type, user_id, upload_dir, stale_after):
+    """
+    Restart the processing of a user's photo that has been 'processing' for
+    over `stale_after` seconds, i.e. whose job was lost with the process
+    that ran it (restart, crash). The staged upload is queued again; if it
+    is gone as well the status becomes 'failed'. Concurrent callers (other
+    workers polling) claim the upload with a compare-and-set, so only one
+    requeues it. Commits.
+
+    Returns:
+        'requeued', 'failed' or None when there was nothing to recover
+    """
+    from utils.image_pipeline import image_pipeline
+
+    user = db.session.get(_model(user_type), user_id)
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    if user is None or user.photo_status != 'processing' or not user.photo_pending \
+            or (user.photo_updated_at is not None and user.photo_updated_at > cutoff):
+        return None
+
+    key = user.photo_pending
+    model = _model(user_type)
+    table = model.__table__
+    id_column = table.primary_key.columns.values()[0]
+    claimed = db.session.execute(
+        db.update(table)
+        .where(id_column == user_id, table.c.photo_pending == key, table.c.photo_status == 'processing',
+               db.or_(table.c.photo_updated_at.is_(None), table.c.photo_updated_at <= cutoff))
+        .values(photo_updated_at=datetime.utcnow())
+    ).rowcount == 1
+    db.session.commit()
+    db.session.expire_all()
+    if not claimed:
+        return None
+
+    pending_dir = os.path.join(upload_dir, PENDING_DIR)
+    try:
+        staged_path = next((entry.path for entry in os.scandir(pending_dir)
+                            if os.path.splitext(entry.name)[0] == key), None)
+    except FileNotFoundError:
+        staged_path = None
+    if staged_path is None:
+        _finish(user_type, user_id, key, photo_status='failed')
+        return 'failed'
+    image_pipeline.submit('profile_photo_variants', process_profile_photo,
+                          user_type, user_id, key, staged_path, upload_dir)
+    return 'requeued'
+
+
+def render_variants(source_path, dest_dir, key, max_pixels):
+    """
+    Decode an image once and write <key>.jpg (longest side MAX_PHOTO_SIDE)
+    plus every VARIANT_SIZES x VARIANT_FORMATS variant, upright and without
+    EXIF (camera GPS tags and the like never reach the public files).
+    Images over `max_pixels` are rejected from their header, before any
+    pixels are decoded.
+
+    Returns:
+        Filenames written, the photo first
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    try:
+        with Image.open(source_path) as original:
+            width, height = original.size
+            if width * height > max_pixels:
+                raise ValueError(f"{width}x{height} image is over the {max_pixels} pixel limit")
+            # JPEG only: decode at 1/2, 1/4 or 1/8 scale when that is still big enough
+            original.draft('RGB', (MAX_PHOTO_SIDE, MAX_PHOTO_SIDE))
+            image = ImageOps.exif_transpose(original)
+
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            image = image.convert('RGB')
+        # Keep the colour profile, drop everything else (EXIF, XMP, comments)
+        icc_profile = image.info.get('icc_profile')
+        image.info = {'icc_profile': icc_profile} if icc_profile else {}
+
+        image.thumbnail((MAX_PHOTO_SIDE, MAX_PHOTO_SIDE), Image.LANCZOS)
+        photo_name = f"{key}.jpg"
+        image.save(os.path.join(dest_dir, photo_name), format='JPEG', exif=b'', quality=85, optimize=True)
+        written.append(photo_name)
+
+        # Largest first, each resized from the previous one
+        for size in sorted(VARIANT_SIZES, reverse=True):
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            for ext, fmt, options in VARIANT_FORMATS:
+                name = f"{key}_{size}.{ext}"
+                image.save(os.path.join(dest_dir, name), format=fmt, exif=b'', **options)
+                written.append(name)
+    except Exception:
+        _remove_files(dest_dir, written)
+        raise
+    return written
+
+
+def process_profile_photo(user_type, user_id, key, staged_path, upload_dir):
+    """
+    Turn a staged upload into the user's photo: render the variants, point
+    the user's row at them (only if `key` is still the latest upload) and
+    delete the previous photo's files. On failure the previous photo stays
+    and the status becomes 'failed'. Commits; meant for utils.image_pipeline.
+    """
+    from utils.image_pipeline import image_pipeline
+
+    try:
+        written = render_variants(staged_path, upload_dir, key, image_pipeline.max_pixels)
+    except Exception:
+        _finish(user_type, user_id, key, photo_status='failed')
+        raise
+    finally:
+        _remove_files(os.path.dirname(staged_path), [os.path.basename(staged_path)])
+
+    previous = get_avatar_filenames(user_type, user_id)
+    photo_name = written[0]
+    thumb_name = variant_filenames(photo_name)[max(VARIANT_SIZES)]['jpg']
+    if not _finish(user_type, user_id, key, photo_status='ready', photo_filename=photo_name,
+                   photo_thumb_filename=thumb_name):
+        # Superseded by a newer upload (or the user is gone)
+        _remove_files(upload_dir, written)
+        return
+
+    stale = {previous[0], previous[1]}
+    for variants in variant_filenames(previous[0]).values():
+        stale.update(variants.values())
+    _remove_files(upload_dir, stale - set(written) - {None})
+
+
+def _finish(user_type, user_id, key, **values):
+    """Update the user's photo columns if `key` is still pending; returns whether it was"""
+    model = _model(user_type)
+    id_column = model.__table__.primary_key.columns.values()[0]
+    result = db.session.execute(
+        db.update(model.__table__)
+        .where(id_column == user_id, model.__table__.c.photo_pending == key)
+        .values(photo_pending=None, photo_updated_at=datetime.utcnow(), **values)
+    )
+    db.session.commit()
+    # Loaded copies of the row (e.g. in the request's identity map) are stale now
+    db.session.expire_all()
+    return result.rowcount == 1
+
+
+def _remove_files(directory, names):
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def backfill_avatars(upload_dir):
+    """
+    Index photos uploaded before the columns existed: one directory listing,
+    then one UPDATE per user type. When a user has several originals (e.g.
+    .png and .jpg) the most recently modified wins. The caller commits.
+
+    Returns:
+        Number of users whose photo columns were set
+    """
+    found = {}
+    try:
+        entries = list(os.scandir(upload_dir))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        match = _PHOTO_NAME.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        user_type, user_id, thumb = match.group(1), int(match.group(2)), bool(match.group(3))
+        slot = found.setdefault((user_type, user_id), {'photo': None, 'thumb': None})
+        key = 'thumb' if thumb else 'photo'
+        mtime = entry.stat().st_mtime
+        if slot[key] is None or mtime > slot[key][1]:
+            slot[key] = (entry.name, mtime)
+
+    updated = 0
+    for user_type in ('student', 'faculty'):
+        model = _model(user_type)
+        id_column = model.__table__.primary_key.columns.values()[0]
+        rows = [
+            {'b_id': user_id,
+             'b_photo': slot['photo'][0] if slot['photo'] else None,
+             'b_thumb': slot['thumb'][0] if slot['thumb'] else None}
+            for (kind, user_id), slot in found.items() if kind == user_type
+        ]
+        if not rows:
+            continue
+        statement = db.update(model.__table__).where(id_column == db.bindparam('b_id')).values(
+            photo_filename=db.bindparam('b_photo'), photo_thumb_filename=db.bindparam('b_thumb')
+        )
+        updated += db.session.execute(statement, rows).rowcount
+    return updated
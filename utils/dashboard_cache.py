@@ -0,0 +1,280 @@
+"""
+Dashboard Cache
+Per-user cache for the student/faculty dashboard data with TTL + LRU eviction,
+invalidated when the rows a dashboard is built from are written
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import use_primary
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding dashboard keys to drop once the transaction commits
+_PENDING_KEY = 'stale_dashboards'
+
+
+class MemoryCacheBackend:
+    """In-process cache: TTL per entry, least recently used entry evicted when full"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Shared cache for multi-worker deployments (gunicorn -w N). Entries expire
+    with SETEX; LRU eviction is left to the server's maxmemory-policy
+    (e.g. allkeys-lru). Needs the optional `redis` package.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("DASHBOARD_CACHE_URL is set but the 'redis' package is not installed (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.evictions = 0
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.setex(key, ttl, value)
+
+    def delete(self, keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=f'{prefix}*', count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return None
+
+
+class DashboardCache:
+    """
+    Cache of get_*_dashboard_data() results keyed by dashboard type and user id.
+
+    Values are pickled, so every hit returns a private copy; ORM objects in a
+    cached dashboard are detached and only their loaded columns are usable.
+    Configure with DASHBOARD_CACHE_TTL (seconds, 0 disables),
+    DASHBOARD_CACHE_MAX_ENTRIES and DASHBOARD_CACHE_URL (redis://... for a
+    shared backend; in-process when unset).
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 0
+        self.key_prefix = 'dashboard:'
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = int(app.config.get('DASHBOARD_CACHE_TTL', 60))
+        url = app.config.get('DASHBOARD_CACHE_URL')
+        if self.ttl <= 0:
+            self.backend = None
+        elif url:
+            self.backend = RedisCacheBackend(url)
+        else:
+            self.backend = MemoryCacheBackend(int(app.config.get('DASHBOARD_CACHE_MAX_ENTRIES', 1024)))
+        _register_session_hooks()
+        app.extensions['dashboard_cache'] = self
+
+    def key(self, dashboard_type, user_id):
+        return f'{self.key_prefix}{dashboard_type}:{user_id}'
+
+    def get_or_compute(self, dashboard_type, user_id, compute):
+        """
+        Return the cached dashboard for a user, or compute() and cache it
+        (None is never cached). A cache miss is computed on the primary even
+        in @use_read_replica views: writes drop the key as they commit there,
+        and a lagging replica would put the pre-write data back for the TTL.
+        """
+        if self.backend is None:
+            return compute()
+
+        key = self.key(dashboard_type, user_id)
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Dashboard cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return pickle.loads(cached)
+
+        self.misses += 1
+        with use_primary():
+            data = compute()
+        if data is not None:
+            try:
+                self.backend.set(key, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Dashboard cache write failed: {e}")
+        return data
+
+    def invalidate(self, student_ids=(), faculty_ids=(), all_students=False):
+        """Drop cached dashboards immediately"""
+        if self.backend is None:
+            return
+        keys = [self.key('student', sid) for sid in student_ids if sid is not None]
+        keys += [self.key('faculty', fid) for fid in faculty_ids if fid is not None]
+        try:
+            if all_students:
+                self.backend.delete_prefix(self.key('student', ''))
+            self.backend.delete(keys)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Dashboard cache invalidation failed: {e}")
+            return
+        self.invalidations += len(keys) + (1 if all_students else 0)
+
+    def mark_stale(self, session, student_ids=(), faculty_ids=(), all_students=False):
+        """
+        Queue dashboards for invalidation when `session` commits. Used by
+        Core-level bulk writes that the ORM flush hook cannot see.
+        """
+        if self.backend is None:
+            return
+        pending = session.info.setdefault(_PENDING_KEY, {'student': set(), 'faculty': set(), 'all_students': False})
+        pending['student'].update(sid for sid in student_ids if sid is not None)
+        pending['faculty'].update(fid for fid in faculty_ids if fid is not None)
+        pending['all_students'] = pending['all_students'] or all_students
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.backend is not None,
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.backend.evictions if self.backend else 0,
+            'errors': self.errors,
+            'entries': self.backend.size() if self.backend else 0
+        }
+
+
+dashboard_cache = DashboardCache()
+
+_hooks_registered = False
+
+
+def _register_session_hooks():
+    """Invalidate dashboards from ORM writes: collect on flush, drop on commit, forget on rollback"""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    event.listen(Session, 'after_flush', _collect_stale_dashboards)
+    event.listen(Session, 'after_commit', _drop_stale_dashboards)
+    event.listen(Session, 'after_rollback', lambda session: session.info.pop(_PENDING_KEY, None))
+    _hooks_registered = True
+
+
+def _collect_stale_dashboards(session, flush_context):
+    """Map flushed rows to the dashboards that display them"""
+    if dashboard_cache.backend is None:
+        return
+
+    from models.gecr_models import (
+        Attendance, StudentEnrollment, Submission, Assignment, Announcement, Event, Subject
+    )
+
+    students, faculty, subject_ids, assignment_ids = set(), set(), set(), set()
+    all_students = False
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Attendance):
+            students.add(obj.student_id)
+        elif isinstance(obj, StudentEnrollment):
+            students.add(obj.student_id)
+            subject_ids.add(obj.subject_id)
+        elif isinstance(obj, Submission):
+            students.add(obj.student_id)
+            assignment_ids.add(obj.assignment_id)
+        elif isinstance(obj, Assignment):
+            # Every student dashboard lists pending assignments
+            faculty.add(obj.faculty_id)
+            all_students = True
+        elif isinstance(obj, Announcement):
+            faculty.add(obj.author_id)
+        elif isinstance(obj, Event):
+            faculty.add(obj.created_by)
+
+    # Faculty who teach the touched subjects / own the touched assignments
+    connection = session.connection()
+    subject_ids.discard(None)
+    assignment_ids.discard(None)
+    if subject_ids:
+        faculty.update(connection.execute(
+            select(Subject.faculty_id).where(Subject.subject_id.in_(subject_ids))
+        ).scalars())
+    if assignment_ids:
+        faculty.update(connection.execute(
+            select(Assignment.faculty_id).where(Assignment.assignment_id.in_(assignment_ids))
+        ).scalars())
+
+    if students or faculty or all_students:
+        dashboard_cache.mark_stale(session, students, faculty, all_students)
+
+
+def _drop_stale_dashboards(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        dashboard_cache.invalidate(pending['student'], pending['faculty'], pending['all_students'])
@@ -8,8 +8,9 @@ from models.gecr_models import (
     Assignment, Submission, Message, Fee, Salary, StudentEnrollment
 )
 from database import db
+from utils.attendance_summary import get_student_attendance_summary, get_overall_attendance, empty_counts
 from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 
 
@@ -23,12 +24,10 @@ def get_student_dashboard_data(student_id):
         if not student:
             return None
         
-        # Calculate attendance percentage
-        total_classes = Attendance.query.filter_by(student_id=student_id).count()
-        attended_classes = Attendance.query.filter_by(
-            student_id=student_id, 
-            status='Present'
-        ).count()
+        # Calculate attendance percentage from the attendance_summary counters
+        overall = get_overall_attendance([student_id]).get(student_id, empty_counts())
+        total_classes = overall['total']
+        attended_classes = overall['present']
         attendance_percentage = (attended_classes / total_classes * 100) if total_classes > 0 else 0
         
         # Get pending assignments
@@ -109,6 +108,10 @@ def get_student_dashboard_data(student_id):
 def get_faculty_dashboard_data(faculty_id):
     """
     Get comprehensive dashboard data for a faculty member
+    
+    Uses a fixed number of queries however many subjects, assignments and
+    submissions the faculty has: counts are grouped in SQL and recent
+    activity comes from a single UNION.
     """
     try:
         # Get faculty info
@@ -119,33 +122,35 @@ def get_faculty_dashboard_data(faculty_id):
         # Get subjects taught by faculty
         faculty_subjects = Subject.query.filter_by(faculty_id=faculty_id).all()
         
-        # Count unique students enrolled in faculty's subjects
-        from models import StudentEnrollment
-        unique_student_ids = set()
-        for subject in faculty_subjects:
-            enrollments = StudentEnrollment.query.filter_by(
-                subject_id=subject.subject_id,
-                status='active'
-            ).all()
-            for enrollment in enrollments:
-                unique_student_ids.add(enrollment.student_id)
-        
-        total_students = len(unique_student_ids)
+        # Count unique students enrolled in faculty's subjects (one grouped count)
+        total_students = db.session.query(
+            func.count(func.distinct(StudentEnrollment.student_id))
+        ).join(
+            Subject, StudentEnrollment.subject_id == Subject.subject_id
+        ).filter(
+            Subject.faculty_id == faculty_id,
+            StudentEnrollment.status == 'active'
+        ).scalar() or 0
         
         # Get pending assignments to grade
         pending_assignments = Assignment.query.filter_by(faculty_id=faculty_id).all()
         total_assignments = len(pending_assignments)
-        pending_submissions = []
-        for assignment in pending_assignments:
-            ungraded = Submission.query.filter_by(
-                assignment_id=assignment.assignment_id,
-                grade=None  # Ungraded submissions
-            ).count()
-            if ungraded > 0:
-                pending_submissions.append({
-                    'assignment': assignment,
-                    'ungraded_count': ungraded
-                })
+        
+        # Ungraded submissions per assignment in one grouped count
+        ungraded_counts = dict(db.session.query(
+            Submission.assignment_id, func.count(Submission.submission_id)
+        ).join(
+            Assignment, Submission.assignment_id == Assignment.assignment_id
+        ).filter(
+            Assignment.faculty_id == faculty_id,
+            Submission.grade.is_(None)
+        ).group_by(Submission.assignment_id).all())
+        
+        pending_submissions = [
+            {'assignment': assignment, 'ungraded_count': ungraded_counts[assignment.assignment_id]}
+            for assignment in pending_assignments
+            if ungraded_counts.get(assignment.assignment_id)
+        ]
         
         # Get today's schedule
         today = datetime.now().strftime('%A')
@@ -154,10 +159,14 @@ def get_faculty_dashboard_data(faculty_id):
             day_of_week=today
         ).order_by(Timetable.time_slot).all()
         
-        # Get recent activities (assignments created, submissions graded)
-        recent_assignments = Assignment.query.filter_by(
-            faculty_id=faculty_id
-        ).order_by(desc(Assignment.due_date)).limit(3).all()
+        # Get recent activities (assignments created, submissions graded);
+        # the faculty's assignments are already loaded, latest due date first
+        recent_assignments = sorted(
+            (a for a in pending_assignments if a.due_date),
+            key=lambda a: a.due_date, reverse=True
+        )[:3]
+        if len(recent_assignments) < 3:
+            recent_assignments += [a for a in pending_assignments if not a.due_date][:3 - len(recent_assignments)]
         
         recent_graded = Submission.query.join(Assignment).filter(
             Assignment.faculty_id == faculty_id,
@@ -219,28 +228,27 @@ def get_student_attendance_data(student_id):
             Attendance.student_id == student_id
         ).order_by(desc(Attendance.date)).all()
         
-        # Group by subject
-        subject_attendance = defaultdict(lambda: {
-            'present': 0, 'total': 0, 'percentage': 0, 'subject': None
-        })
-        
-        for attendance, subject, faculty in attendance_records:
-            subject_key = subject.subject_id
-            subject_attendance[subject_key]['subject'] = subject
-            subject_attendance[subject_key]['faculty'] = faculty
-            subject_attendance[subject_key]['total'] += 1
-            if attendance.status == 'Present':
-                subject_attendance[subject_key]['present'] += 1
-        
-        # Calculate percentages
-        for subject_id in subject_attendance:
-            data = subject_attendance[subject_id]
-            data['percentage'] = (data['present'] / data['total'] * 100) if data['total'] > 0 else 0
+        # Per-subject counts from one GROUP BY query
+        summary = get_student_attendance_summary(student_id)
+        subjects = db.session.query(Subject, Faculty).join(
+            Faculty, Subject.faculty_id == Faculty.faculty_id
+        ).filter(Subject.subject_id.in_(list(summary.keys()))).all() if summary else []
+        
+        subject_attendance = {}
+        for subject, faculty in subjects:
+            counts = summary[subject.subject_id]
+            subject_attendance[subject.subject_id] = {
+                'present': counts['present'],
+                'total': counts['total'],
+                'percentage': (counts['present'] / counts['total'] * 100) if counts['total'] > 0 else 0,
+                'subject': subject,
+                'faculty': faculty
+            }
         
         return {
             'student': student,
             'attendance_records': attendance_records,
-            'subject_attendance': dict(subject_attendance)
+            'subject_attendance': subject_attendance
         }
         
     except Exception as e:
@@ -393,91 +401,81 @@ def get_faculty_recent_activities(faculty_id, faculty_subjects):
     Combines attendance sessions, graded submissions, created assignments, etc.
     """
     try:
-        from models.gecr_models import Attendance, Announcement, Event
+        from sqlalchemy import select, union_all, literal, null, type_coerce, String
+        from models.gecr_models import Announcement, Event
         
         activities = []
         now = datetime.now()
         
-        # Get subject IDs for this faculty
-        subject_ids = [s.subject_id for s in faculty_subjects]
-        
-        # 1. Recently graded submissions
-        recent_graded = Submission.query.join(Assignment).filter(
-            Assignment.faculty_id == faculty_id,
-            Submission.grade.isnot(None)
-        ).order_by(desc(Submission.submitted_at)).limit(5).all()
-        
-        for submission in recent_graded:
-            if submission.submitted_at:
-                time_diff = now - datetime.combine(submission.submitted_at, datetime.min.time())
+        def recent(kind, title, detail, timestamp, order_by, limit, *where, join=None):
+            """One UNION member: latest `limit` rows as (kind, title, detail, timestamp)"""
+            stmt = select(
+                literal(kind).label('kind'),
+                type_coerce(title, String).label('title'),
+                type_coerce(detail, String).label('detail'),
+                type_coerce(timestamp, String).label('timestamp')
+            )
+            if join is not None:
+                stmt = stmt.join_from(*join)
+            return select(stmt.where(*where).order_by(desc(order_by)).limit(limit).subquery())
+        
+        # Recently graded submissions, created assignments, announcements and events in one query
+        rows = db.session.execute(union_all(
+            recent('grading', Assignment.title, Submission.grade, Submission.submitted_at,
+                   Submission.submitted_at, 5,
+                   Assignment.faculty_id == faculty_id, Submission.grade.isnot(None),
+                   join=(Submission, Assignment, Submission.assignment_id == Assignment.assignment_id)),
+            recent('assignment', Assignment.title, null(), Assignment.due_date,
+                   Assignment.assignment_id, 5, Assignment.faculty_id == faculty_id),
+            recent('announcement', Announcement.title, null(), Announcement.created_at,
+                   Announcement.created_at, 3, Announcement.author_id == faculty_id),
+            recent('event', Event.title, null(), Event.start_time,
+                   Event.start_time, 3, Event.created_by == faculty_id)
+        )).all()
+        
+        for kind, title, detail, timestamp in rows:
+            timestamp = _as_datetime(timestamp)
+            if timestamp is None:
+                continue
+            
+            if kind == 'grading':
                 activities.append({
                     'type': 'grading',
                     'icon': 'clipboard-check',
-                    'description': f"Graded {submission.assignment.title if submission.assignment else 'Assignment'}",
-                    'detail': f"Grade: {submission.grade} • {format_time_ago(time_diff)}",
-                    'timestamp': datetime.combine(submission.submitted_at, datetime.min.time()),
+                    'description': f"Graded {title or 'Assignment'}",
+                    'detail': f"Grade: {detail} • {format_time_ago(now - timestamp)}",
+                    'timestamp': timestamp,
                     'link': '/faculty/assignments'
                 })
-        
-        # 3. Recently created assignments
-        recent_assignments = Assignment.query.filter_by(
-            faculty_id=faculty_id
-        ).order_by(desc(Assignment.assignment_id)).limit(5).all()
-        
-        for assignment in recent_assignments:
-            # Use due_date as proxy for creation time
-            if assignment.due_date:
-                # Estimate creation as a few days before due date
-                estimated_created = datetime.combine(assignment.due_date, datetime.min.time()) - timedelta(days=7)
-                time_diff = now - estimated_created
+            elif kind == 'assignment':
+                # Use due_date as proxy for creation time: estimate a week before
+                estimated_created = timestamp - timedelta(days=7)
                 activities.append({
                     'type': 'assignment',
                     'icon': 'document-add',
-                    'description': f"Created assignment: {assignment.title}",
-                    'detail': f"Due: {assignment.due_date.strftime('%b %d, %Y') if assignment.due_date else 'No date'} • {format_time_ago(time_diff)}",
+                    'description': f"Created assignment: {title}",
+                    'detail': f"Due: {timestamp.strftime('%b %d, %Y')} • {format_time_ago(now - estimated_created)}",
                     'timestamp': estimated_created,
                     'link': '/faculty/assignments'
                 })
-        
-        # 4. Recent announcements created
-        try:
-            recent_announcements = Announcement.query.filter_by(
-                author_id=faculty_id
-            ).order_by(desc(Announcement.created_at)).limit(3).all()
-            
-            for ann in recent_announcements:
-                if ann.created_at:
-                    time_diff = now - ann.created_at
-                    activities.append({
-                        'type': 'announcement',
-                        'icon': 'speakerphone',
-                        'description': f"Posted announcement: {ann.title[:30]}{'...' if len(ann.title) > 30 else ''}",
-                        'detail': format_time_ago(time_diff),
-                        'timestamp': ann.created_at,
-                        'link': '/faculty/manage-announcements'
-                    })
-        except Exception:
-            pass  # Announcement model may not exist
-        
-        # 5. Recent events created
-        try:
-            recent_events = Event.query.filter_by(
-                created_by=faculty_id
-            ).order_by(desc(Event.start_time)).limit(3).all()
-            
-            for event in recent_events:
-                if event.start_time:
-                    time_diff = now - event.start_time
-                    activities.append({
-                        'type': 'event',
-                        'icon': 'calendar',
-                        'description': f"Created event: {event.title[:30]}{'...' if len(event.title) > 30 else ''}",
-                        'detail': format_time_ago(time_diff),
-                        'timestamp': event.start_time,
-                        'link': '/faculty/events'
-                    })
-        except Exception:
-            pass  # Event model may not exist
+            elif kind == 'announcement':
+                activities.append({
+                    'type': 'announcement',
+                    'icon': 'speakerphone',
+                    'description': f"Posted announcement: {title[:30]}{'...' if len(title) > 30 else ''}",
+                    'detail': format_time_ago(now - timestamp),
+                    'timestamp': timestamp,
+                    'link': '/faculty/manage-announcements'
+                })
+            elif kind == 'event':
+                activities.append({
+                    'type': 'event',
+                    'icon': 'calendar',
+                    'description': f"Created event: {title[:30]}{'...' if len(title) > 30 else ''}",
+                    'detail': format_time_ago(now - timestamp),
+                    'timestamp': timestamp,
+                    'link': '/faculty/events'
+                })
         
         # Sort all activities by timestamp (most recent first)
         activities.sort(key=lambda x: x['timestamp'] if x['timestamp'] else datetime.min, reverse=True)
@@ -490,6 +488,18 @@ def get_faculty_recent_activities(faculty_id, faculty_subjects):
         return []
 
 
+def _as_datetime(value):
+    """Normalise a UNION timestamp column (ISO text on SQLite, date/datetime elsewhere)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
 def format_time_ago(time_diff):
     """Format a timedelta as a human-readable string"""
     if time_diff.days > 7:
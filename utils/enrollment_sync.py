@@ -0,0 +1,125 @@
+"""
+Enrollment Roster Sync
+Reconciles an uploaded roster (enrollment/roll numbers) with a subject's
+enrollments as set differences: one query resolves the roster's students,
+one reads the subject's enrollments, and the changes apply as one bulk
+INSERT and one UPDATE per status change instead of lookups per row.
+"""
+
+from datetime import datetime
+
+from database import db
+from models.gecr_models import Student, StudentEnrollment, Subject
+from utils.attendance_writer import chunked, MAX_STATEMENT_PARAMS, _get_insert
+from utils.dashboard_cache import dashboard_cache
+
+
+def resolve_roster(identifiers):
+    """
+    Match roster entries to students. Enrollment numbers are roll numbers
+    (Student.enrollment_no is an alias), so one roll_no IN (...) per batch.
+
+    Returns:
+        ({identifier: (student_id, roll_no, name)}, [identifiers not found])
+    """
+    identifiers = list(dict.fromkeys(identifiers))
+    found = {}
+    for batch in chunked(identifiers, MAX_STATEMENT_PARAMS):
+        for row in db.session.query(Student.student_id, Student.roll_no, Student.name).filter(
+            Student.roll_no.in_(batch)
+        ):
+            found[row.roll_no] = (row.student_id, row.roll_no, row.name)
+    return found, [identifier for identifier in identifiers if identifier not in found]
+
+
+def diff_roster(subject_id, identifiers, drop_missing=False):
+    """
+    Compare a roster with the subject's current enrollments without writing.
+
+    Args:
+        subject_id: Subject whose enrollments are reconciled
+        identifiers: Enrollment or roll numbers from the uploaded file
+        drop_missing: Also drop active enrollments of students not on the roster
+
+    Returns:
+        dict with student_id lists 'add' (never enrolled), 'reactivate'
+        (dropped), 'drop' (active, not on the roster; empty unless
+        drop_missing) and 'unchanged'; 'not_found' identifiers; 'students'
+        mapping every listed student_id to (roll_no, name)
+    """
+    found, not_found = resolve_roster(identifiers)
+    roster = {student_id for student_id, _, _ in found.values()}
+    students = {student_id: (roll_no, name) for student_id, roll_no, name in found.values()}
+
+    current = {}
+    for row in db.session.query(
+        StudentEnrollment.student_id, StudentEnrollment.status, Student.roll_no, Student.name
+    ).join(Student, Student.student_id == StudentEnrollment.student_id).filter(
+        StudentEnrollment.subject_id == subject_id
+    ):
+        current[row.student_id] = row.status
+        students.setdefault(row.student_id, (row.roll_no, row.name))
+
+    dropped = {student_id for student_id, status in current.items() if status == 'dropped'}
+    active = {student_id for student_id, status in current.items() if status == 'active'}
+    diff = {
+        'add': sorted(roster - current.keys()),
+        'reactivate': sorted(roster & dropped),
+        'drop': sorted(active - roster) if drop_missing else [],
+        'unchanged': sorted(roster & (current.keys() - dropped)),
+        'not_found': not_found,
+    }
+    listed = set().union(diff['add'], diff['reactivate'], diff['drop'], diff['unchanged'])
+    diff['students'] = {student_id: students[student_id] for student_id in listed}
+    return diff
+
+
+def apply_roster_diff(subject_id, diff, faculty_id=None, enrolled_at=None):
+    """
+    Write a diff_roster() result with bulk statements (the caller commits).
+    Status updates re-check the old status, so rows changed since the diff
+    are left alone; adds skip students enrolled meanwhile where the
+    database supports ON CONFLICT. `faculty_id` (the subject's teacher)
+    saves looking it up for the dashboard cache.
+
+    Returns:
+        dict with 'added', 'reactivated' and 'dropped' counts
+    """
+    enrolled_at = enrolled_at or datetime.utcnow()
+    academic_year = f"{enrolled_at.year}-{enrolled_at.year + 1}"
+    counts = {'added': 0, 'reactivated': 0, 'dropped': 0}
+
+    rows = [
+        {'student_id': student_id, 'subject_id': subject_id, 'status': 'active',
+         'enrollment_date': enrolled_at, 'academic_year': academic_year}
+        for student_id in diff['add']
+    ]
+    insert = _get_insert(db.engine.dialect.name)
+    for batch in chunked(rows, MAX_STATEMENT_PARAMS // 5):
+        if insert is not None:
+            stmt = insert(StudentEnrollment).values(batch).on_conflict_do_nothing(
+                index_elements=['student_id', 'subject_id']
+            )
+            counts['added'] += db.session.execute(stmt).rowcount
+        else:
+            db.session.execute(db.insert(StudentEnrollment), batch)
+            counts['added'] += len(batch)
+
+    for key, student_ids, old_status, new_status in (('reactivated', diff['reactivate'], 'dropped', 'active'),
+                                                      ('dropped', diff['drop'], 'active', 'dropped')):
+        for batch in chunked(student_ids, MAX_STATEMENT_PARAMS):
+            counts[key] += db.session.execute(
+                db.update(StudentEnrollment)
+                .where(StudentEnrollment.subject_id == subject_id, StudentEnrollment.status == old_status,
+                       StudentEnrollment.student_id.in_(batch))
+                .values(status=new_status)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+    # Core statements bypass the ORM flush hook, so flag the dashboards explicitly
+    changed = diff['add'] + diff['reactivate'] + diff['drop']
+    if changed:
+        if faculty_id is None:
+            faculty_id = db.session.query(Subject.faculty_id).filter(Subject.subject_id == subject_id).scalar()
+        dashboard_cache.mark_stale(db.session, student_ids=changed, faculty_ids=[faculty_id])
+    return counts
@@ -1,19 +1,60 @@
 """
 Excel Parser Utility for Attendance Upload
-Parses Excel files to extract attendance data with dates and student information
+Parses Excel/CSV files to extract attendance data with dates and student information
 """
 
-import openpyxl
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 import logging
 
+from utils.sheet_parser import STATUS_CODES, read_sheet, cell_text, text_values, status_values  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
 
-def parse_attendance_excel(file_path):
+# Header names that identify the roll number / other non-date columns
+ROLL_COLUMNS = ['roll no', 'roll_no', 'rollno', 'roll number']
+METADATA_COLUMNS = ROLL_COLUMNS + ['name', 'student name']
+
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y']
+
+# Sheet rows per yielded batch; with ~90 date columns this keeps a batch
+# around 45k records regardless of how many students the sheet holds
+DEFAULT_BATCH_ROWS = 500
+
+
+def _parse_header_date(value):
+    """Parse a date column header, returning a date or None"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    header = cell_text(value)
+    if not header:
+        return None
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(header, fmt).date()
+        except ValueError:
+            continue
+
+    try:
+        return pd.to_datetime(header, dayfirst=True).date()
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def stream_attendance_excel(file_path, batch_size=DEFAULT_BATCH_ROWS, filename=None):
     """
-    Parse an attendance Excel file and extract attendance records.
+    Stream a wide-format attendance sheet (.xlsx, .xls or .csv) without
+    loading it into memory.
+    
+    The header row is parsed up front; data rows are read a block at a
+    time as 'batches' is consumed, and each block's status cells are mapped
+    column-wise (utils.sheet_parser) rather than cell by cell.
     
     Expected format:
     - First row: Headers (e.g., Roll No, Name, Date1, Date2, Date3, ...)
@@ -22,217 +63,116 @@ def parse_attendance_excel(file_path):
     
     Args:
         file_path: Path to the Excel file
+        batch_size: Number of sheet rows per yielded batch
+        filename: Original file name, when file_path is a file object
         
     Returns:
         dict with:
-            - 'dates': list of date objects
-            - 'records': list of dicts with student_roll_no, date, status
-            - 'errors': list of error messages
+            - 'dates': list of date objects (one per date column)
+            - 'errors': list of header error messages
+            - 'batches': generator of lists of (roll_no, date, status) tuples;
+              empty when the header has errors
     """
-    try:
-        # Try using pandas for easier parsing
-        df = pd.read_excel(file_path)
-        
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        dates = []
-        date_columns = []
-        records = []
-        errors = []
-        
-        # Identify date columns (anything that's not Roll No, Name, or other metadata)
-        metadata_cols = ['roll no', 'roll_no', 'rollno', 'name', 'student name', 'roll number']
-        
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            if col_lower not in metadata_cols:
-                # Try to parse as date
-                try:
-                    # Try different date formats
-                    date_obj = None
-                    col_str = str(col).strip()
-                    
-                    # Try parsing with pandas
-                    try:
-                        date_obj = pd.to_datetime(col_str, dayfirst=True).date()
-                    except:
-                        # Try common formats manually
-                        for fmt in ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y']:
-                            try:
-                                date_obj = datetime.strptime(col_str, fmt).date()
-                                break
-                            except:
-                                continue
-                    
-                    if date_obj:
-                        dates.append(date_obj)
-                        date_columns.append(col)
-                except Exception as e:
-                    logger.warning(f"Could not parse column '{col}' as date: {e}")
-        
-        if not dates:
-            errors.append("No valid date columns found in Excel file")
-            return {'dates': [], 'records': [], 'errors': errors}
-        
-        # Find roll number column
-        roll_col = None
-        for col in df.columns:
-            if str(col).lower().strip() in metadata_cols:
-                roll_col = col
-                break
-        
-        if not roll_col:
-            errors.append("Could not find 'Roll No' column in Excel file")
-            return {'dates': dates, 'records': [], 'errors': errors}
-        
-        # Extract attendance records
-        for idx, row in df.iterrows():
-            try:
-                roll_no = str(row[roll_col]).strip()
-                
-                # Skip empty rows or header rows
-                if pd.isna(roll_no) or roll_no.lower() in ['roll no', 'roll_no', 'nan', '']:
-                    continue
-                
-                # For each date column, extract attendance status
-                for date_obj, date_col in zip(dates, date_columns):
-                    status_val = str(row[date_col]).strip().upper() if pd.notna(row[date_col]) else ''
-                    
-                    # Map status values
-                    status = None
-                    if status_val in ['P', 'PRESENT', '1', 'Y', 'YES']:
-                        status = 'Present'
-                    elif status_val in ['A', 'ABSENT', '0', 'N', 'NO']:
-                        status = 'Absent'
-                    elif status_val in ['L', 'LATE', 'T', 'TARDY']:
-                        status = 'Late'
-                    
-                    if status:
-                        records.append({
-                            'student_roll_no': roll_no,
-                            'date': date_obj,
-                            'status': status
-                        })
-            except Exception as e:
-                errors.append(f"Error processing row {idx + 2}: {str(e)}")
-        
-        return {
-            'dates': dates,
-            'records': records,
-            'errors': errors,
-            'total_students': len(df) - 1 if len(df) > 1 else 0,
-            'total_records': len(records)
-        }
-        
-    except Exception as e:
-        logger.error(f"Error parsing Excel file: {str(e)}")
-        return {
-            'dates': [],
-            'records': [],
-            'errors': [f"Failed to parse Excel file: {str(e)}"]
-        }
+    sheet = read_sheet(file_path, filename, block_rows=batch_size)
+    if sheet['errors']:
+        logger.error(f"Error opening Excel file: {sheet['errors'][0]}")
+        return {'dates': [], 'errors': [f"Failed to parse Excel file: {sheet['errors'][0]}"], 'batches': iter(())}
+
+    roll_col_idx = None
+    dates = []
+    date_columns = []
+    for idx, header in enumerate(sheet['headers']):
+        header_lower = cell_text(header).lower()
+        if header_lower in ROLL_COLUMNS:
+            if roll_col_idx is None:
+                roll_col_idx = idx
+        elif header_lower not in METADATA_COLUMNS:
+            date_obj = _parse_header_date(header)
+            if date_obj:
+                dates.append(date_obj)
+                date_columns.append(idx)
+
+    errors = []
+    if not dates:
+        errors.append("No valid date columns found in Excel file")
+    elif roll_col_idx is None:
+        errors.append("Could not find 'Roll No' column in Excel file")
+
+    if errors:
+        sheet['blocks'].close()
+        return {'dates': dates, 'errors': errors, 'batches': iter(())}
+
+    date_values = np.array(dates, dtype=object)
+
+    def batches():
+        try:
+            for block in sheet['blocks']:
+                roll_numbers = text_values(block[roll_col_idx])
+
+                # Skip empty rows or repeated header rows
+                keep = ~roll_numbers.str.lower().isin(['', 'roll no', 'roll_no', 'nan', 'none']).to_numpy()
+                cells = block.loc[keep, date_columns].to_numpy(dtype=object)
 
+                # All status cells of the block in one pass, then (row, date) pairs row by row
+                statuses = status_values(cells)
+                marked = np.flatnonzero(statuses != None)  # noqa: E711
+                row_positions, date_positions = np.divmod(marked, len(date_columns))
+                yield list(zip(roll_numbers.to_numpy()[keep][row_positions].tolist(),
+                               date_values[date_positions].tolist(),
+                               statuses[marked].tolist()))
+        finally:
+            sheet['blocks'].close()
 
-def parse_attendance_excel_openpyxl(file_path):
+    return {'dates': dates, 'errors': [], 'batches': batches()}
+
+
+def parse_attendance_excel(file_path):
     """
-    Alternative parser using openpyxl directly (more control over formatting).
+    Parse an attendance Excel file and extract all attendance records.
+    
+    Collects stream_attendance_excel() into a single result; prefer the
+    streaming version for large sheets.
     
     Args:
         file_path: Path to the Excel file
         
     Returns:
-        Same dict format as parse_attendance_excel
+        dict with:
+            - 'dates': list of date objects
+            - 'records': list of dicts with student_roll_no, date, status
+            - 'errors': list of error messages
     """
+    stream = stream_attendance_excel(file_path)
+    if stream['errors']:
+        return {'dates': stream['dates'], 'records': [], 'errors': stream['errors']}
+
+    records = []
+    roll_numbers = set()
     try:
-        workbook = openpyxl.load_workbook(file_path)
-        sheet = workbook.active
-        
-        dates = []
-        date_columns = []
-        records = []
-        errors = []
-        
-        # Read header row
-        headers = []
-        for cell in sheet[1]:
-            headers.append(cell.value)
-        
-        # Identify date columns and roll no column
-        roll_col_idx = None
-        metadata_cols = ['roll no', 'roll_no', 'rollno', 'name', 'student name', 'roll number']
-        
-        for idx, header in enumerate(headers):
-            if header:
-                header_lower = str(header).lower().strip()
-                if header_lower in metadata_cols:
-                    roll_col_idx = idx
-                else:
-                    # Try to parse as date
-                    try:
-                        header_str = str(header).strip()
-                        date_obj = None
-                        
-                        for fmt in ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y']:
-                            try:
-                                date_obj = datetime.strptime(header_str, fmt).date()
-                                break
-                            except:
-                                continue
-                        
-                        if date_obj:
-                            dates.append(date_obj)
-                            date_columns.append(idx)
-                    except:
-                        pass
-        
-        if roll_col_idx is None:
-            errors.append("Could not find 'Roll No' column")
-            return {'dates': dates, 'records': [], 'errors': errors}
-        
-        if not dates:
-            errors.append("No valid date columns found")
-            return {'dates': dates, 'records': [], 'errors': errors}
-        
-        # Process data rows
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2), start=2):
-            try:
-                roll_no = str(row[roll_col_idx].value).strip() if row[roll_col_idx].value else ''
-                
-                if not roll_no or roll_no.lower() in ['roll no', 'none']:
-                    continue
-                
-                for date_obj, col_idx in zip(dates, date_columns):
-                    status_val = str(row[col_idx].value).strip().upper() if row[col_idx].value else ''
-                    
-                    status = None
-                    if status_val in ['P', 'PRESENT', '1', 'Y', 'YES']:
-                        status = 'Present'
-                    elif status_val in ['A', 'ABSENT', '0', 'N', 'NO']:
-                        status = 'Absent'
-                    elif status_val in ['L', 'LATE', 'T', 'TARDY']:
-                        status = 'Late'
-                    
-                    if status:
-                        records.append({
-                            'student_roll_no': roll_no,
-                            'date': date_obj,
-                            'status': status
-                        })
-            except Exception as e:
-                errors.append(f"Error processing row {row_idx}: {str(e)}")
-        
-        return {
-            'dates': dates,
-            'records': records,
-            'errors': errors,
-            'total_records': len(records)
-        }
-        
+        for batch in stream['batches']:
+            for roll_no, date_obj, status in batch:
+                roll_numbers.add(roll_no)
+                records.append({
+                    'student_roll_no': roll_no,
+                    'date': date_obj,
+                    'status': status
+                })
     except Exception as e:
-        logger.error(f"Error parsing Excel file with openpyxl: {str(e)}")
+        logger.error(f"Error parsing Excel file: {str(e)}")
         return {
             'dates': [],
             'records': [],
             'errors': [f"Failed to parse Excel file: {str(e)}"]
         }
+
+    return {
+        'dates': stream['dates'],
+        'records': records,
+        'errors': [],
+        'total_students': len(roll_numbers),
+        'total_records': len(records)
+    }
+
+
+# Kept for callers of the former openpyxl-based parser; both now share utils.sheet_parser
+parse_attendance_excel_openpyxl = parse_attendance_excel
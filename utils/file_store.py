@@ -0,0 +1,369 @@
+"""
+File Store
+Content-addressed storage for uploaded files. Bodies are streamed to disk
+in fixed-size pieces and hashed on the way in, so memory use does not grow
+with file size. Each distinct content is kept once, at
+FILE_STORE_FOLDER/blobs/<sha256[:2]>/<sha256>. Chunked uploads are
+resumable: the bytes received so far live in
+FILE_STORE_FOLDER/parts/<upload_id>.part, and each chunk is received into
+a file of its own before it is appended there. FILE_STORE_FOLDER is private
+(not under the publicly served UPLOAD_FOLDER); files leave it only through
+the access-checked download route.
+"""
+
+import hashlib
+import glob
+import os
+import secrets
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.gecr_models import FileBlob, StoredFile, UploadSession
+
+# Bytes read from the request per write/hash step
+COPY_BUFFER = 64 * 1024
+
+# Running SHA-256 of each chunked upload this process has seen, as
+# {upload_id: (offset, hasher)}; rebuilt from the part file when a chunk
+# arrives at another worker or after a restart
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """An upload request that cannot be accepted; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def store_dir():
+    """The private storage folder (FILE_STORE_FOLDER, relative to the app root)"""
+    return os.path.join(current_app.root_path, current_app.config.get('FILE_STORE_FOLDER', 'instance/file_store'))
+
+
+def blob_path(sha256):
+    return os.path.join(store_dir(), 'blobs', sha256[:2], sha256)
+
+
+def part_path(upload_id):
+    return os.path.join(store_dir(), 'parts', f'{upload_id}.part')
+
+
+def quota_for(owner_type):
+    """Bytes a user may store (UPLOAD_QUOTA_STUDENT / UPLOAD_QUOTA_FACULTY)"""
+    return int(current_app.config.get(f'UPLOAD_QUOTA_{owner_type.upper()}', 0))
+
+
+def usage(owner_type, owner_id):
+    """
+    Bytes counted against a user's quota: their files (deduplicated content
+    still counts for every owner) plus the full size of uploads in progress
+    """
+    stored = db.session.query(db.func.coalesce(db.func.sum(StoredFile.size), 0)).filter(
+        StoredFile.owner_type == owner_type, StoredFile.owner_id == owner_id
+    ).scalar_subquery()
+    reserved = db.session.query(db.func.coalesce(db.func.sum(UploadSession.total_size), 0)).filter(
+        UploadSession.owner_type == owner_type, UploadSession.owner_id == owner_id
+    ).scalar_subquery()
+    return db.session.query(stored + reserved).scalar()
+
+
+def check_quota(owner_type, owner_id, size):
+    max_size = int(current_app.config.get('UPLOAD_MAX_SIZE', 0))
+    if max_size and size > max_size:
+        raise UploadError(f'File is larger than {max_size} bytes', 413, max_size=max_size)
+    quota = quota_for(owner_type)
+    used = usage(owner_type, owner_id)
+    if quota and used + size > quota:
+        raise UploadError('Upload quota exceeded', 413, quota=quota, used=used)
+
+
+def _count_bytes(kind, amount):
+    from utils.metrics import metrics
+    if metrics.enabled and amount:
+        metrics.registry.inc('gecr_upload_bytes_total', (kind,), amount)
+
+
+def _copy(stream, f, hasher, limit):
+    """Copy up to `limit` bytes from stream to f, hashing them; returns the number copied"""
+    copied = 0
+    while copied < limit:
+        piece = stream.read(min(COPY_BUFFER, limit - copied))
+        if not piece:
+            break
+        f.write(piece)
+        hasher.update(piece)
+        copied += len(piece)
+    return copied
+
+
+def _store_blob(path, sha256, size):
+    """
+    Move a fully received file at `path` into the blob store, or drop it if
+    the same content is already stored. Commits the FileBlob row on its own,
+    so call it with nothing else pending in the session.
+
+    Returns:
+        True if the content was already stored
+    """
+    target = blob_path(sha256)
+    existing = db.session.get(FileBlob, sha256)
+    if existing is not None and os.path.exists(target):
+        os.remove(path)
+        return True
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    if existing is None:
+        db.session.add(FileBlob(sha256=sha256, size=size))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request stored the same content first; the file on disk is identical
+            db.session.rollback()
+            return True
+    return False
+
+
+def _add_file(owner_type, owner_id, filename, content_type, path, sha256, size, upload=None):
+    """Store the blob, then create the StoredFile (deleting `upload`, if given) and commit"""
+    deduplicated = _store_blob(path, sha256, size)
+    stored = StoredFile(owner_type=owner_type, owner_id=owner_id, filename=filename,
+                        content_type=content_type, sha256=sha256, size=size)
+    db.session.add(stored)
+    if upload is not None:
+        db.session.delete(upload)
+    db.session.commit()
+    _count_bytes('deduplicated' if deduplicated else 'stored', size)
+    return stored, deduplicated
+
+
+def store_stream(owner_type, owner_id, filename, content_type, stream, expected_size=None):
+    """
+    Store a whole file read from `stream` (single-request uploads). Quota is
+    checked against `expected_size` up front when known and against the
+    real size once the body is on disk. Commits.
+
+    Returns:
+        (StoredFile, deduplicated)
+    """
+    if expected_size is not None:
+        check_quota(owner_type, owner_id, expected_size)
+    path = part_path(secrets.token_hex(16))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    hasher = hashlib.sha256()
+    max_size = int(current_app.config.get('UPLOAD_MAX_SIZE', 0)) or float('inf')
+    try:
+        with open(path, 'wb') as f:
+            size = _copy(stream, f, hasher, max_size + 1)
+        _count_bytes('received', size)
+        check_quota(owner_type, owner_id, size)
+        return _add_file(owner_type, owner_id, filename, content_type, path, hasher.hexdigest(), size)
+    except Exception:
+        db.session.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def start_upload(owner_type, owner_id, filename, size, content_type=None):
+    """
+    Open a chunked upload of `size` bytes, reserving that much of the user's
+    quota until it completes or is cancelled. An empty file is stored at
+    once. Commits.
+
+    Returns:
+        (UploadSession, None) or, for an empty file, (None, StoredFile)
+    """
+    if size < 0:
+        raise UploadError('size must not be negative')
+    check_quota(owner_type, owner_id, size)
+    if size == 0:
+        return None, store_stream(owner_type, owner_id, filename, content_type, _EmptyStream())[0]
+
+    upload = UploadSession(upload_id=secrets.token_hex(16), owner_type=owner_type, owner_id=owner_id,
+                           filename=filename, content_type=content_type, total_size=size, received=0)
+    db.session.add(upload)
+    db.session.commit()
+    return upload, None
+
+
+def _hasher_at(upload_id, offset):
+    """SHA-256 state after the first `offset` bytes, from memory or by re-reading the part file"""
+    with _hashers_lock:
+        cached = _hashers.get(upload_id)
+    if cached is not None and cached[0] == offset:
+        # A copy, so a chunk that fails half-way leaves the cached state intact
+        return cached[1].copy()
+    hasher = hashlib.sha256()
+    if offset:
+        with open(part_path(upload_id), 'rb') as f:
+            if _copy(f, _NullWriter(), hasher, offset) != offset:
+                raise UploadError('Upload data is missing; start the upload again', 410)
+    return hasher
+
+
+def _forget(upload_id):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for piece in iter(lambda: f.read(COPY_BUFFER), b''):
+            hasher.update(piece)
+    return hasher.hexdigest()
+
+
+def write_chunk(upload, offset, stream, length=None):
+    """
+    Append the next chunk of a chunked upload. `offset` must equal the bytes
+    already received (409 otherwise, with the current offset, so clients can
+    resume). If the body ends early, the bytes that did arrive are kept; if
+    the connection breaks, the chunk is discarded and the client resumes from
+    the offset GET reports. The last chunk turns the upload into a
+    StoredFile, once the part file is re-hashed and matches. Commits.
+
+    The chunk is received into a file of its own; only the request that wins
+    the compare-and-set on `received` appends it to the part file, while it
+    holds the row's write lock, so requests racing on one offset (a retried
+    chunk still running on another worker) never touch each other's bytes.
+
+    Returns:
+        (received, StoredFile or None, deduplicated)
+    """
+    if offset != upload.received:
+        raise UploadError('Offset does not match the bytes received so far', 409, offset=upload.received)
+    remaining = upload.total_size - offset
+    if length is not None and length > remaining:
+        raise UploadError('Chunk goes past the declared size', 413, offset=upload.received)
+
+    upload_id = upload.upload_id
+    path = part_path(upload_id)
+    chunk_path = f'{path}.{secrets.token_hex(8)}'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        hasher = _hasher_at(upload_id, offset)
+        with open(chunk_path, 'wb') as chunk:
+            copied = _copy(stream, chunk, hasher, remaining if length is None else length)
+            if length is None and stream.read(1):
+                raise UploadError('Chunk goes past the declared size', 413, offset=offset)
+        _count_bytes('received', copied)
+
+        received = offset + copied
+        # Compare-and-set, so two requests writing the same offset cannot both advance it;
+        # the row stays locked until the commit below, while the winner appends its chunk
+        claimed = db.session.execute(
+            db.update(UploadSession)
+            .where(UploadSession.upload_id == upload_id, UploadSession.received == offset)
+            .values(received=received, updated_at=datetime.utcnow())
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            _forget(upload_id)
+            current = db.session.query(UploadSession.received).filter(
+                UploadSession.upload_id == upload_id
+            ).scalar()
+            if current is None:
+                # The winner's chunk was the last one (or the upload was cancelled)
+                raise UploadError('Upload not found', 404)
+            raise UploadError('Another request is writing this upload', 409, offset=current)
+
+        try:
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f, open(chunk_path, 'rb') as chunk:
+                # Drop bytes past `offset` left by an append whose commit failed
+                f.truncate(offset)
+                f.seek(offset)
+                shutil.copyfileobj(chunk, f, COPY_BUFFER)
+        except Exception:
+            db.session.rollback()
+            raise
+        db.session.commit()
+    finally:
+        _remove_quietly(chunk_path)
+
+    if received < upload.total_size:
+        with _hashers_lock:
+            _hashers[upload_id] = (received, hasher)
+        return received, None, False
+
+    sha256 = hasher.hexdigest()
+    try:
+        if _file_sha256(path) != sha256:
+            # Stored blobs are found by hash, so never store content under a hash it does not have
+            cancel_upload(upload)
+            raise UploadError('Upload data does not match what was received; start the upload again', 410)
+        stored, deduplicated = _add_file(upload.owner_type, upload.owner_id, upload.filename,
+                                         upload.content_type, path, sha256, received, upload)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _forget(upload_id)
+    return received, stored, deduplicated
+
+
+def cancel_upload(upload):
+    """Delete an upload in progress and its partial data, releasing its quota. Commits."""
+    _forget(upload.upload_id)
+    db.session.delete(upload)
+    db.session.commit()
+    path = part_path(upload.upload_id)
+    # With the chunks of requests that stopped before appending theirs
+    for leftover in [path] + glob.glob(glob.escape(path) + '.*'):
+        _remove_quietly(leftover)
+
+
+def delete_file(stored):
+    """Delete a user's file; its blob goes too when no other file shares it. Commits."""
+    sha256 = stored.sha256
+    db.session.delete(stored)
+    db.session.flush()
+    orphaned = db.session.execute(
+        db.delete(FileBlob).where(
+            FileBlob.sha256 == sha256,
+            ~db.exists().where(StoredFile.sha256 == sha256)
+        )
+    ).rowcount
+    db.session.commit()
+    if orphaned:
+        _remove_quietly(blob_path(sha256))
+
+
+def purge_stale_uploads(max_age_hours):
+    """
+    Cancel chunked uploads that received nothing for `max_age_hours`.
+
+    Returns:
+        Number of uploads removed
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        cancel_upload(upload)
+    return len(stale)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _EmptyStream:
+    def read(self, size=-1):
+        return b''
+
+
+class _NullWriter:
+    def write(self, data):
+        pass
@@ -0,0 +1,134 @@
+"""
+Image Pipeline
+Bounded background pool for CPU-heavy image work (profile photo resizing),
+so upload requests return as soon as the original is on disk
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePipeline:
+    """
+    Runs image jobs on a small thread pool (Pillow releases the GIL while
+    decoding, resizing and encoding).
+
+    Configure with IMAGE_WORKERS (threads per process; 0 processes inline in
+    the request), IMAGE_QUEUE_SIZE (jobs queued or running per process
+    before new ones are processed inline, which slows uploads down instead
+    of letting the queue grow without bound) and IMAGE_MAX_PIXELS (larger
+    images are rejected before they are decoded). IMAGE_STALE_SECONDS is how
+    long a photo may stay 'processing' before a status poll assumes its job
+    was lost (e.g. in a restart) and queues it again. The pool is created on
+    first use in each process, so it is safe with gunicorn --preload.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 2
+        self.queue_size = 16
+        self.max_pixels = 40_000_000
+        self.stale_after = 300
+        self.processed = 0
+        self.failed = 0
+        self.inline = 0
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = int(app.config.get('IMAGE_WORKERS', 2))
+        self.queue_size = max(1, int(app.config.get('IMAGE_QUEUE_SIZE', 16)))
+        self.max_pixels = int(app.config.get('IMAGE_MAX_PIXELS', 40_000_000))
+        self.stale_after = int(app.config.get('IMAGE_STALE_SECONDS', 300))
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        app.extensions['image_pipeline'] = self
+        try:
+            from PIL import Image
+            # Pillow warns above this and raises DecompressionBombError above twice it
+            Image.MAX_IMAGE_PIXELS = self.max_pixels
+        except ImportError:
+            pass
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, kind, fn, *args):
+        """
+        Run fn(*args) inside an app context on the pool, or right here when
+        the pool is disabled or full. `kind` labels the job in metrics.
+
+        Returns:
+            True if the job was queued, False if it already ran inline
+        """
+        if self.workers > 0 and self._slots.acquire(blocking=False):
+            app = current_app._get_current_object()
+            try:
+                self._get_executor().submit(self._run, app, kind, fn, args)
+                return True
+            except RuntimeError:
+                # Interpreter shutting down
+                self._slots.release()
+        with self._lock:
+            self.inline += 1
+        self._call(kind, fn, args)
+        return False
+
+    def _run(self, app, kind, fn, args):
+        try:
+            with app.app_context():
+                self._call(kind, fn, args)
+        finally:
+            self._slots.release()
+
+    def _call(self, kind, fn, args):
+        from utils.metrics import metrics
+
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            fn(*args)
+            outcome = 'ok'
+        except Exception as e:
+            logger.error(f"Image job {kind} failed: {e}")
+        finally:
+            with self._lock:
+                if outcome == 'ok':
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            if metrics.enabled:
+                metrics.registry.observe('gecr_upload_processing_seconds', time.perf_counter() - started,
+                                         (kind, outcome))
+
+    def pending(self):
+        """Jobs queued or running in this process"""
+        # BoundedSemaphore keeps its counter in _value; there is no public accessor
+        return self.queue_size - self._slots._value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'pending': self.pending(),
+                'processed': self.processed,
+                'failed': self.failed,
+                'inline': self.inline,
+            }
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,387 @@
+"""
+Import Job Handlers
+The Excel/CSV imports behind the upload endpoints, run as import jobs
+(see utils.jobs). Each handler re-reads the uploaded file on every attempt,
+skips the chunks an earlier attempt committed and returns the summary the
+endpoint used to answer with; anything left pending (activity log entries)
+commits together with the job's final status.
+"""
+
+import pandas as pd
+from flask import current_app
+
+from database import db
+from models.gecr_models import Activity, Student, StudentEnrollment, Subject
+from utils.attendance_writer import bulk_upsert_attendance, chunked, MAX_STATEMENT_PARAMS, VALID_STATUSES
+from utils.jobs import import_jobs, JobError
+from utils.sheet_parser import read_frame, text_values
+
+
+@import_jobs.handler('students')
+def import_students_job(ctx):
+    """Students sheet (utils.student_parser format) -> students and their welcome notifications"""
+    from utils.student_parser import parse_students_excel
+    from utils.student_import import import_students
+
+    ctx.progress('parsing', force=True)
+    parsed = parse_students_excel(ctx.path)
+    if parsed['errors']:
+        raise JobError('Errors found in Excel file', details=parsed['errors'])
+    students_data = parsed.get('students', [])
+    if not students_data:
+        raise JobError('No student records found in Excel file')
+
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0)
+    total = len(students_data)
+    state = ctx.state or {'created': [], 'skipped': []}
+    for index, batch in enumerate(chunked(students_data, ctx.chunk_rows)):
+        if ctx.skip(index):
+            continue
+        start = index * ctx.chunk_rows
+        ctx.progress('importing', start, total, force=True)
+        for step in import_students(batch, workers, commit=False):
+            if step['stage'] == 'hashing' and step['total']:
+                # Hashing is most of the work; nothing of this chunk is pending yet
+                ctx.progress('importing', start + len(batch) * step['done'] // step['total'], total)
+            elif step['stage'] == 'done':
+                state['created'].extend(step['result']['created'])
+                state['skipped'].extend(step['result']['skipped'])
+        ctx.checkpoint(state, done=start + len(batch))
+
+    db.session.add(Activity(
+        type='student_upload',
+        title='Students uploaded from Excel',
+        details=f"Created {len(state['created'])} students, Skipped {len(state['skipped'])}, Errors 0",
+        created_by=ctx.owner_id
+    ))
+    return {
+        'message': 'Students upload completed',
+        'created': len(state['created']),
+        'skipped': len(state['skipped']),
+        'errors': 0,
+        'students': state['created'],
+        'skipped_details': state['skipped'],
+        'error_details': []
+    }
+
+
+@import_jobs.handler('attendance_excel')
+def import_attendance_excel_job(ctx):
+    """
+    Wide attendance sheet (Roll No, then one column per date) for
+    params['subject_id'], streamed in chunks of IMPORT_JOB_CHUNK_ROWS rows
+    """
+    from utils.excel_parser import stream_attendance_excel
+
+    subject_id = ctx.params['subject_id']
+    subject = db.session.get(Subject, subject_id)
+    if subject is None:
+        raise JobError('Subject not found')
+
+    ctx.progress('parsing', force=True)
+    parsed = stream_attendance_excel(ctx.path, batch_size=ctx.chunk_rows)
+    if parsed['errors']:
+        raise JobError('Errors found in Excel file', details=parsed['errors'],
+                       dates_found=[d.strftime('%Y-%m-%d') for d in parsed.get('dates', [])])
+
+    state = ctx.state or {'records': 0, 'inserted': 0, 'updated': 0, 'skipped': 0,
+                          'not_enrolled': [], 'students': []}
+    # roll_no -> student_id for enrolled students, None when unknown or not enrolled
+    students_dict = {}
+    reported = set(state['not_enrolled'])
+    enrolled_ids = set(state['students'])
+    try:
+        for index, batch in enumerate(parsed['batches']):
+            if ctx.skip(index):
+                continue
+            ctx.progress('importing', state['records'], force=True)
+
+            # Resolve roll numbers first seen in this batch in bulk
+            errors = []
+            new_rolls = list({roll_no for roll_no, _, _ in batch if roll_no not in students_dict})
+            for roll_batch in chunked(new_rolls, MAX_STATEMENT_PARAMS):
+                found = dict(db.session.query(Student.roll_no, Student.student_id).filter(
+                    Student.roll_no.in_(roll_batch)
+                ).all())
+                enrolled = {
+                    row.student_id for row in db.session.query(StudentEnrollment.student_id).filter(
+                        StudentEnrollment.subject_id == subject_id,
+                        StudentEnrollment.status == 'active',
+                        StudentEnrollment.student_id.in_(list(found.values()))
+                    ).all()
+                } if found else set()
+
+                for roll_no in sorted(roll_batch):
+                    student_id = found.get(roll_no)
+                    if student_id is None:
+                        current_app.logger.warning(f"Student with roll number {roll_no} not found")
+                        errors.append(f'Roll No {roll_no}: Student not found')
+                    elif student_id not in enrolled:
+                        current_app.logger.warning(f"Student {roll_no} not enrolled in subject {subject_id}")
+                        if roll_no not in reported:
+                            reported.add(roll_no)
+                            state['not_enrolled'].append(roll_no)
+                            errors.append(f'Roll No {roll_no}: Not enrolled in {subject.subject_name}')
+                        student_id = None
+                    elif student_id not in enrolled_ids:
+                        enrolled_ids.add(student_id)
+                        state['students'].append(student_id)
+                    students_dict[roll_no] = student_id
+
+            records = []
+            for roll_no, attendance_date, status in batch:
+                student_id = students_dict[roll_no]
+                if student_id is None:
+                    state['skipped'] += 1
+                else:
+                    records.append((student_id, attendance_date, status))
+
+            counts = bulk_upsert_attendance(subject_id, records)
+            state['records'] += len(batch)
+            state['inserted'] += counts['inserted']
+            state['updated'] += counts['updated']
+            ctx.add_errors(errors)
+            ctx.checkpoint(state, done=state['records'])
+    finally:
+        # Release the workbook before the file is removed
+        parsed['batches'].close()
+
+    if not state['records']:
+        raise JobError('No attendance records found in Excel file')
+
+    dates = [d.strftime('%Y-%m-%d') for d in parsed['dates']]
+    db.session.add(Activity(
+        type='attendance_upload',
+        title=f'Attendance uploaded for subject {subject_id}',
+        details=f"Uploaded {state['inserted']} records for dates: {', '.join(dates)}",
+        created_by=ctx.owner_id
+    ))
+    return {
+        'message': 'Attendance uploaded successfully',
+        'records_inserted': state['inserted'],
+        'records_updated': state['updated'],
+        'records_skipped': state['skipped'],
+        'not_enrolled': len(state['not_enrolled']),
+        'not_enrolled_students': state['not_enrolled'],
+        'dates': dates,
+        'total_students': len(state['students']),
+        'subject_id': subject_id,
+        'subject_name': subject.subject_name
+    }
+
+
+@import_jobs.handler('attendance_sheet')
+def import_attendance_sheet_job(ctx):
+    """
+    Long attendance sheet (student_id or roll_no, subject_id or
+    subject_name, date, status per row) for subjects the owner teaches.
+    Rows are validated column-wise up front, then written in chunks.
+    """
+    ctx.progress('parsing', force=True)
+    try:
+        df = read_frame(ctx.path)
+    except Exception as e:
+        raise JobError(f'Failed to read Excel file: {str(e)}')
+
+    # Validate required columns
+    required_cols = ['date', 'status']
+    if not all(col in df.columns for col in required_cols):
+        raise JobError(f'Excel must contain columns: {", ".join(required_cols)}, and either student_id/roll_no and subject_id/subject_name')
+    if 'student_id' not in df.columns and 'roll_no' not in df.columns:
+        raise JobError('Excel must contain either student_id or roll_no column')
+    if 'subject_id' not in df.columns and 'subject_name' not in df.columns:
+        raise JobError('Excel must contain either subject_id or subject_name column')
+
+    faculty_id = ctx.owner_id
+    row_errors = {}
+
+    def flag_rows(mask, message):
+        """Record the first error for each row selected by mask"""
+        for index in df.index[mask]:
+            if index not in row_errors:
+                row_errors[index] = message(index)
+
+    # Resolve students: one IN query for student ids and one for roll numbers
+    student_ids = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    if 'student_id' in df.columns:
+        id_col = pd.to_numeric(df['student_id'], errors='coerce')
+        has_id = id_col.notna()
+        requested = id_col[has_id].astype(int)
+        known_ids = set()
+        for batch in chunked(requested.unique().tolist(), MAX_STATEMENT_PARAMS):
+            known_ids.update(row.student_id for row in db.session.query(Student.student_id).filter(
+                Student.student_id.in_(batch)
+            ))
+        student_ids[has_id] = requested.where(requested.isin(known_ids))
+    else:
+        has_id = pd.Series(False, index=df.index)
+
+    has_roll = pd.Series(False, index=df.index)
+    if 'roll_no' in df.columns:
+        has_roll = ~has_id & df['roll_no'].notna()
+        roll_col = text_values(df.loc[has_roll, 'roll_no'])
+        roll_map = {}
+        for batch in chunked(roll_col.unique().tolist(), MAX_STATEMENT_PARAMS):
+            roll_map.update(db.session.query(Student.roll_no, Student.student_id).filter(
+                Student.roll_no.in_(batch)
+            ).all())
+        student_ids[has_roll] = roll_col.map(roll_map).astype('Int64')
+
+    flag_rows(~has_id & ~has_roll, lambda i: f'Row {i + 2}: No valid student identifier')
+    flag_rows(student_ids.isna(), lambda i: f'Row {i + 2}: Student not found')
+
+    # Resolve subjects: one IN query for subject ids and one for subject names
+    subjects_by_id = {}
+    subject_ids = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    if 'subject_id' in df.columns:
+        sid_col = pd.to_numeric(df['subject_id'], errors='coerce')
+        has_sid = sid_col.notna()
+        requested = sid_col[has_sid].astype(int)
+        for batch in chunked(requested.unique().tolist(), MAX_STATEMENT_PARAMS):
+            subjects_by_id.update((s.subject_id, s) for s in Subject.query.filter(Subject.subject_id.in_(batch)))
+        subject_ids[has_sid] = requested.where(requested.isin(list(subjects_by_id)))
+    else:
+        has_sid = pd.Series(False, index=df.index)
+
+    has_sname = pd.Series(False, index=df.index)
+    if 'subject_name' in df.columns:
+        has_sname = ~has_sid & df['subject_name'].notna()
+        name_col = df.loc[has_sname, 'subject_name'].astype(str)
+        subjects_by_name = {}
+        for batch in chunked(name_col.unique().tolist(), MAX_STATEMENT_PARAMS):
+            # Keep the first match per name, like query.filter_by(...).first()
+            for s in Subject.query.filter(Subject.subject_name.in_(batch)).order_by(Subject.subject_id):
+                subjects_by_name.setdefault(s.subject_name, s)
+        subjects_by_id.update((s.subject_id, s) for s in subjects_by_name.values())
+        subject_ids[has_sname] = name_col.map(
+            {name: s.subject_id for name, s in subjects_by_name.items()}
+        ).astype('Int64')
+
+    flag_rows(~has_sid & ~has_sname, lambda i: f'Row {i + 2}: No valid subject identifier')
+    flag_rows(subject_ids.isna(), lambda i: f'Row {i + 2}: Subject not found')
+
+    # Verify faculty teaches each subject
+    owned_ids = {sid for sid, s in subjects_by_id.items() if s.faculty_id == faculty_id}
+    not_owned = subject_ids.notna() & ~subject_ids.isin(owned_ids)
+    flag_rows(not_owned, lambda i: f'Row {i + 2}: You are not authorized to mark attendance for {subjects_by_id[int(subject_ids[i])].subject_name}')
+
+    # Validate dates and statuses column-wise
+    dates = pd.to_datetime(df['date'], errors='coerce', format='ISO8601')
+    flag_rows(dates.isna(), lambda i: f'Row {i + 2}: Invalid date')
+
+    statuses = text_values(df['status']).str.capitalize()
+    flag_rows(~statuses.isin(VALID_STATUSES), lambda i: f'Row {i + 2}: Invalid status "{statuses[i]}". Must be Present, Absent, or Late')
+
+    valid = ~df.index.isin(list(row_errors.keys()))
+    sheet = pd.DataFrame({
+        'student_id': student_ids[valid].astype(int),
+        'subject_id': subject_ids[valid].astype(int),
+        'date': dates[valid].dt.date,
+        'status': statuses[valid]
+    })
+    errors = [row_errors[index] for index in sorted(row_errors)]
+    if not ctx.chunks_done:
+        # Saved with the first chunk (or the final status when no row is valid)
+        ctx.add_errors(errors)
+
+    # Write the valid rows a chunk at a time, one bulk upsert per subject within each
+    state = ctx.state or {'inserted': 0, 'updated': 0}
+    total = len(sheet)
+    for index, start in enumerate(range(0, total, ctx.chunk_rows)):
+        if ctx.skip(index):
+            continue
+        ctx.progress('importing', start, total, force=True)
+        for subject_id, group in sheet.iloc[start:start + ctx.chunk_rows].groupby('subject_id'):
+            result = bulk_upsert_attendance(
+                int(subject_id),
+                zip(group['student_id'].tolist(), group['date'].tolist(), group['status'].tolist())
+            )
+            state['inserted'] += result['inserted']
+            state['updated'] += result['updated']
+        ctx.checkpoint(state, done=min(total, start + ctx.chunk_rows))
+
+    return {
+        'success': True,
+        'message': 'Attendance upload completed',
+        'inserted': state['inserted'],
+        'updated': state['updated'],
+        'errors': len(errors),
+        'error_details': errors if errors else None
+    }
+
+
+@import_jobs.handler('enrollments')
+def import_enrollments_job(ctx):
+    """
+    Enrollment or roll numbers (Excel or CSV) -> active enrollments in
+    params['subject_id'], reconciled as a set diff (utils.enrollment_sync).
+    params['drop_missing'] also drops active students missing from the
+    file; params['dry_run'] only reports the diff. The changes commit
+    together as the job's single chunk.
+    """
+    from utils.enrollment_sync import diff_roster, apply_roster_diff
+
+    subject_id = ctx.params['subject_id']
+    drop_missing = bool(ctx.params.get('drop_missing'))
+    dry_run = bool(ctx.params.get('dry_run'))
+    if ctx.skip(0):
+        # An earlier attempt committed the changes; its summary was saved with them
+        return ctx.state
+
+    ctx.progress('parsing', force=True)
+    try:
+        df = read_frame(ctx.path)
+    except Exception as e:
+        raise JobError(f'Failed to read file: {str(e)}')
+
+    # Validate required columns
+    enrollment_col = None
+    for col in df.columns:
+        col_lower = str(col).lower().strip()
+        if col_lower in ['enrollment_no', 'enrollment', 'enroll_no', 'roll_no', 'rollno', 'roll no']:
+            enrollment_col = col
+            break
+
+    if not enrollment_col:
+        raise JobError('File must contain an "enrollment_no" or "roll_no" column')
+
+    values = [value for value in text_values(df[enrollment_col]).tolist() if value and value.lower() != 'nan']
+    if not values:
+        raise JobError('No enrollment numbers found in file')
+
+    ctx.progress('reconciling', 0, len(values), force=True)
+    diff = diff_roster(subject_id, values, drop_missing)
+    if drop_missing and not (diff['add'] or diff['reactivate'] or diff['unchanged']):
+        # Syncing to a roster of unknown students would drop the whole subject
+        raise JobError('None of the students in the file were found; nothing was changed',
+                       not_found=diff['not_found'])
+    ctx.add_errors([f'{enrollment_no}: student not found' for enrollment_no in diff['not_found']])
+
+    students = diff['students']
+    changes = {
+        key: [{'student_id': student_id, 'roll_no': students[student_id][0], 'name': students[student_id][1]}
+              for student_id in diff[key]]
+        for key in ('add', 'reactivate', 'drop')
+    }
+    if dry_run:
+        counts = {'added': len(diff['add']), 'reactivated': len(diff['reactivate']), 'dropped': len(diff['drop'])}
+    else:
+        counts = apply_roster_diff(subject_id, diff, faculty_id=ctx.owner_id)
+
+    added = counts['added'] + counts['reactivated']
+    summary = {
+        'success': True,
+        'dry_run': dry_run,
+        'drop_missing': drop_missing,
+        'added': added,
+        'reactivated': counts['reactivated'],
+        'dropped': counts['dropped'],
+        'skipped': len(diff['unchanged']),
+        'not_found': diff['not_found'],
+        'changes': changes,
+        'message': (f"Would add {added} and drop {counts['dropped']} students" if dry_run
+                    else f"Successfully added {added} students"
+                    + (f" and dropped {counts['dropped']}" if drop_missing else ''))
+    }
+    ctx.checkpoint(summary, done=len(values))
+    return summary
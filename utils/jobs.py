@@ -0,0 +1,385 @@
+"""
+Import Jobs
+Runs imports of uploaded sheets in the background and records their
+progress in the import_jobs table. Handlers work through their input in
+chunks; each chunk's rows commit together with the job's checkpoint, so a
+job picked up again after a worker restart resumes at the first chunk
+that was not committed.
+"""
+
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from database import db
+from models.gecr_models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes to the job row
+PROGRESS_INTERVAL = 1.0
+
+
+class JobError(Exception):
+    """An import that cannot go ahead (unreadable file, no rows); the job fails with `details` as its result"""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class JobLost(Exception):
+    """Another worker took the job over after this one stopped sending heartbeats"""
+
+
+class JobContext:
+    """A running job as its handler sees it: parameters, the uploaded file, where to resume, checkpoints"""
+
+    def __init__(self, queue, job, worker):
+        self.job_id = job.job_id
+        self.kind = job.kind
+        self.owner_type = job.owner_type
+        self.owner_id = job.owner_id
+        self.params = job.params or {}
+        self.path = job.file_path
+        self.chunk_rows = queue.chunk_rows
+        # Chunks committed by earlier attempts and the state saved with the last of them (None on a fresh start)
+        self.chunks_done = job.chunks_done
+        self.state = job.state
+        self._max_errors = queue.max_errors
+        self._errors = list(job.errors or [])
+        self._error_count = job.error_count
+        self._new_errors = []
+        self._worker = worker
+        self._last_progress = 0.0
+
+    def skip(self, index):
+        """True for chunks an earlier attempt already committed"""
+        return index < self.chunks_done
+
+    def add_errors(self, errors):
+        """Per-row error messages found in the current chunk; saved with its checkpoint"""
+        self._new_errors.extend(errors)
+
+    def _take_errors(self):
+        if not self._new_errors:
+            return {}
+        self._error_count += len(self._new_errors)
+        self._errors.extend(self._new_errors[:max(0, self._max_errors - len(self._errors))])
+        self._new_errors = []
+        return {'errors': list(self._errors), 'error_count': self._error_count}
+
+    def _update(self, **values):
+        """UPDATE the job row if this worker still owns it (the caller commits)"""
+        values['heartbeat_at'] = datetime.utcnow()
+        owned = db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.job_id == self.job_id, ImportJob.worker == self._worker,
+                   ImportJob.status == 'running')
+            .values(**values)
+        ).rowcount
+        if not owned:
+            db.session.rollback()
+            raise JobLost(self.job_id)
+
+    def progress(self, stage, done=None, total=None, force=False):
+        """
+        Report progress and refresh the heartbeat, at most once per
+        PROGRESS_INTERVAL unless `force`. Commits, so only call it with
+        nothing of the current chunk pending in the session.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        values = {'stage': stage}
+        if done is not None:
+            values['done'] = done
+        if total is not None:
+            values['total'] = total
+        self._update(**values)
+        db.session.commit()
+
+    def checkpoint(self, state, done=None):
+        """
+        Finish the current chunk: commits its pending rows together with
+        `state` (JSON, handed back as ctx.state if the job is resumed) and
+        the chunk's errors
+        """
+        values = {'chunks_done': self.chunks_done + 1, 'state': state, **self._take_errors()}
+        if done is not None:
+            values['done'] = done
+        self._update(**values)
+        db.session.commit()
+        self.chunks_done += 1
+        self.state = state
+        self._last_progress = time.monotonic()
+
+    def finish(self, status, result=None, error=None):
+        self._update(status=status, stage=status, result=result, error=error, finished_at=datetime.utcnow(),
+                     **self._take_errors())
+        db.session.commit()
+
+
+class ImportJobQueue:
+    """
+    Runs import jobs on a thread pool in each process (the work is mostly
+    SQLite I/O, pandas parsing and PBKDF2, which release the GIL).
+
+    Configure with IMPORT_JOB_WORKERS (threads per process; 0 runs the job
+    inside the upload request), IMPORT_JOB_CHUNK_ROWS (rows per committed
+    chunk), IMPORT_JOB_STALE_SECONDS (a queued or running job whose
+    heartbeat is older than this is resumed by another worker),
+    IMPORT_JOB_MAX_ATTEMPTS and IMPORT_JOB_MAX_ERRORS (per-row errors kept
+    on the job). The pool is created on first use in each process, so it is
+    safe with gunicorn --preload. Each process that serves requests also
+    runs a sweeper thread, started by its first request, that resumes stale
+    jobs then and every IMPORT_JOB_STALE_SECONDS, so jobs a stopped process
+    left behind are picked up without their owner polling them. Uploaded
+    sheets (which may hold passwords) are kept in FILE_STORE_FOLDER/jobs,
+    outside the publicly served UPLOAD_FOLDER.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 2
+        self.chunk_rows = 500
+        self.stale_seconds = 120
+        self.max_attempts = 3
+        self.max_errors = 1000
+        self.handlers = {}
+        self.succeeded = 0
+        self.failed = 0
+        self.resumed = 0
+        self._active = set()  # job ids queued or running in this process
+        self._executor = None
+        self._pid = None
+        self._sweeper_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = int(app.config.get('IMPORT_JOB_WORKERS', 2))
+        self.chunk_rows = max(1, int(app.config.get('IMPORT_JOB_CHUNK_ROWS', 500)))
+        self.stale_seconds = int(app.config.get('IMPORT_JOB_STALE_SECONDS', 120))
+        self.max_attempts = max(1, int(app.config.get('IMPORT_JOB_MAX_ATTEMPTS', 3)))
+        self.max_errors = int(app.config.get('IMPORT_JOB_MAX_ERRORS', 1000))
+        app.extensions['import_jobs'] = self
+        app.before_request(self._ensure_sweeper)
+
+    def handler(self, kind):
+        """Decorator registering fn(ctx) -> result dict as the handler for `kind` jobs"""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def start(self, kind, owner_type, owner_id, file, params=None):
+        """
+        Save an uploaded file (a FileStorage) and queue a `kind` job for it.
+        Commits.
+
+        Returns:
+            (ImportJob, queued); queued is False when the job already ran here
+        """
+        from utils.file_store import store_dir
+
+        job_id = secrets.token_hex(16)
+        filename = secure_filename(file.filename or '') or 'upload'
+        directory = os.path.join(store_dir(), 'jobs')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, job_id + os.path.splitext(filename)[1].lower())
+        file.save(path)
+
+        job = ImportJob(job_id=job_id, kind=kind, owner_type=owner_type, owner_id=owner_id, filename=filename,
+                        file_path=path, params=params or {}, status='queued')
+        db.session.add(job)
+        db.session.commit()
+        return job, self.submit(job_id)
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-job')
+                self._pid = os.getpid()
+                self._active = set()
+            return self._executor
+
+    def _ensure_sweeper(self):
+        """before_request hook: start this process's sweeper thread on its first request"""
+        if self.workers <= 0 or self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+        app = current_app._get_current_object()
+        threading.Thread(target=self._sweep, args=(app,), name='import-job-sweeper', daemon=True).start()
+
+    def _sweep(self, app):
+        while True:
+            self._recover(app)
+            time.sleep(max(1, self.stale_seconds))
+
+    def submit(self, job_id):
+        """
+        Run a job on the pool, or right here when the pool is disabled.
+
+        Returns:
+            True if the job was queued, False if it already ran inline
+        """
+        if self.workers > 0:
+            app = current_app._get_current_object()
+            with self._lock:
+                if job_id in self._active:
+                    return True
+                self._active.add(job_id)
+            try:
+                self._get_executor(app).submit(self._run, app, job_id)
+                return True
+            except RuntimeError:
+                # Interpreter shutting down
+                with self._lock:
+                    self._active.discard(job_id)
+        self.execute(job_id)
+        return False
+
+    def _run(self, app, job_id):
+        try:
+            with app.app_context():
+                self.execute(job_id)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _recover(self, app):
+        try:
+            with app.app_context():
+                self.resume_stale()
+        except Exception as e:
+            logger.error(f"Resuming import jobs failed: {e}")
+
+    def execute(self, job_id):
+        """Claim the job (unless another worker holds it) and run its handler to the end"""
+        from utils.metrics import metrics
+
+        worker = f'{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}'
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.job_id == job_id, ImportJob.attempts < self.max_attempts,
+                   db.or_(ImportJob.status == 'queued',
+                          db.and_(ImportJob.status == 'running',
+                                  ImportJob.heartbeat_at < now - timedelta(seconds=self.stale_seconds))))
+            .values(status='running', worker=worker, heartbeat_at=now, attempts=ImportJob.attempts + 1,
+                    started_at=db.func.coalesce(ImportJob.started_at, now))
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(ImportJob, job_id)
+        if job.attempts > 1:
+            with self._lock:
+                self.resumed += 1
+            logger.info(f"Resuming import job {job_id} ({job.kind}) after {job.chunks_done} chunks")
+        ctx = JobContext(self, job, worker)
+        handler = self.handlers.get(job.kind)
+
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            try:
+                if handler is None:
+                    raise JobError(f'Unknown import kind {job.kind}')
+                outcome_values = {'status': 'succeeded', 'result': handler(ctx)}
+                outcome = 'ok'
+            except JobLost:
+                raise
+            except JobError as e:
+                db.session.rollback()
+                outcome_values = {'status': 'failed', 'error': str(e), 'result': e.details or None}
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Import job {job_id} ({ctx.kind}) failed: {e}")
+                outcome_values = {'status': 'failed', 'error': f'Import failed: {e}'}
+            ctx.finish(**outcome_values)
+        except JobLost:
+            db.session.rollback()
+            logger.warning(f"Import job {job_id} was taken over by another worker")
+            return
+        finally:
+            if metrics.enabled:
+                metrics.registry.observe('gecr_upload_processing_seconds', time.perf_counter() - started,
+                                         (f'{ctx.kind}_job', outcome))
+
+        with self._lock:
+            if outcome == 'ok':
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        _remove(ctx.path)
+
+    def is_stale(self, job):
+        return job.status in ('queued', 'running') and job.heartbeat_at is not None and \
+            job.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+
+    def resume_stale(self):
+        """
+        Queue jobs whose worker stopped sending heartbeats (restarted or
+        killed), failing those that used up IMPORT_JOB_MAX_ATTEMPTS.
+
+        Returns:
+            Number of jobs queued again
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        stale = db.session.query(ImportJob.job_id, ImportJob.attempts, ImportJob.file_path).filter(
+            ImportJob.status.in_(('queued', 'running')), ImportJob.heartbeat_at < cutoff
+        ).all()
+        db.session.commit()
+
+        resumed = 0
+        for job_id, attempts, path in stale:
+            if attempts < self.max_attempts:
+                self.submit(job_id)
+                resumed += 1
+                continue
+            gave_up = db.session.execute(
+                db.update(ImportJob)
+                .where(ImportJob.job_id == job_id, ImportJob.status.in_(('queued', 'running')),
+                       ImportJob.heartbeat_at < cutoff)
+                .values(status='failed', stage='failed', finished_at=datetime.utcnow(),
+                        error=f'Import stopped {attempts} times before finishing')
+            ).rowcount
+            db.session.commit()
+            if gave_up:
+                _remove(path)
+        return resumed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'active': len(self._active),
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'resumed': self.resumed,
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except (OSError, TypeError):
+        pass
+
+
+import_jobs = ImportJobQueue()
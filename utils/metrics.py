@@ -0,0 +1,391 @@
+"""
+Metrics
+Prometheus text-format metrics: request latency histograms per endpoint,
+in-flight requests, DB connection checkout time, cache and notification
+counters and upload processing time, served at /metrics
+"""
+
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Registry:
+    """
+    Counters, gauges and histograms of one process, keyed by metric name and
+    label values. snapshot() returns them as plain data so samples from
+    several processes can be merged.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, kind, help_text, labelnames=(), buckets=None):
+        with self._lock:
+            self._metrics.setdefault(name, {
+                'type': kind, 'help': help_text, 'labels': list(labelnames),
+                'buckets': list(buckets) if buckets else None, 'samples': {}
+            })
+
+    def inc(self, name, labels=(), amount=1):
+        metric = self._metrics[name]
+        with self._lock:
+            metric['samples'][labels] = metric['samples'].get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        metric = self._metrics[name]
+        buckets = metric['buckets']
+        with self._lock:
+            sample = metric['samples'].get(labels)
+            if sample is None:
+                # per-bucket counts (cumulated on export), then sum and count
+                sample = metric['samples'][labels] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    sample[index] += 1
+                    break
+            sample[-2] += value
+            sample[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**{k: v for k, v in metric.items() if k != 'samples'},
+                       'samples': [[list(labels), value if not isinstance(value, list) else list(value)]
+                                   for labels, value in metric['samples'].items()]}
+                for name, metric in self._metrics.items()
+            }
+
+
+class Metrics:
+    """
+    Collects request/DB/upload metrics and serves them at /metrics.
+
+    Configure with METRICS_ENABLED, METRICS_TOKEN (require
+    "Authorization: Bearer <token>" to scrape) and METRICS_DIR. Without
+    METRICS_DIR each process reports only itself; under gunicorn -w N set it
+    to a directory shared by the workers (cleared on deploy): each worker
+    writes its samples there at most every METRICS_FLUSH_INTERVAL seconds
+    and a scrape of any worker merges all of them. Gauges of workers that
+    have exited are dropped; their counters are kept.
+    """
+
+    def __init__(self, app=None):
+        self.registry = Registry()
+        self.enabled = False
+        self.directory = None
+        self.token = None
+        self.flush_interval = 1.0
+        self._last_flush = 0.0
+        self._collectors = []
+        self._register_metrics()
+        if app is not None:
+            self.init_app(app)
+
+    def _register_metrics(self):
+        registry = self.registry
+        registry.register('gecr_http_requests_total', 'counter', 'HTTP requests served',
+                          ('blueprint', 'endpoint', 'method', 'status'))
+        registry.register('gecr_http_request_duration_seconds', 'histogram',
+                          'Request latency including streamed bodies', ('blueprint', 'endpoint'), LATENCY_BUCKETS)
+        registry.register('gecr_http_requests_in_flight', 'gauge', 'Requests being served')
+        registry.register('gecr_db_connection_checkout_seconds', 'histogram',
+                          'Time to get a connection from the pool (includes opening a new one)',
+                          ('bind',), CHECKOUT_BUCKETS)
+        registry.register('gecr_upload_processing_seconds', 'histogram',
+                          'Time spent handling an uploaded file', ('kind', 'outcome'), UPLOAD_BUCKETS)
+        registry.register('gecr_upload_bytes_total', 'counter',
+                          'Upload bytes: received from clients, stored as new content, or deduplicated', ('kind',))
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+        self.directory = app.config.get('METRICS_DIR')
+        self.token = app.config.get('METRICS_TOKEN')
+        self.flush_interval = float(app.config.get('METRICS_FLUSH_INTERVAL', 1.0))
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        from database import db
+        with app.app_context():
+            engines = {bind_key or 'default': engine for bind_key, engine in db.engines.items()}
+        for bind, engine in engines.items():
+            _time_checkouts(engine, bind, self.registry)
+        if not self._collectors:
+            self.add_collector(lambda: _pool_samples(engines))
+            self.add_collector(_dashboard_cache_samples)
+            self.add_collector(_notification_stream_samples)
+            self.add_collector(_image_pipeline_samples)
+            self.add_collector(_import_job_samples)
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def add_collector(self, collect):
+        """
+        Register a callable returning [(name, type, help, labels dict, value)]
+        read at scrape (or flush) time, for stats kept elsewhere
+        """
+        self._collectors.append(collect)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        self.registry.inc('gecr_http_requests_in_flight')
+
+    def _record_status(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        blueprint = request.blueprint or 'app'
+        endpoint = request.endpoint or 'unmatched'
+        status = str(g.pop('metrics_status', 500))
+        self.registry.inc('gecr_http_requests_in_flight', amount=-1)
+        self.registry.inc('gecr_http_requests_total', (blueprint, endpoint, request.method, status))
+        self.registry.observe('gecr_http_request_duration_seconds', time.perf_counter() - started,
+                              (blueprint, endpoint))
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def time_upload(self, kind):
+        """Decorator recording how long a view spends on an upload, by kind and ok/error outcome"""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = f(*args, **kwargs)
+                    outcome = 'ok' if _status_code(result) < 400 else 'error'
+                    return result
+                finally:
+                    if self.enabled:
+                        self.registry.observe('gecr_upload_processing_seconds', time.perf_counter() - started,
+                                              (kind, outcome))
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """This process's samples plus the collectors' current values"""
+        snapshot = self.registry.snapshot()
+        for collect in self._collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                metric = snapshot.setdefault(name, {'type': kind, 'help': help_text,
+                                                    'labels': list(labels), 'buckets': None, 'samples': []})
+                metric['samples'].append([list(labels.values()), value])
+        return snapshot
+
+    def flush(self):
+        """Write this worker's snapshot to METRICS_DIR (atomically, replacing its previous one)"""
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f'metrics_{os.getpid()}.json')
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Metrics flush failed: {e}")
+
+    def collect_all(self):
+        """Snapshots of every worker (just this process without METRICS_DIR), merged"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            _merge(merged, snapshot, include_gauges=_pid_alive(pid))
+        return merged
+
+    def render(self):
+        """GET /metrics in the Prometheus text exposition format"""
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        try:
+            body = render_text(self.collect_all())
+        except Exception as e:
+            current_app.logger.error(f"Metrics export failed: {e}")
+            return Response('Metrics unavailable\n', status=500, mimetype='text/plain')
+        return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def _status_code(result):
+    """Status of a view's return value (Response, (body, status) tuple or plain body)"""
+    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+        return result[1]
+    return getattr(result, 'status_code', 200)
+
+
+def _time_checkouts(engine, bind, registry):
+    """Wrap engine.raw_connection() (which every Connection goes through) to time pool checkouts"""
+    if getattr(engine, 'metrics_timed', False):
+        return
+    raw_connection = engine.raw_connection
+
+    @wraps(raw_connection)
+    def timed_raw_connection(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            registry.observe('gecr_db_connection_checkout_seconds', time.perf_counter() - started, (bind,))
+
+    engine.raw_connection = timed_raw_connection
+    engine.metrics_timed = True
+
+
+def _pool_samples(engines):
+    samples = []
+    for bind, engine in engines.items():
+        pool = engine.pool
+        for name, method, help_text in (
+            ('gecr_db_pool_size', 'size', 'Connections the pool keeps open'),
+            ('gecr_db_pool_checked_out', 'checkedout', 'Connections currently in use'),
+            ('gecr_db_pool_overflow', 'overflow', 'Connections opened beyond the pool size'),
+        ):
+            if hasattr(pool, method):
+                # QueuePool.overflow() counts down from -pool_size until the pool is full
+                samples.append((name, 'gauge', help_text, {'bind': bind}, max(0, getattr(pool, method)())))
+    return samples
+
+
+def _dashboard_cache_samples():
+    from utils.dashboard_cache import dashboard_cache
+
+    stats = dashboard_cache.stats()
+    return [
+        ('gecr_dashboard_cache_hits_total', 'counter', 'Dashboard cache hits', {}, stats['hits']),
+        ('gecr_dashboard_cache_misses_total', 'counter', 'Dashboard cache misses', {}, stats['misses']),
+        ('gecr_dashboard_cache_invalidations_total', 'counter', 'Dashboard entries dropped by writes', {},
+         stats['invalidations']),
+        ('gecr_dashboard_cache_errors_total', 'counter', 'Dashboard cache backend errors', {}, stats['errors']),
+    ]
+
+
+def _notification_stream_samples():
+    from utils.notification_stream import notification_stream
+
+    stats = notification_stream.stats()
+    samples = [('gecr_notification_events_published_total', 'counter', 'Notification events published', {},
+                stats['published'])]
+    if stats['subscribers'] is not None:
+        samples.append(('gecr_notification_streams_open', 'gauge', 'Open notification streams', {},
+                        stats['subscribers']))
+    return samples
+
+
+def _image_pipeline_samples():
+    from utils.image_pipeline import image_pipeline
+
+    stats = image_pipeline.stats()
+    return [
+        ('gecr_image_jobs_pending', 'gauge', 'Image jobs queued or running', {}, stats['pending']),
+        ('gecr_image_jobs_inline_total', 'counter', 'Image jobs run inline because the pool was off or full', {},
+         stats['inline']),
+    ]
+
+
+def _import_job_samples():
+    from utils.jobs import import_jobs
+
+    stats = import_jobs.stats()
+    return [
+        ('gecr_import_jobs_active', 'gauge', 'Import jobs queued or running in this process', {}, stats['active']),
+        ('gecr_import_jobs_resumed_total', 'counter', 'Import jobs resumed after their worker stopped', {},
+         stats['resumed']),
+    ]
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(merged, snapshot, include_gauges):
+    """Add one worker's samples into `merged`: counters and histograms sum, gauges sum over live workers"""
+    for name, metric in snapshot.items():
+        if metric['type'] == 'gauge' and not include_gauges:
+            continue
+        target = merged.setdefault(name, {**metric, 'samples': []})
+        index = {tuple(sample[0]): sample for sample in target['samples']}
+        for labels, value in metric['samples']:
+            existing = index.get(tuple(labels))
+            if existing is None:
+                sample = [labels, list(value) if isinstance(value, list) else value]
+                target['samples'].append(sample)
+                index[tuple(labels)] = sample
+            elif isinstance(value, list):
+                existing[1] = [a + b for a, b in zip(existing[1], value)]
+            else:
+                existing[1] += value
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render_text(snapshot):
+    """Prometheus text format for a (merged) snapshot"""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['samples'], key=lambda sample: [str(v) for v in sample[0]]):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(metric['labels'], labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'], value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, [('le', '+Inf')])} {value[-1]}")
+            lines.append(f"{name}_sum{_format_labels(metric['labels'], labels)} {value[-2]}")
+            lines.append(f"{name}_count{_format_labels(metric['labels'], labels)} {value[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
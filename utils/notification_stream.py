@@ -0,0 +1,260 @@
+"""
+Notification Stream
+Server-Sent Events for new notifications and unread-count changes, fed by a
+pub/sub broker that committed notification writes publish to
+"""
+
+import json
+import logging
+import queue
+import threading
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding messages to publish once the transaction commits
+_PENDING_KEY = 'pending_notification_events'
+
+# Channel every student stream listens on for audience broadcasts
+BROADCAST_CHANNEL = 'broadcast'
+
+
+class MemoryBroker:
+    """In-process pub/sub: one queue per subscription, only reaches streams served by this process"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A stalled client drops events; it resyncs on the next unread_count
+                pass
+
+    def subscribe(self, channels):
+        subscription = _MemorySubscription(self, channels, self.max_queue)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set(chain.from_iterable(self._subscribers.values())))
+
+
+class _MemorySubscription(queue.Queue):
+    def __init__(self, broker, channels, max_queue):
+        super().__init__(maxsize=max_queue)
+        self.broker = broker
+        self.channels = tuple(channels)
+
+    def get_message(self, timeout):
+        """Next message, or None after `timeout` seconds"""
+        try:
+            return self.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class RedisBroker:
+    """
+    Redis pub/sub so a write handled by one worker reaches streams held by
+    another (gunicorn -w N). Needs the optional `redis` package.
+    """
+
+    def __init__(self, url, prefix='gecr:notifications:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("NOTIFICATION_STREAM_URL is set but the 'redis' package is not installed (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message, default=str))
+
+    def subscribe(self, channels):
+        return _RedisSubscription(self.client.pubsub(ignore_subscribe_messages=True),
+                                  [self.prefix + channel for channel in channels])
+
+    def subscriber_count(self):
+        return None
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub, channels):
+        self.pubsub = pubsub
+        self.pubsub.subscribe(*channels)
+
+    def get_message(self, timeout):
+        message = self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    def close(self):
+        self.pubsub.close()
+
+
+class NotificationStream:
+    """
+    Publishes notification events after commit and serves them as SSE.
+
+    Configure with NOTIFICATION_STREAM_URL (redis://... to share events
+    between workers; in-process when unset) and NOTIFICATION_STREAM_HEARTBEAT
+    (seconds between keep-alive comments on an idle stream).
+    """
+
+    def __init__(self, app=None):
+        self.broker = None
+        self.heartbeat = 15
+        self.published = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('NOTIFICATION_STREAM_URL')
+        self.broker = RedisBroker(url) if url else MemoryBroker()
+        self.heartbeat = int(app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15))
+        _register_session_hooks()
+        app.extensions['notification_stream'] = self
+
+    @staticmethod
+    def channel(user_type, user_id):
+        return f'{user_type}:{user_id}'
+
+    def publish_after_commit(self, session, channel, message):
+        """Queue a message for `channel`; it is published only if `session` commits"""
+        if self.broker is None:
+            return
+        session.info.setdefault(_PENDING_KEY, []).append((channel, message))
+
+    def mark_changed(self, session, user_type, user_id):
+        """Tell a user's streams to refresh the unread count after commit (for bulk read updates)"""
+        self.publish_after_commit(session, self.channel(user_type, user_id), {'event': 'changed'})
+
+    def publish(self, channel, message):
+        try:
+            self.broker.publish(channel, message)
+            self.published += 1
+        except Exception as e:
+            logger.warning(f"Notification publish failed: {e}")
+
+    def events(self, user_type, user_id, unread_count, audience=None):
+        """
+        Generator of SSE frames for one user.
+
+        Args:
+            unread_count: Callable returning the user's unread count; called
+                on connect and after each event for the user, never while idle
+            audience: For students, a callable(audience dict) deciding whether
+                a broadcast is addressed to them; broadcasts are ignored when None
+        """
+        channels = [self.channel(user_type, user_id)]
+        if audience is not None:
+            channels.append(BROADCAST_CHANNEL)
+        subscription = self.broker.subscribe(channels)
+        try:
+            yield 'retry: 5000\n\n'
+            yield _frame('unread_count', {'unread_count': unread_count()})
+            while True:
+                message = subscription.get_message(timeout=self.heartbeat)
+                if message is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message.get('audience') is not None and (audience is None or not audience(message['audience'])):
+                    continue
+                if message.get('notification'):
+                    yield _frame('notification', message['notification'])
+                yield _frame('unread_count', {'unread_count': unread_count()})
+        finally:
+            subscription.close()
+
+    def stats(self):
+        return {
+            'broker': type(self.broker).__name__ if self.broker else None,
+            'published': self.published,
+            'subscribers': self.broker.subscriber_count() if self.broker else 0
+        }
+
+
+def _frame(event_name, data):
+    return f'event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+notification_stream = NotificationStream()
+
+_hooks_registered = False
+
+
+def _register_session_hooks():
+    """Publish notification writes: collect on flush, publish on commit, forget on rollback"""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    event.listen(Session, 'after_flush', _collect_notification_events)
+    event.listen(Session, 'after_commit', _publish_pending)
+    event.listen(Session, 'after_rollback', lambda session: session.info.pop(_PENDING_KEY, None))
+    _hooks_registered = True
+
+
+def _collect_notification_events(session, flush_context):
+    if notification_stream.broker is None:
+        return
+
+    from models.gecr_models import Notification, BroadcastNotification, NotificationReceipt
+
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            notification_stream.publish_after_commit(
+                session, NotificationStream.channel(obj.user_type, obj.user_id),
+                {'event': 'notification', 'notification': obj.to_dict()}
+            )
+        elif isinstance(obj, BroadcastNotification):
+            notification_stream.publish_after_commit(session, BROADCAST_CHANNEL, {
+                'event': 'notification',
+                'notification': obj.to_dict(),
+                'audience': {'department': obj.department, 'semester': obj.semester, 'subject_id': obj.subject_id}
+            })
+        elif isinstance(obj, NotificationReceipt):
+            notification_stream.mark_changed(session, 'student', obj.student_id)
+
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, Notification):
+            notification_stream.mark_changed(session, obj.user_type, obj.user_id)
+
+
+def _publish_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # One refresh per user is enough when several rows changed in one commit
+    seen = set()
+    for channel, message in pending:
+        if message.get('event') == 'changed':
+            if channel in seen:
+                continue
+            seen.add(channel)
+        notification_stream.publish(channel, message)
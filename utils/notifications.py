@@ -0,0 +1,181 @@
+"""
+Student Notifications
+Announcements and events are stored once as a BroadcastNotification with an
+audience (department / semester / subject); students only get a
+NotificationReceipt row when they read one. Personal notifications stay in
+the notifications table and are merged with the broadcasts on read.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select, insert, literal, exists, func, or_, and_
+from database import db
+from models.gecr_models import (
+    Student, StudentEnrollment, Notification, BroadcastNotification, NotificationReceipt
+)
+
+
+def student_audience(department=None, semester=None, subject_id=None):
+    """
+    SELECT of the student ids a broadcast is addressed to.
+
+    Args:
+        department: Only students of this department (case-insensitive)
+        semester: Only students in this semester
+        subject_id: Only students actively enrolled in this subject
+
+    With no filters every student is selected.
+    """
+    query = select(Student.student_id)
+    if department:
+        query = query.where(func.lower(Student.department) == department.strip().lower())
+    if semester is not None:
+        query = query.where(Student.semester == semester)
+    if subject_id is not None:
+        query = query.where(exists().where(
+            StudentEnrollment.student_id == Student.student_id,
+            StudentEnrollment.subject_id == subject_id,
+            StudentEnrollment.status == 'active'
+        ))
+    return query
+
+
+def broadcast_to_students(title, message, notification_type, link=None,
+                          department=None, semester=None, subject_id=None, created_by=None):
+    """
+    Store one notification for a student audience. The caller commits.
+
+    Returns:
+        (BroadcastNotification, number of students in the audience)
+    """
+    broadcast = BroadcastNotification(
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        link=link,
+        department=department.strip() if department else None,
+        semester=semester,
+        subject_id=subject_id,
+        created_by=created_by
+    )
+    db.session.add(broadcast)
+    db.session.flush()
+
+    audience = student_audience(department, semester, subject_id).subquery()
+    recipients = db.session.execute(select(func.count()).select_from(audience)).scalar()
+    return broadcast, recipients
+
+
+def addressed_to(student):
+    """
+    Filter on BroadcastNotification matching the broadcasts whose audience
+    includes `student`, leaving out those sent before the student's account
+    was created
+    """
+    department = (student.department or '').strip().lower()
+    since = [BroadcastNotification.created_at >= student.created_at] if student.created_at else []
+    return and_(
+        *since,
+        or_(BroadcastNotification.department.is_(None),
+            func.lower(BroadcastNotification.department) == department),
+        or_(BroadcastNotification.semester.is_(None),
+            BroadcastNotification.semester == student.semester),
+        or_(BroadcastNotification.subject_id.is_(None),
+            BroadcastNotification.subject_id.in_(
+                select(StudentEnrollment.subject_id).where(
+                    StudentEnrollment.student_id == student.student_id,
+                    StudentEnrollment.status == 'active'
+                )
+            ))
+    )
+
+
+def _broadcasts_with_receipt(student):
+    """Broadcasts addressed to `student`, outer-joined to that student's receipt"""
+    return db.session.query(BroadcastNotification, NotificationReceipt.receipt_id).outerjoin(
+        NotificationReceipt,
+        and_(NotificationReceipt.broadcast_id == BroadcastNotification.broadcast_id,
+             NotificationReceipt.student_id == student.student_id)
+    ).filter(addressed_to(student))
+
+
+def get_student_notifications(student, limit=20, unread_only=False):
+    """
+    Latest personal and broadcast notifications for a student, newest first.
+
+    Returns:
+        (list of notification dicts, unread count across both kinds)
+    """
+    personal = Notification.query.filter_by(user_id=student.student_id, user_type='student')
+    broadcasts = _broadcasts_with_receipt(student)
+    if unread_only:
+        personal = personal.filter_by(read=False)
+        broadcasts = broadcasts.filter(NotificationReceipt.receipt_id.is_(None))
+
+    items = [(n.created_at, n.to_dict()) for n in
+             personal.order_by(Notification.created_at.desc()).limit(limit)]
+    items += [(b.created_at, b.to_dict(read=receipt_id is not None)) for b, receipt_id in
+              broadcasts.order_by(BroadcastNotification.created_at.desc()).limit(limit)]
+    items.sort(key=lambda item: item[0] or datetime.min, reverse=True)
+
+    return [item for _, item in items[:limit]], count_student_unread(student)
+
+
+def count_student_unread(student):
+    """Unread personal notifications plus broadcasts without a read receipt"""
+    return Notification.query.filter_by(
+        user_id=student.student_id, user_type='student', read=False
+    ).count() + _broadcasts_with_receipt(student).filter(
+        NotificationReceipt.receipt_id.is_(None)
+    ).count()
+
+
+def audience_matcher(student):
+    """
+    Return a check of a broadcast's audience dict against `student`, done
+    in Python so a notification stream can filter broadcasts without queries.
+    Enrollments are read once, when the matcher is built.
+    """
+    department = (student.department or '').strip().lower()
+    subject_ids = {row[0] for row in db.session.query(StudentEnrollment.subject_id).filter_by(
+        student_id=student.student_id, status='active'
+    )}
+
+    def matches(audience):
+        return ((not audience.get('department') or audience['department'].strip().lower() == department)
+                and (audience.get('semester') is None or audience['semester'] == student.semester)
+                and (audience.get('subject_id') is None or audience['subject_id'] in subject_ids))
+    return matches
+
+
+def mark_broadcast_read(student, broadcast_id):
+    """
+    Record that `student` read a broadcast. The caller commits.
+
+    Returns:
+        False if the broadcast does not exist or is not addressed to the student
+    """
+    row = _broadcasts_with_receipt(student).filter(
+        BroadcastNotification.broadcast_id == broadcast_id
+    ).first()
+    if row is None:
+        return False
+    if row.receipt_id is None:
+        db.session.add(NotificationReceipt(broadcast_id=broadcast_id, student_id=student.student_id))
+    return True
+
+
+def mark_all_broadcasts_read(student):
+    """Insert receipts for every unread broadcast addressed to `student` in one statement. The caller commits."""
+    now = datetime.utcnow()
+    unread = _broadcasts_with_receipt(student).filter(
+        NotificationReceipt.receipt_id.is_(None)
+    ).with_entities(
+        BroadcastNotification.broadcast_id,
+        literal(student.student_id),
+        literal(now, NotificationReceipt.read_at.type)
+    )
+    result = db.session.execute(
+        insert(NotificationReceipt).from_select(['broadcast_id', 'student_id', 'read_at'], unread)
+    )
+    return result.rowcount
@@ -0,0 +1,62 @@
+"""
+Pagination Helpers
+Opaque keyset cursors and streamed JSON list responses for large listings
+"""
+
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, length):
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Raises:
+        ValueError: if the cursor is malformed or has the wrong number of values
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def parse_page_size(value):
+    """
+    Parse a ?limit= argument. Returns None when no limit was requested.
+
+    Raises:
+        ValueError: if the value is not a positive integer
+    """
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be a positive integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def iter_json_array(items):
+    """Yield a JSON array one element at a time so the body never sits in memory as a whole"""
+    yield '['
+    first = True
+    for item in items:
+        if not first:
+            yield ','
+        yield json.dumps(item, default=str)
+        first = False
+    yield ']'
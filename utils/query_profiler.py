@@ -0,0 +1,170 @@
+"""
+Query Profiler
+Opt-in per-request SQL profiling: statement count, DB time and repeated
+statement fingerprints, reported as a Server-Timing header and in the logs
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Connection.info key holding start times of statements in flight
+_STARTED_KEY = 'query_profiler_started'
+
+# Profile of the request being served (None when it was not sampled); a
+# ContextVar rather than flask.g because the cursor hooks run on every statement
+_current_profile = ContextVar('query_profile', default=None)
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Statement text with whitespace collapsed and IN (?, ?, ...) lists folded to IN (...)"""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(...)', statement)).strip()
+
+
+class RequestProfile:
+    """Statements issued while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """[(fingerprint, count)] of statements run at least `threshold` times, most frequent first"""
+        return [(text, count) for text, count in self.fingerprints.most_common() if count >= threshold]
+
+
+class QueryProfiler:
+    """
+    Samples requests and profiles the SQL they issue.
+
+    Configure with QUERY_PROFILER_SAMPLE_RATE (fraction of requests profiled;
+    0 installs no hooks at all), QUERY_PROFILER_SLOW_MS (log requests whose
+    DB time reaches this) and QUERY_PROFILER_REPEAT_THRESHOLD (log a likely
+    N+1 when one statement runs this many times in a request). Headers go
+    out before a streamed body is generated, so for streamed responses the
+    Server-Timing header only covers queries run before the first chunk; the
+    logs and slowest() include the whole request.
+    """
+
+    def __init__(self, app=None):
+        self.sample_rate = 0.0
+        self.slow_ms = 200
+        self.repeat_threshold = 10
+        self.profiled = 0
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.sample_rate = float(app.config.get('QUERY_PROFILER_SAMPLE_RATE', 0))
+        self.slow_ms = float(app.config.get('QUERY_PROFILER_SLOW_MS', 200))
+        self.repeat_threshold = int(app.config.get('QUERY_PROFILER_REPEAT_THRESHOLD', 10))
+        app.extensions['query_profiler'] = self
+        if self.sample_rate <= 0:
+            return
+
+        from database import db
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start_profile)
+        app.after_request(self._add_server_timing)
+        app.teardown_request(self._finish_profile)
+
+    def _start_profile(self):
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        _current_profile.set(RequestProfile() if sampled else None)
+
+    def _add_server_timing(self, response):
+        profile = _current_profile.get()
+        if profile is not None:
+            total_ms = (time.perf_counter() - profile.started) * 1000
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={profile.db_seconds * 1000:.1f};desc="{profile.queries} queries", app;dur={total_ms:.1f}'
+            )
+        return response
+
+    def _finish_profile(self, exc):
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        _current_profile.set(None)
+
+        endpoint = request.endpoint or request.path
+        db_ms = profile.db_seconds * 1000
+        repeated = profile.repeated(self.repeat_threshold)
+        self._record(endpoint, profile, db_ms, bool(repeated))
+        for text, count in repeated[:3]:
+            logger.warning(f"Likely N+1 in {endpoint}: {count}x {text[:200]}")
+        if db_ms >= self.slow_ms:
+            logger.warning(f"Slow DB time in {endpoint}: {db_ms:.1f} ms over {profile.queries} queries")
+
+    def _record(self, endpoint, profile, db_ms, repeated):
+        with self._lock:
+            self.profiled += 1
+            totals = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0, 'n_plus_one': 0
+            })
+            totals['requests'] += 1
+            totals['queries'] += profile.queries
+            totals['db_ms'] += db_ms
+            totals['max_db_ms'] = max(totals['max_db_ms'], db_ms)
+            totals['n_plus_one'] += repeated
+
+    def slowest(self, limit=10):
+        """Profiled endpoints with the most total DB time, with per-request averages"""
+        with self._lock:
+            ranked = sorted(self._endpoints.items(), key=lambda item: item[1]['db_ms'], reverse=True)[:limit]
+            return [{
+                'endpoint': endpoint,
+                'requests': totals['requests'],
+                'avg_queries': round(totals['queries'] / totals['requests'], 1),
+                'avg_db_ms': round(totals['db_ms'] / totals['requests'], 2),
+                'max_db_ms': round(totals['max_db_ms'], 2),
+                'n_plus_one': totals['n_plus_one'],
+            } for endpoint, totals in ranked]
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'profiled_requests': self.profiled,
+            'slowest_endpoints': self.slowest(5)
+        }
+
+
+query_profiler = QueryProfiler()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = conn.info.get(_STARTED_KEY)
+    if profile is not None and started:
+        profile.record(statement, time.perf_counter() - started.pop())
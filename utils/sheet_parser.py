@@ -0,0 +1,241 @@
+"""
+Sheet Parser
+Columnar parsing engine shared by the student and attendance parsers and
+the import jobs. Reads .csv, .xlsx and .xls uploads in blocks of rows as
+DataFrames of raw cells (indexed by sheet row number); headers are matched
+against aliases once and each column is cleaned and validated as a whole
+(one map per column, regex and to_numeric over the column, dictionary-encoded
+status codes) instead of field by field for every row.
+"""
+
+import itertools
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Sheet rows per block
+DEFAULT_BLOCK_ROWS = 5000
+
+EMAIL_PATTERN = r'[\w\.-]+@[\w\.-]+\.\w+'
+
+STATUS_CODES = {
+    'P': 'Present', 'PRESENT': 'Present', '1': 'Present', 'Y': 'Present', 'YES': 'Present',
+    'A': 'Absent', 'ABSENT': 'Absent', '0': 'Absent', 'N': 'Absent', 'NO': 'Absent',
+    'L': 'Late', 'LATE': 'Late', 'T': 'Late', 'TARDY': 'Late'
+}
+
+
+def cell_text(value):
+    """One cell as a stripped string ('' for empty cells, 101.0 -> '101')"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def sheet_format(source, filename=None):
+    """'csv', 'xlsx' or 'xls', from the file name or else the file's first bytes"""
+    name = filename if filename is not None else (
+        source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    )
+    extension = os.path.splitext(str(name or ''))[1].lower()
+    if extension in ('.csv', '.xlsx', '.xls'):
+        return extension[1:]
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            head = f.read(8)
+    else:
+        position = source.tell()
+        head = source.read(8)
+        source.seek(position)
+    if head.startswith(b'PK'):
+        return 'xlsx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'xls'
+    return 'csv'
+
+
+def _xlsx_blocks(source, block_rows):
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    headers = list(next(rows, None) or ())
+
+    def blocks():
+        try:
+            row_number = 1
+            while True:
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) == block_rows:
+                        break
+                if not chunk:
+                    return
+                yield pd.DataFrame.from_records(
+                    chunk, index=pd.RangeIndex(row_number + 1, row_number + 1 + len(chunk)), coerce_float=False
+                )
+                row_number += len(chunk)
+        finally:
+            workbook.close()
+
+    return headers, blocks()
+
+
+def _csv_blocks(source, block_rows):
+    # Every cell as text ('' -> NaN), blank lines kept so index + 1 is the line number
+    reader = pd.read_csv(source, header=None, dtype=str, keep_default_na=False, na_values=[''],
+                         skip_blank_lines=False, chunksize=block_rows)
+    first = next(reader, None)
+    if first is None:
+        return [], iter(())
+    headers = first.iloc[0].tolist()
+
+    def blocks():
+        try:
+            for block in itertools.chain([first.iloc[1:]], reader):
+                block.index = block.index + 1
+                yield block
+        finally:
+            reader.close()
+
+    return headers, blocks()
+
+
+def _xls_blocks(source, block_rows):
+    try:
+        import xlrd  # noqa: F401
+    except ImportError:
+        raise ValueError('Reading .xls files needs the xlrd package; save the sheet as .xlsx or .csv')
+    frame = pd.read_excel(source, header=None, engine='xlrd', dtype=object)
+    frame.index = frame.index + 1
+    headers = frame.iloc[0].tolist() if len(frame) else []
+    frame = frame.iloc[1:]
+    return headers, (frame.iloc[start:start + block_rows] for start in range(0, len(frame), block_rows))
+
+
+def read_sheet(source, filename=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Open a sheet (a path or file object) for reading in blocks.
+
+    Returns:
+        dict with:
+            - 'headers': header row values (raw cells)
+            - 'blocks': generator of DataFrames of at most block_rows rows,
+              columns numbered 0..len(headers) - 1, index the sheet row
+              number; rows with no value at all are left out. Close it (or
+              exhaust it) to release the file.
+            - 'errors': why the file could not be opened; no blocks then
+    """
+    try:
+        reader = {'csv': _csv_blocks, 'xlsx': _xlsx_blocks, 'xls': _xls_blocks}[sheet_format(source, filename)]
+        headers, blocks = reader(source, block_rows)
+    except Exception as e:
+        return {'headers': [], 'blocks': iter(()), 'errors': [str(e)]}
+
+    width = len(headers)
+
+    def tidy():
+        try:
+            for block in blocks:
+                block = block.dropna(how='all')
+                if block.shape[1] != width:
+                    # Pad short rows, drop cells right of the last header
+                    block = block.reindex(columns=range(width))
+                yield block
+        finally:
+            close = getattr(blocks, 'close', None)
+            if close:
+                close()
+
+    return {'headers': headers, 'blocks': tidy(), 'errors': []}
+
+
+def read_frame(source, filename=None):
+    """
+    The whole sheet as one DataFrame of raw cells, labelled by the header
+    text (like pandas.read_excel / read_csv); index 0 is sheet row 2, so
+    index + 2 is the row to report in errors.
+    """
+    sheet = read_sheet(source, filename)
+    if sheet['errors']:
+        raise ValueError(sheet['errors'][0])
+    blocks = list(sheet['blocks'])
+    frame = pd.concat(blocks) if blocks else pd.DataFrame(columns=range(len(sheet['headers'])))
+    frame.columns = [cell_text(header) or f'Unnamed: {i}' for i, header in enumerate(sheet['headers'])]
+    frame.index = frame.index - 2
+    return frame
+
+
+def find_columns(headers, aliases):
+    """
+    {field: column number} for each field of `aliases` ({field: [header
+    names]}) whose names appear among the headers, ignoring case and
+    surrounding spaces; the first alias listed wins
+    """
+    positions = {}
+    for index, header in enumerate(headers):
+        positions.setdefault(cell_text(header).lower(), index)
+    found = {}
+    for field, names in aliases.items():
+        for name in names:
+            if name in positions:
+                found[field] = positions[name]
+                break
+    return found
+
+
+def text_values(column):
+    """
+    A column's cells as cell_text() strings. One map over the column: on
+    object columns this beats chaining pandas .str methods (one pass each).
+    """
+    return pd.Series(column.map(cell_text), index=column.index, dtype=object)
+
+
+def integer_values(text):
+    """Whole numbers from text_values() output as a nullable Int64 column (<NA> for blanks and non-numbers)"""
+    numbers = pd.to_numeric(text.where(text != ''), errors='coerce')
+    return numbers.where(numbers % 1 == 0).astype('Int64')
+
+
+def email_mask(text):
+    """True where the text is a plausible email address"""
+    return text.str.fullmatch(EMAIL_PATTERN).fillna(False).astype(bool)
+
+
+def status_values(cells):
+    """
+    Attendance codes (P/A/L, Present, 1/0, Y/N, ...) -> 'Present' /
+    'Absent' / 'Late', None when unknown. Cells are dictionary-encoded
+    first, so only the few distinct values are decoded.
+    """
+    codes, uniques = pd.factorize(np.asarray(cells, dtype=object).ravel())
+    decoded = np.array([STATUS_CODES.get(cell_text(value).upper()) for value in uniques] + [None], dtype=object)
+    return decoded[codes]
+
+
+def row_errors(rows, checks):
+    """
+    The first failing check of each row, in sheet order.
+
+    Args:
+        rows: sheet row numbers
+        checks: [(mask, message)] in priority order; message is a string
+                or a function of the row's position
+
+    Returns:
+        (mask of rows with an error, ['Row N: message', ...])
+    """
+    bad = np.zeros(len(rows), dtype=bool)
+    found = {}
+    for mask, message in checks:
+        new = np.asarray(mask, dtype=bool) & ~bad
+        for position in np.flatnonzero(new):
+            found[position] = message if isinstance(message, str) else message(position)
+        bad |= new
+    rows = np.asarray(rows)
+    return bad, [f'Row {rows[position]}: {found[position]}' for position in sorted(found)]
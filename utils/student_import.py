@@ -0,0 +1,170 @@
+"""
+Student Import
+Staged bulk creation of students from parsed Excel rows: duplicate checks
+with one IN query per batch, password hashing on a thread pool, then one
+bulk INSERT each for the students and their welcome notifications
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from database import db
+from models.gecr_models import Student, Notification
+from utils.attendance_writer import chunked, MAX_STATEMENT_PARAMS
+
+DEFAULT_PASSWORD = 'student123'
+
+# Passwords per pool task (and per 'hashing' progress step)
+HASH_BATCH = 20
+
+_hash_executor = None
+_hash_executor_pid = None
+_hash_executor_lock = threading.Lock()
+
+
+def _get_hash_executor(workers):
+    """One pool per process, created on first use (safe with gunicorn --preload)"""
+    global _hash_executor, _hash_executor_pid
+    with _hash_executor_lock:
+        if _hash_executor is None or _hash_executor_pid != os.getpid():
+            _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _hash_executor_pid = os.getpid()
+        return _hash_executor
+
+
+def _hash_batch(passwords):
+    return [generate_password_hash(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers):
+    """
+    Yield the hashes of `passwords` in order, a batch at a time. PBKDF2 runs
+    in OpenSSL with the GIL released, so `workers` threads hash on that many
+    cores; 0 or 1 hashes on the calling thread.
+    """
+    batches = list(chunked(passwords, HASH_BATCH))
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield _hash_batch(batch)
+        return
+    yield from _get_hash_executor(workers).map(_hash_batch, batches)
+
+
+def find_existing(students_data):
+    """
+    (roll numbers, emails) among the given rows that already belong to a
+    student, with one roll_no IN (...) OR email IN (...) query per batch
+    """
+    roll_nos, emails = set(), set()
+    for batch in chunked(students_data, MAX_STATEMENT_PARAMS // 2):
+        rows = db.session.query(Student.roll_no, Student.email).filter(db.or_(
+            Student.roll_no.in_([data['roll_no'] for data in batch]),
+            Student.email.in_([data['email'] for data in batch])
+        ))
+        for roll_no, email in rows:
+            roll_nos.add(roll_no)
+            emails.add(email)
+    return roll_nos, emails
+
+
+def _split_new(students_data):
+    """(rows to create, skipped) - skipping rows already in the database or repeated in the file"""
+    existing_roll_nos, existing_emails = find_existing(students_data)
+    seen_roll_nos, seen_emails = set(), set()
+    new, skipped = [], []
+    for data in students_data:
+        if data['roll_no'] in existing_roll_nos or data['email'] in existing_emails:
+            skipped.append({'roll_no': data['roll_no'], 'reason': 'Already exists'})
+        elif data['roll_no'] in seen_roll_nos or data['email'] in seen_emails:
+            skipped.append({'roll_no': data['roll_no'], 'reason': 'Duplicate in file'})
+        else:
+            seen_roll_nos.add(data['roll_no'])
+            seen_emails.add(data['email'])
+            new.append(data)
+    return new, skipped
+
+
+def _insert(students_data, hashes):
+    """Bulk-insert students and their welcome notifications; returns the created students as dicts"""
+    db.session.execute(db.insert(Student), [{
+        'roll_no': data['roll_no'],
+        'name': data['name'],
+        'email': data['email'],
+        'password': password_hash,
+        'department': data.get('department'),
+        'semester': data.get('semester'),
+        'phone': data.get('phone'),
+        'email_notifications_enabled': True,
+    } for data, password_hash in zip(students_data, hashes)])
+
+    created = []
+    for batch in chunked([data['roll_no'] for data in students_data], MAX_STATEMENT_PARAMS):
+        created.extend(Student.query.filter(Student.roll_no.in_(batch)).all())
+    order = {data['roll_no']: index for index, data in enumerate(students_data)}
+    created.sort(key=lambda student: order[student.roll_no])
+
+    if created:
+        db.session.execute(db.insert(Notification), [{
+            'user_id': student.student_id,
+            'user_type': 'student',
+            'title': 'Welcome to GEC Rajkot!',
+            'message': f'Welcome {student.name}! Your account has been created. Roll No: {student.roll_no}',
+            'notification_type': 'system',
+            'link': '/student/profile',
+        } for student in created])
+    # Serialized before the caller commits, which would expire every row
+    return [student.to_dict() for student in created]
+
+
+def import_students(students_data, workers=0, commit=True):
+    """
+    Create students from utils.student_parser rows, skipping roll numbers or
+    emails that already exist (or repeat within the file). Rows without a
+    password get DEFAULT_PASSWORD. Commits unless `commit` is False (the
+    rows are then left pending for the caller to commit).
+
+    A generator so callers can report progress: it yields
+    {'stage': 'checking' | 'hashing' | 'inserting', 'done': n, 'total': n}
+    and finally {'stage': 'done', 'result': {'created', 'skipped', 'errors'}}
+    with the created students (Student.to_dict()) and skip reasons. run_import() just
+    returns the result.
+    """
+    total = len(students_data)
+    yield {'stage': 'checking', 'done': 0, 'total': total}
+    new, skipped = _split_new(students_data)
+    yield {'stage': 'checking', 'done': total, 'total': total}
+
+    hashes = []
+    yield {'stage': 'hashing', 'done': 0, 'total': len(new)}
+    for batch in hash_passwords([data.get('password') or DEFAULT_PASSWORD for data in new], workers):
+        hashes.extend(batch)
+        yield {'stage': 'hashing', 'done': len(hashes), 'total': len(new)}
+
+    yield {'stage': 'inserting', 'done': 0, 'total': len(new)}
+    try:
+        created = _insert(new, hashes) if new else []
+        if commit:
+            db.session.commit()
+    except IntegrityError:
+        # Another import added some of these students since the check; skip those and retry once
+        db.session.rollback()
+        hash_of = dict(zip((data['roll_no'] for data in new), hashes))
+        retry, also_skipped = _split_new(new)
+        skipped.extend(also_skipped)
+        created = _insert(retry, [hash_of[data['roll_no']] for data in retry]) if retry else []
+        if commit:
+            db.session.commit()
+    yield {'stage': 'inserting', 'done': len(created), 'total': len(new)}
+
+    yield {'stage': 'done', 'result': {'created': created, 'skipped': skipped, 'errors': []}}
+
+
+def run_import(students_data, workers=0, commit=True):
+    """import_students() without progress: returns its result"""
+    for step in import_students(students_data, workers, commit):
+        if step['stage'] == 'done':
+            return step['result']